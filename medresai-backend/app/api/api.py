@@ -3,9 +3,18 @@ API router configuration.
 """
 from fastapi import APIRouter
 
-from app.api.endpoints import predict
+from app.api.api_v1.endpoints import predictions
+from app.api.endpoints import predict, prediction
 
 api_router = APIRouter()
 
 # Add prediction endpoints with prefix
-api_router.include_router(predict.router, prefix="/predict", tags=["predictions"])
\ No newline at end of file
+api_router.include_router(predict.router, prefix="/predict", tags=["predictions"])
+
+# Prediction jobs: batches, FASTA/FASTQ uploads and job status. The routes carry
+# their own /predict prefix; the synchronous POST /predict/antiviral above is
+# registered first and keeps serving that path
+api_router.include_router(prediction.router, tags=["prediction jobs"])
+
+# Stored prediction jobs of the signed-in user
+api_router.include_router(predictions.router, prefix="/predictions", tags=["predictions"])
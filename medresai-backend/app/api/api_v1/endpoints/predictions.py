@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional, Union
 import logging
 
-from app.db.session import get_db
+from app.db.async_session import AsyncSessionLocal, get_async_db
 from app.api.deps import get_current_user
 import app.crud.prediction as crud
+from app.services.events import DB_JOB_TOPIC, job_event_stream, job_topic
 from app.schemas.prediction import (
     PredictionJobCreate,
     PredictionJobResponse,
+    PredictionJobSummary,
     PredictionResultResponse
 )
 
@@ -16,9 +19,9 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 @router.post("/jobs", response_model=PredictionJobResponse)
-def create_prediction_job(
+async def create_prediction_job(
     job: PredictionJobCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Create a new prediction job"""
@@ -27,7 +30,7 @@ def create_prediction_job(
 
     try:
         # Create the job
-        db_job = crud.create_prediction_job(
+        db_job = await crud.create_prediction_job_async(
             db=db,
             user_id=user_id,
             input_type=job.input_type,
@@ -36,7 +39,7 @@ def create_prediction_job(
 
         # Start simulating job progress for development purposes
         # In production, this would be replaced by actual processing logic
-        crud.simulate_job_progress(db, db_job.id)
+        crud.simulate_job_progress(None, db_job.id)
 
         return db_job
     except Exception as e:
@@ -47,18 +50,43 @@ def create_prediction_job(
         )
 
 
-@router.get("/jobs", response_model=List[PredictionJobResponse])
-def get_user_jobs(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+@router.get("/jobs", response_model=List[Union[PredictionJobResponse, PredictionJobSummary]])
+async def get_user_jobs(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_input_data: bool = True,
+    db: AsyncSession = Depends(get_async_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
-    """Get all prediction jobs for the current user"""
+    """
+    Get prediction jobs for the current user, newest first.
+
+    Pages are fetched with an opaque cursor: pass the ``X-Next-Cursor`` response
+    header of one page as ``cursor`` to get the next; the header is absent on the
+    last page. ``include_input_data=false`` omits the input data from each job.
+    ``skip`` is still accepted for offset paging but gets slower the deeper it goes.
+    """
     user_id = current_user.get("id")
     try:
-        jobs = crud.get_user_prediction_jobs(db, user_id, skip, limit)
+        if skip and not cursor:
+            jobs = await crud.get_user_prediction_jobs_async(db, user_id, skip, limit)
+            if not include_input_data:
+                jobs = [PredictionJobSummary.model_validate(job) for job in jobs]
+            return jobs
+
+        jobs, next_cursor = await crud.get_user_prediction_jobs_page_async(
+            db, user_id, limit=limit, cursor=cursor, include_input_data=include_input_data
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return jobs
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error retrieving prediction jobs: {e}")
         raise HTTPException(
@@ -68,14 +96,14 @@ def get_user_jobs(
 
 
 @router.get("/jobs/{job_id}", response_model=PredictionJobResponse)
-def get_job_status(
+async def get_job_status(
     job_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get the status of a specific prediction job"""
     user_id = current_user.get("id")
-    job = crud.get_prediction_job(db, job_id)
+    job = await crud.get_prediction_job_async(db, job_id)
 
     if not job:
         raise HTTPException(
@@ -93,14 +121,45 @@ def get_job_status(
 
 
 @router.get("/jobs/{job_id}/results", response_model=List[PredictionResultResponse])
-def get_job_results(
+async def get_job_results(
     job_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get the results of a specific prediction job"""
     user_id = current_user.get("id")
-    job = crud.get_prediction_job(db, job_id)
+    job = await crud.get_prediction_job_async(db, job_id)
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    if job.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this job"
+        )
+
+    results = await crud.get_prediction_results_async(db, job_id)
+    return results
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_status(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Stream status and progress changes of a prediction job as Server-Sent Events.
+
+    Sends the current job as an ``event: status`` message, then the updated
+    job on every change, and closes once the job has completed or failed.
+    """
+    user_id = current_user.get("id")
+    job = await crud.get_prediction_job_async(db, job_id)
 
     if not job:
         raise HTTPException(
@@ -114,5 +173,16 @@ def get_job_results(
             detail="Not authorized to access this job"
         )
 
-    results = crud.get_prediction_results(db, job_id)
-    return results
\ No newline at end of file
+    async def load_job():
+        # A short session per read; the stream can outlive the request's session
+        async with AsyncSessionLocal() as session:
+            current = await crud.get_prediction_job_async(session, job_id)
+            if current is None:
+                return None
+            return PredictionJobSummary.model_validate(current).model_dump()
+
+    return StreamingResponse(
+        job_event_stream(job_topic(DB_JOB_TOPIC, job_id), load_job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
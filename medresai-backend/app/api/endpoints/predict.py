@@ -1,12 +1,22 @@
 """
 Prediction API endpoints.
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from pydantic import BaseModel, Field, ConfigDict
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Header
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ConfigDict, field_validator
 from datetime import datetime
+from typing import Literal, Optional
+import asyncio
+import json
 import logging
+import os
+import secrets
+import time
 
+from app.ml.model_registry import model_registry
+from app.ml.sequence import NUCLEOTIDE, normalize_sequence
 from app.services.model_service import model_service
+from app.services.inference_executor import InferenceQueueFull, inference_executor
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -17,6 +27,13 @@ class SequenceRequest(BaseModel):
     """Request model for sequence prediction."""
     sequence: str = Field(..., min_length=10, description="Genome sequence to analyze")
     max_length: int = Field(200, ge=50, le=1000, description="Maximum output length")
+    use_cache: bool = Field(True, description="Reuse a cached result for an identical sequence; set false to force a fresh generation")
+
+    @field_validator("sequence")
+    @classmethod
+    def normalize(cls, sequence: str) -> str:
+        """Upper-case, strip whitespace, map U to T and reject unknown residues."""
+        return normalize_sequence(sequence, kind=NUCLEOTIDE)
 
 class VirusQueryRequest(BaseModel):
     """Request model for virus prediction."""
@@ -40,35 +57,82 @@ class PredictionResponse(BaseModel):
 
 class StatusResponse(BaseModel):
     """Response model for model status."""
-    status: str
+    status: Literal["not_loaded", "loading", "ready", "failed"]
     is_loading: bool
     is_model_loaded: bool
     is_tokenizer_loaded: bool
-    last_error: str = None
-    last_prediction_time: float = None
+    last_error: Optional[str] = None
+    last_prediction_time: Optional[float] = None
     ai_model_version: str = "DeepSeek-R1-Distill-Qwen-1.5B-finetuned"
+    load_stage: Optional[str] = Field(None, description="Step a running load has reached")
+    load_progress: float = Field(0.0, ge=0.0, le=1.0, description="Rough fraction of the load done")
+    load_started_at: Optional[datetime] = None
+    load_finished_at: Optional[datetime] = None
+    load_seconds: Optional[float] = Field(None, description="Time spent loading so far, or in total once finished")
     
     model_config = ConfigDict(protected_namespaces=())
 
 @router.get("/status", response_model=StatusResponse)
 async def get_model_status():
     """
-    Get the current status of the model.
+    Get the current status of the model: whether it is loading (with stage,
+    progress and timing), ready or failed to load.
     """
-    # Check if model and tokenizer are loaded
-    model_loaded = model_service.model is not None
-    tokenizer_loaded = model_service.tokenizer is not None
-    
+    state = model_service.status
+
     return {
-        "status": "ready" if model_loaded and tokenizer_loaded else "loading",
-        "is_loading": False,
-        "is_model_loaded": model_loaded,
-        "is_tokenizer_loaded": tokenizer_loaded,
-        "last_error": None,
+        "status": state["status"],
+        "is_loading": state["is_loading"],
+        "is_model_loaded": model_service.model is not None,
+        "is_tokenizer_loaded": model_service.tokenizer is not None,
+        "last_error": state["error"],
         "last_prediction_time": None,
-        "ai_model_version": "DeepSeek-R1-Distill-Qwen-1.5B-finetuned"
+        "ai_model_version": "DeepSeek-R1-Distill-Qwen-1.5B-finetuned",
+        "load_stage": state["stage"],
+        "load_progress": state["progress"],
+        "load_started_at": state["started_at"],
+        "load_finished_at": state["finished_at"],
+        "load_seconds": state["load_seconds"]
     }
 
+class ModelSwapRequest(BaseModel):
+    """Request model for swapping the served checkpoint."""
+    model_path: Optional[str] = Field(None, description="Checkpoint to switch to; omit to reload the current path")
+
+    model_config = ConfigDict(protected_namespaces=())
+
+@router.post("/model/swap")
+async def swap_model(request: ModelSwapRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    Hot-swap the model checkpoint without a restart. The current model keeps
+    serving until the new one has loaded. Requires the ``X-Admin-Token``
+    header to match MODEL_ADMIN_TOKEN; disabled when that is unset.
+    """
+    admin_token = os.getenv("MODEL_ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Model swapping is disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    if model_service.pool is not None:
+        raise HTTPException(status_code=409, detail="Models served by the inference pool are swapped by restarting it")
+    if model_service.handle is None:
+        raise HTTPException(status_code=409, detail="No model is loaded")
+
+    try:
+        handle = await asyncio.to_thread(model_service.swap_model, request.model_path)
+    except Exception as e:
+        logger.error(f"Error swapping model: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Model swap failed: {str(e)}")
+
+    return {"model": handle.describe(), "registry": model_registry.get_metrics()}
+
+@router.get("/metrics")
+async def get_model_metrics():
+    """
+    Get inference metrics (micro-batch sizes, queue wait times) for tuning.
+    """
+    return model_service.get_metrics()
+
 @router.post("/virus", response_model=VirusQueryResponse)
 async def predict_virus(request: VirusQueryRequest):
     """
@@ -145,7 +209,7 @@ async def predict_antiviral(request: SequenceRequest):
 
     try:
         # Generate prediction using the real model
-        result = await model_service.predict_antiviral(request.sequence)
+        result = await model_service.predict_antiviral(request.sequence, use_cache=request.use_cache)
 
         # Return prediction response
         return PredictionResponse(
@@ -158,6 +222,71 @@ async def predict_antiviral(request: SequenceRequest):
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
+    except InferenceQueueFull as e:
+        logger.warning(f"Rejecting prediction request: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other predictions. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Error processing prediction request: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/antiviral/stream")
+async def predict_antiviral_stream(request: SequenceRequest, format: Literal["sse", "ndjson"] = "sse"):
+    """
+    Stream antiviral predictions for a genome sequence token by token.
+
+    With ``format=sse`` (default) tokens are sent as Server-Sent Events
+    (``event: token``) and the final ``event: result`` carries the same fields
+    as PredictionResponse. With ``format=ndjson`` each message is one JSON
+    line with a ``type`` of ``token``, ``result`` or ``error``.
+    Disconnecting stops generation and frees the model.
+    """
+    logger.info(f"Received streaming prediction request for sequence: {request.sequence[:50]}...")
+
+    # Reject before the response starts so the client still gets a proper 503
+    if model_service.status["is_loading"]:
+        raise HTTPException(
+            status_code=503,
+            detail="Model is currently loading. Please try again in a few moments."
+        )
+    try:
+        inference_executor.check_capacity()
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other predictions. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    def encode(message: dict) -> str:
+        if format == "ndjson":
+            return json.dumps(message) + "\n"
+        return f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+
+    async def event_stream():
+        started = time.perf_counter()
+        try:
+            async for message in model_service.stream_antiviral(request.sequence, use_cache=request.use_cache):
+                if message["type"] == "result":
+                    response = PredictionResponse(
+                        input_sequence=message["input_sequence"],
+                        prediction=message["prediction"],
+                        ai_model_version=message["model_version"],
+                        timestamp=datetime.now(),
+                        prediction_time_seconds=time.perf_counter() - started
+                    )
+                    message = {"type": "result", **response.model_dump(mode="json")}
+                yield encode(message)
+        except Exception as e:
+            logger.error(f"Error streaming prediction: {str(e)}")
+            yield encode({"type": "error", "detail": str(e)})
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    return StreamingResponse(
+        event_stream(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
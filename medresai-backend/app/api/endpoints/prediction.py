@@ -1,20 +1,58 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime
+import asyncio
+import json
+import os
+from app.ml.fasta import SequenceFormatError, SequenceRecord, SequenceRecordParser
+from app.ml.sequence import NUCLEOTIDE, normalize_sequence
+from app.services.events import PREDICTION_JOB_TOPIC, job_event_stream, job_topic
 from app.services.prediction_service import prediction_service
+from app.services.inference_executor import InferenceQueueFull
 
 router = APIRouter()
 
+# Largest number of sequences accepted in one batch request
+BATCH_MAX_SEQUENCES = int(os.getenv("BATCH_MAX_SEQUENCES", "10000"))
+# Largest FASTA/FASTQ upload accepted, in bytes
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(256 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 class SequenceRequest(BaseModel):
     sequence: str
+    use_cache: bool = True
+
+    @field_validator("sequence")
+    @classmethod
+    def normalize(cls, sequence: str) -> str:
+        return normalize_sequence(sequence, kind=NUCLEOTIDE)
+
+class BatchSequenceRequest(BaseModel):
+    sequences: List[str] = Field(..., min_length=1)
+    use_cache: bool = True
+
+    @field_validator("sequences")
+    @classmethod
+    def normalize(cls, sequences: List[str]) -> List[str]:
+        normalized = []
+        for index, sequence in enumerate(sequences):
+            try:
+                normalized.append(normalize_sequence(sequence, kind=NUCLEOTIDE))
+            except ValueError as e:
+                raise ValueError(f"sequences[{index}]: {str(e)}")
+        return normalized
 
 class PredictionJobResponse(BaseModel):
     id: str
-    input_sequence: str
+    input_sequence: Optional[str] = None
     status: str
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    # Set on batch jobs: item counts, and per-item results once the batch has finished
+    batch: Optional[Dict[str, int]] = None
+    items: Optional[List[Dict[str, Any]]] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -24,15 +62,220 @@ async def predict_antiviral(request: SequenceRequest) -> Dict[str, Any]:
     Create a prediction job and process it using the local model.
     """
     try:
-        job = await prediction_service.create_prediction_job(request.sequence)
+        job = await prediction_service.create_prediction_job(request.sequence, use_cache=request.use_cache)
         return job
 
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other predictions. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error creating prediction job: {str(e)}"
         )
 
+async def _read_ndjson_lines(request: Request) -> AsyncIterator[str]:
+    """Yield the non-empty lines of a streamed request body."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line.decode("utf-8")
+    if buffer.strip():
+        yield buffer.decode("utf-8")
+
+async def _read_batch_requests(request: Request) -> List[Tuple[str, bool]]:
+    """Parse a batch body: a BatchSequenceRequest, or NDJSON with one SequenceRequest per line."""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        requests = []
+        line_number = 0
+        async for line in _read_ndjson_lines(request):
+            line_number += 1
+            try:
+                item = SequenceRequest.model_validate_json(line)
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=f"Line {line_number}: {e.errors()[0]['msg']}")
+            requests.append((item.sequence, item.use_cache))
+            if len(requests) > BATCH_MAX_SEQUENCES:
+                break
+        if not requests:
+            raise HTTPException(status_code=422, detail="Request body contains no sequences")
+    else:
+        try:
+            body = BatchSequenceRequest.model_validate_json(await request.body())
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+        requests = [(sequence, body.use_cache) for sequence in body.sequences]
+
+    if len(requests) > BATCH_MAX_SEQUENCES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch may contain at most {BATCH_MAX_SEQUENCES} sequences"
+        )
+    return requests
+
+@router.post("/predict/antiviral/batch")
+async def predict_antiviral_batch(request: Request) -> StreamingResponse:
+    """
+    Predict many sequences with one request.
+
+    The body is either JSON (``{"sequences": [...], "use_cache": true}``) or,
+    with ``Content-Type: application/x-ndjson``, one SequenceRequest object per
+    line. Creates one parent job, predicts identical sequences once and streams
+    NDJSON back: a ``job`` line with the parent job id, one ``item`` line per
+    input sequence in completion order (``index`` is its position in the
+    request) and a final ``done`` line. The parent job can also be fetched
+    with GET /predict/antiviral/{job_id} once the batch has finished.
+    """
+    requests = await _read_batch_requests(request)
+    return await _start_batch(requests)
+
+@router.post("/predict/antiviral/upload")
+async def predict_antiviral_upload(request: Request, use_cache: bool = True) -> StreamingResponse:
+    """
+    Predict every record of a FASTA or FASTQ file.
+
+    Send the file as the raw request body or as the ``file`` field of a
+    multipart form. The file is parsed as it streams in; residues are
+    upper-cased and validated, and each record is predicted as soon as it has
+    been parsed, as one item of a batch job. The response is the same NDJSON
+    stream as /predict/antiviral/batch, with each item's ``record_id`` set to
+    its record name. It starts once the whole file has been read, which is
+    not held up by the predictions running meanwhile.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None and not content_length.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+    if content_length is not None and int(content_length) > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Uploads are limited to {UPLOAD_MAX_BYTES} bytes")
+
+    read = asyncio.Event()
+    # The status code and detail of an upload that could not be read
+    rejected: List[Tuple[int, str]] = []
+
+    async def records() -> AsyncIterator[Tuple[str, bool, Optional[str]]]:
+        parsed = _upload_records(request)
+        count = 0
+        try:
+            async for record in parsed:
+                count += 1
+                if count > BATCH_MAX_SEQUENCES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"A batch may contain at most {BATCH_MAX_SEQUENCES} sequences"
+                    )
+                yield record.sequence, use_cache, record.id
+            if not count:
+                raise HTTPException(status_code=422, detail="Upload contains no sequence records")
+        except SequenceFormatError as e:
+            rejected.append((422, str(e)))
+            raise
+        except HTTPException as e:
+            rejected.append((e.status_code, e.detail))
+            raise ValueError(e.detail)
+        finally:
+            await parsed.aclose()
+            read.set()
+
+    # The batch reads the records at the speed they arrive while it predicts; the
+    # response waits for the whole body, since the request can't be read once
+    # the response has started
+    response = await _start_batch(records())
+    await read.wait()
+    if rejected:
+        status_code, detail = rejected[0]
+        raise HTTPException(status_code=status_code, detail=detail)
+    return response
+
+async def _upload_records(request: Request) -> AsyncIterator[SequenceRecord]:
+    """Parse the records of an upload as its chunks arrive."""
+    parser = SequenceRecordParser()
+    received = 0
+    chunks = _upload_chunks(request)
+    try:
+        async for chunk in chunks:
+            received += len(chunk)
+            if received > UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Uploads are limited to {UPLOAD_MAX_BYTES} bytes")
+            for record in parser.feed(chunk):
+                yield record
+        for record in parser.close():
+            yield record
+    finally:
+        await chunks.aclose()
+
+async def _upload_chunks(request: Request) -> AsyncIterator[bytes]:
+    """Yield an uploaded file in chunks, from a multipart ``file`` field or the raw body."""
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        # The form parser reads the whole body before returning, so its size
+        # is checked from Content-Length up front
+        if request.headers.get("content-length") is None:
+            raise HTTPException(status_code=411, detail="Multipart uploads need a Content-Length header")
+        # Starlette spools multipart files to disk past 1 MB, so reading it back is chunked too
+        form = await request.form()
+        upload = form.get("file")
+        try:
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=422, detail="Multipart uploads need a 'file' field")
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            await form.close()
+    else:
+        async for chunk in request.stream():
+            yield chunk
+
+async def _start_batch(
+    requests: Union[List[Tuple[str, bool]], AsyncIterator[Tuple[str, bool, Optional[str]]]]
+) -> StreamingResponse:
+    """
+    Create a batch job and stream it as NDJSON: a job line, item lines in
+    completion order, then a done line.
+    """
+    try:
+        job, items = await prediction_service.create_batch_job(requests)
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other predictions. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error creating batch prediction job: {str(e)}"
+        )
+
+    async def result_stream():
+        yield json.dumps({"type": "job", "id": job["id"], "batch": job["batch"]}) + "\n"
+        async for item in items:
+            yield json.dumps({"type": "item", **item}) + "\n"
+        finished = await prediction_service.get_prediction_status(job["id"])
+        yield json.dumps({
+            "type": "done",
+            "id": job["id"],
+            "status": finished["status"] if finished else None,
+            "error": finished["error"] if finished else None,
+            "batch": finished["batch"] if finished else None
+        }) + "\n"
+
+    return StreamingResponse(
+        result_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/predict/antiviral/{job_id}", response_model=PredictionJobResponse)
 async def get_prediction_status(job_id: str) -> Dict[str, Any]:
     """
@@ -50,4 +293,25 @@ async def get_prediction_status(job_id: str) -> Dict[str, Any]:
         raise HTTPException(
             status_code=500,
             detail=f"Error getting prediction status: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/predict/antiviral/{job_id}/events")
+async def stream_prediction_status(job_id: str) -> StreamingResponse:
+    """
+    Stream status changes of a prediction job as Server-Sent Events.
+
+    Sends the current job as an ``event: status`` message, then the updated
+    job on every status change, and closes once the job has completed or failed.
+    """
+    job = await prediction_service.get_prediction_status(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Prediction job not found")
+
+    return StreamingResponse(
+        job_event_stream(
+            job_topic(PREDICTION_JOB_TOPIC, job_id),
+            lambda: prediction_service.get_prediction_status(job_id)
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,12 +1,15 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, desc, insert, or_, select, update
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
+import base64
 import json
 import random
 
 from app.models.prediction import PredictionJob, PredictionResult
 from app.schemas.prediction import PredictionJobCreate, PredictionJobUpdate, PredictionResultCreate
+from app.services.events import DB_JOB_TOPIC, job_events, job_topic
 
 
 def create_prediction_job(db: Session, user_id: str, input_type: str, input_data: dict):
@@ -39,6 +42,93 @@ def get_user_prediction_jobs(db: Session, user_id: str, skip: int = 0, limit: in
         .all()
 
 
+def encode_job_cursor(created_at: datetime, job_id: int) -> str:
+    """Opaque pagination cursor pointing just after the given job."""
+    payload = json.dumps([created_at.isoformat(), job_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_job_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor from encode_job_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(job_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _user_jobs_page_query(user_id: str, limit: int, cursor: Optional[str], include_input_data: bool):
+    """Build the keyset page query shared by the sync and async page functions."""
+    if include_input_data:
+        query = select(PredictionJob)
+    else:
+        query = select(
+            PredictionJob.id,
+            PredictionJob.user_id,
+            PredictionJob.input_type,
+            PredictionJob.status,
+            PredictionJob.progress,
+            PredictionJob.created_at,
+            PredictionJob.updated_at
+        )
+    query = query.where(PredictionJob.user_id == user_id)
+
+    if cursor:
+        created_at, job_id = decode_job_cursor(cursor)
+        query = query.where(or_(
+            PredictionJob.created_at < created_at,
+            and_(PredictionJob.created_at == created_at, PredictionJob.id < job_id)
+        ))
+
+    # Fetch one extra row to know whether another page follows
+    return query.order_by(desc(PredictionJob.created_at), desc(PredictionJob.id)).limit(max(limit, 0) + 1)
+
+
+def _finish_user_jobs_page(result, limit: int, include_input_data: bool) -> Tuple[List[Any], Optional[str]]:
+    """Turn the page query result into (jobs, next_cursor)."""
+    if include_input_data:
+        rows = list(result.scalars())
+    else:
+        rows = [dict(row) for row in result.mappings()]
+
+    limit = max(limit, 0)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        # An empty page has no last row to continue from
+        if rows:
+            last = rows[-1]
+            if include_input_data:
+                next_cursor = encode_job_cursor(last.created_at, last.id)
+            else:
+                next_cursor = encode_job_cursor(last["created_at"], last["id"])
+    return rows, next_cursor
+
+
+def get_user_prediction_jobs_page(
+    db: Session,
+    user_id: str,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_input_data: bool = True
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Get one page of a user's prediction jobs, newest first, using keyset pagination.
+
+    Seeks past ``cursor`` on (created_at, id) instead of using OFFSET, so every
+    page costs the same regardless of depth and is served by the
+    (user_id, created_at, id) index. With ``include_input_data=False`` the
+    heavy input_data column is not loaded and rows are returned as dicts.
+
+    Returns:
+        Tuple[List[Any], Optional[str]]: The jobs and the cursor for the next page,
+        or None when this is the last page
+    """
+    query = _user_jobs_page_query(user_id, limit, cursor, include_input_data)
+    return _finish_user_jobs_page(db.execute(query), limit, include_input_data)
+
+
 def update_prediction_job_status(db: Session, job_id: int, status: str, progress: float = None):
     """Update the status and progress of a prediction job"""
     db_job = db.query(PredictionJob).filter(PredictionJob.id == job_id).first()
@@ -49,9 +139,18 @@ def update_prediction_job_status(db: Session, job_id: int, status: str, progress
         db_job.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(db_job)
+        _publish_job_status(db_job.id, db_job.status, db_job.progress, db_job.updated_at)
     return db_job
 
 
+def _publish_job_status(job_id: int, status: str, progress: Optional[float], updated_at: datetime):
+    """Notify job status subscribers of a committed change."""
+    event = {"id": job_id, "status": status, "updated_at": updated_at}
+    if progress is not None:
+        event["progress"] = progress
+    job_events.publish(job_topic(DB_JOB_TOPIC, job_id), event)
+
+
 def create_prediction_result(db: Session, job_id: int, rank: int, result_data: dict, confidence: float):
     """Create a prediction result for a job"""
     db_result = PredictionResult(
@@ -66,6 +165,78 @@ def create_prediction_result(db: Session, job_id: int, rank: int, result_data: d
     return db_result
 
 
+def bulk_update_job_status(db: Session, updates: List[Dict[str, Any]]) -> int:
+    """
+    Update the status and progress of many jobs in one transaction.
+
+    Each update is a dict with ``id``, ``status`` and optionally ``progress``.
+    When every update sets the same values a single ``UPDATE ... WHERE id IN``
+    is issued; otherwise one executemany UPDATE keyed by primary key. Objects
+    are not refreshed, so callers holding ORM instances should re-query them.
+
+    Returns:
+        int: Number of updates applied
+    """
+    if not updates:
+        return 0
+
+    now = datetime.utcnow()
+    values = {(u["status"], u.get("progress")) for u in updates}
+    if len(values) == 1:
+        status, progress = values.pop()
+        fields = {"status": status, "updated_at": now}
+        if progress is not None:
+            fields["progress"] = progress
+        db.execute(
+            update(PredictionJob)
+            .where(PredictionJob.id.in_([u["id"] for u in updates]))
+            .values(**fields)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        rows = []
+        for u in updates:
+            row = {"id": u["id"], "status": u["status"], "updated_at": now}
+            if u.get("progress") is not None:
+                row["progress"] = u["progress"]
+            rows.append(row)
+        db.execute(update(PredictionJob), rows)
+    db.commit()
+
+    for u in updates:
+        _publish_job_status(u["id"], u["status"], u.get("progress"), now)
+    return len(updates)
+
+
+def bulk_create_prediction_results(db: Session, job_id: int, results: List[Dict[str, Any]]) -> int:
+    """
+    Insert all results for a job with one executemany INSERT in one transaction.
+
+    Each result is a dict with ``rank``, ``result_data`` and ``confidence``.
+    Rows are not refreshed; use get_prediction_results to read them back.
+
+    Returns:
+        int: Number of results inserted
+    """
+    if not results:
+        return 0
+
+    db.execute(
+        insert(PredictionResult),
+        [
+            {
+                "job_id": job_id,
+                "rank": r["rank"],
+                "result_data": r["result_data"],
+                "confidence": r["confidence"],
+            }
+            for r in results
+        ],
+    )
+    db.commit()
+    return len(results)
+
+
 def get_prediction_results(db: Session, job_id: int):
     """Get all results for a prediction job"""
     return db.query(PredictionResult)\
@@ -85,35 +256,74 @@ def delete_prediction_job(db: Session, job_id: int) -> bool:
     return True
 
 
-# Mock functions for development and testing
+# Async counterparts for use with app.db.async_session
 
-def simulate_job_progress(db: Session, job_id: int):
-    """Simulate the progression of a job through various states"""
-    import time
-    import random
-    import threading
+async def create_prediction_job_async(db: AsyncSession, user_id: str, input_type: str, input_data: dict):
+    """Create a new prediction job"""
+    db_job = PredictionJob(
+        user_id=user_id,
+        input_type=input_type,
+        input_data=input_data,
+        status="pending",
+        progress=0.0
+    )
+    db.add(db_job)
+    await db.commit()
+    await db.refresh(db_job)
+    return db_job
 
-    def run_simulation():
-        # Set job to processing
-        update_prediction_job_status(db, job_id, "processing", 0.1)
-        time.sleep(2)
 
-        # Update progress incrementally
-        for progress in [0.25, 0.5, 0.75, 0.9]:
-            time.sleep(random.uniform(1, 3))
-            update_prediction_job_status(db, job_id, "processing", progress)
+async def get_prediction_job_async(db: AsyncSession, job_id: int):
+    """Get a prediction job by ID"""
+    return await db.get(PredictionJob, job_id)
+
+
+async def get_user_prediction_jobs_async(db: AsyncSession, user_id: str, skip: int = 0, limit: int = 100):
+    """Get all prediction jobs for a user"""
+    result = await db.execute(
+        select(PredictionJob)
+        .where(PredictionJob.user_id == user_id)
+        .order_by(desc(PredictionJob.created_at))
+        .offset(skip)
+        .limit(limit)
+    )
+    return list(result.scalars())
+
+
+async def get_user_prediction_jobs_page_async(
+    db: AsyncSession,
+    user_id: str,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_input_data: bool = True
+) -> Tuple[List[Any], Optional[str]]:
+    """Async version of get_user_prediction_jobs_page"""
+    query = _user_jobs_page_query(user_id, limit, cursor, include_input_data)
+    return _finish_user_jobs_page(await db.execute(query), limit, include_input_data)
+
+
+async def get_prediction_results_async(db: AsyncSession, job_id: int):
+    """Get all results for a prediction job"""
+    result = await db.execute(
+        select(PredictionResult)
+        .where(PredictionResult.job_id == job_id)
+        .order_by(PredictionResult.rank)
+    )
+    return list(result.scalars())
+
+
+# Mock functions for development and testing
 
-        # Complete the job
-        time.sleep(random.uniform(1, 2))
-        update_prediction_job_status(db, job_id, "completed", 1.0)
+def simulate_job_progress(db: Optional[Session], job_id: int):
+    """
+    Simulate the progression of a job through various states.
 
-        # Generate mock results
-        generate_mock_results(db, job_id)
+    The transitions are driven by the shared progress scheduler, which opens
+    its own sessions, so ``db`` is not used and may be None.
+    """
+    from app.services.progress_scheduler import progress_scheduler
 
-    # Run the simulation in a separate thread to not block the API
-    thread = threading.Thread(target=run_simulation)
-    thread.daemon = True
-    thread.start()
+    progress_scheduler.schedule(job_id)
 
     return {"message": "Job simulation started"}
 
@@ -125,6 +335,7 @@ def generate_mock_results(db: Session, job_id: int):
         return
 
     result_count = random.randint(3, 7)
+    results = []
     for i in range(result_count):
         confidence = round(random.uniform(0.5, 0.98), 2)
         mock_data = {
@@ -135,4 +346,5 @@ def generate_mock_results(db: Session, job_id: int):
                 "timestamp": datetime.utcnow().isoformat()
             }
         }
-        create_prediction_result(db, job_id, i+1, mock_data, confidence)
\ No newline at end of file
+        results.append({"rank": i+1, "result_data": mock_data, "confidence": confidence})
+    bulk_create_prediction_results(db, job_id, results)
\ No newline at end of file
@@ -0,0 +1,59 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import os
+from dotenv import load_dotenv
+
+# Import the sync URL so both engines point at the same database by default
+from app.db.session import SQLALCHEMY_DATABASE_URL
+from app.db.sqlite import apply_sqlite_profile
+
+# Load environment variables
+load_dotenv()
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL to its async driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return url
+
+
+# Get async SQLAlchemy database URL from environment variable or derive it from DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+
+# Statements running longer than this are cancelled by the database
+STATEMENT_TIMEOUT_SECONDS = float(os.getenv("DB_STATEMENT_TIMEOUT_SECONDS", "30"))
+
+engine_kwargs = {"pool_pre_ping": True}
+connect_args = {}
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    # SQLite has no statement timeout; this bounds how long a statement waits for a lock
+    connect_args = {"timeout": STATEMENT_TIMEOUT_SECONDS}
+else:
+    engine_kwargs.update({
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    })
+    if ASYNC_DATABASE_URL.startswith("postgresql+asyncpg"):
+        connect_args = {
+            "server_settings": {"statement_timeout": str(int(STATEMENT_TIMEOUT_SECONDS * 1000))},
+            "command_timeout": STATEMENT_TIMEOUT_SECONDS,
+        }
+
+# Create async engine
+async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=connect_args, **engine_kwargs)
+apply_sqlite_profile(async_engine.sync_engine, busy_timeout_ms=int(STATEMENT_TIMEOUT_SECONDS * 1000))
+
+# Objects stay usable after commit, so handlers can return them without another round-trip
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+# Function to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -5,6 +5,7 @@ from dotenv import load_dotenv
 
 # Import the Base class
 from app.db.base import Base
+from app.db.sqlite import apply_sqlite_profile
 
 # Load environment variables
 load_dotenv()
@@ -21,6 +22,8 @@ if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args=connect_args
 )
+# WAL and connection pragmas for SQLite (see SQLITE_PROFILE)
+apply_sqlite_profile(engine)
 
 # Create SessionLocal class for creating database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,69 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+import os
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pragmas applied to every new SQLite connection, by profile name.
+# "default" leaves SQLite's own settings alone (rollback journal, full sync).
+SQLITE_PROFILES: Dict[str, Dict[str, str]] = {
+    "default": {},
+    "performance": {
+        # Readers no longer block the writer and vice versa
+        "journal_mode": "WAL",
+        # Safe with WAL: a power loss can lose the last commits but never corrupts the file
+        "synchronous": "NORMAL",
+        # Wait for the write lock instead of failing with "database is locked"
+        "busy_timeout": "5000",
+        "mmap_size": str(256 * 1024 * 1024),
+        # Negative values are KiB, so this is a 64 MiB page cache per connection
+        "cache_size": "-65536",
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def sqlite_pragmas(profile: Optional[str] = None) -> Dict[str, str]:
+    """Return the pragmas for a profile (SQLITE_PROFILE by default), with env overrides."""
+    name = profile or os.getenv("SQLITE_PROFILE", "performance")
+    if name not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE '{name}', expected one of {', '.join(SQLITE_PROFILES)}")
+
+    pragmas = dict(SQLITE_PROFILES[name])
+    busy_timeout = os.getenv("SQLITE_BUSY_TIMEOUT_MS")
+    if busy_timeout:
+        pragmas["busy_timeout"] = busy_timeout
+    mmap_size = os.getenv("SQLITE_MMAP_SIZE")
+    if mmap_size:
+        pragmas["mmap_size"] = mmap_size
+    return pragmas
+
+
+def apply_sqlite_profile(engine: Engine, profile: Optional[str] = None, busy_timeout_ms: Optional[int] = None):
+    """
+    Run the profile's pragmas on every connection the engine opens.
+
+    Does nothing for non-SQLite engines. For async engines pass
+    ``async_engine.sync_engine``. ``busy_timeout_ms`` overrides the
+    profile's lock wait when the profile sets one.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(profile)
+    if busy_timeout_ms is not None and "busy_timeout" in pragmas:
+        pragmas["busy_timeout"] = str(busy_timeout_ms)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    logger.info(f"Applied SQLite profile to {engine.url.database}: {pragmas}")
@@ -13,11 +13,24 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def ensure_indexes(bind) -> None:
+    """
+    Create any missing indexes on existing tables.
+
+    create_all only creates indexes together with new tables, so indexes added
+    to the models later have to be created separately on existing databases.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
 def init_db() -> None:
     """Initialize the database by creating all tables."""
     try:
         # Create tables
         Base.metadata.create_all(bind=engine)
+        ensure_indexes(engine)
         logger.info("Database tables created successfully.")
 
         # Create a session
@@ -1,5 +1,7 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import logging
 import os
 from dotenv import load_dotenv
@@ -16,12 +18,30 @@ load_dotenv()
 
 # Import API router
 from app.api.api import api_router
+from app.services.model_service import model_service
+
+# MODEL_PRELOAD=true loads the model while this module is imported. Under a
+# pre-forking server (gunicorn --preload) that happens once in the master, and
+# the forked workers share the loaded weights' pages copy-on-write.
+if os.getenv("MODEL_PRELOAD", "false").lower() == "true":
+    logger.info("Preloading model before workers fork...")
+    model_service.load()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the model in the background so the API accepts connections right away;
+    # /ready reports when predictions can be served
+    if model_service.start_loading():
+        logger.info("Loading model in the background...")
+    yield
+    model_service.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
     title="MedResAI API",
     description="API for antiviral drug candidate prediction using deep learning",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -53,6 +73,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers only let scripts read response headers that are listed here
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include router
@@ -64,16 +86,13 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is up, whether or not the model has loaded."""
     return {"status": "healthy"}
 
-# Preload model on startup
-@app.on_event("startup")
-async def startup_event():
-    try:
-        from app.services.model_service import model_service
-        logger.info("Preloading model...")
-        # The real model is already initialized in the constructor
-        logger.info("Model preloaded successfully")
-    except Exception as e:
-        logger.error(f"Error preloading model: {str(e)}")
-        logger.error("The application will load the model on the first prediction request")
\ No newline at end of file
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 once the model is loaded, 503 while it loads or after it failed to load."""
+    status = model_service.status
+    if status["status"] != "ready":
+        return JSONResponse(status_code=503, content=status)
+    return status
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+Incremental FASTA/FASTQ parsing for uploaded genome files.
+
+The parser is fed raw byte chunks as they arrive and returns each record as
+soon as it is complete, so an upload is never held in memory as a whole.
+Each sequence line is normalized and validated as a nucleotide sequence with
+app.ml.sequence as it arrives, so errors name the line they occur on.
+"""
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from app.ml.sequence import NUCLEOTIDE, SequenceValidationError, normalize_sequence
+
+
+class SequenceFormatError(ValueError):
+    """Raised when an upload is not valid FASTA/FASTQ."""
+
+    def __init__(self, line_number: int, message: str):
+        self.line_number = line_number
+        super().__init__(f"Line {line_number}: {message}")
+
+
+class SequenceRecord(NamedTuple):
+    id: str
+    description: str
+    sequence: str
+
+
+class SequenceRecordParser:
+    """
+    Push parser for FASTA and FASTQ.
+
+    The format is taken from the first non-empty line (``>`` for FASTA, ``@``
+    for FASTQ). Call ``feed`` with each chunk and ``close`` at the end; both
+    return the records completed so far. Multi-line FASTA sequences and
+    multi-line FASTQ sequence/quality blocks are supported.
+    """
+
+    def __init__(self, max_record_length: Optional[int] = None):
+        self.max_record_length = max_record_length
+        self.format: Optional[str] = None
+        self.line_number = 0
+        # Pieces of a line that has not been terminated yet
+        self._pending: List[bytes] = []
+        self._header: Optional[str] = None
+        self._parts: List[str] = []
+        self._length = 0
+        # FASTQ state: "sequence" until the "+" separator, then "quality"
+        self._fastq_section = "sequence"
+        self._quality_length = 0
+
+    def feed(self, chunk: bytes) -> List[SequenceRecord]:
+        records = []
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            if newline == -1:
+                if start < len(chunk):
+                    self._pending.append(chunk[start:])
+                return records
+            line = chunk[start:newline]
+            if self._pending:
+                # Join only once the line is complete, so long unwrapped lines cost linear time
+                self._pending.append(line)
+                line = b"".join(self._pending)
+                self._pending = []
+            record = self._parse_line(line)
+            if record is not None:
+                records.append(record)
+            start = newline + 1
+
+    def close(self) -> List[SequenceRecord]:
+        records = []
+        if self._pending:
+            record = self._parse_line(b"".join(self._pending))
+            self._pending = []
+            if record is not None:
+                records.append(record)
+        record = self._finish_record(end_of_input=True)
+        if record is not None:
+            records.append(record)
+        return records
+
+    def _parse_line(self, raw: bytes) -> Optional[SequenceRecord]:
+        self.line_number += 1
+        try:
+            line = raw.decode("ascii").rstrip("\r")
+        except UnicodeDecodeError:
+            raise SequenceFormatError(self.line_number, "file is not ASCII text")
+        if not line.strip():
+            return None
+
+        if self.format is None:
+            if line.startswith(">"):
+                self.format = "fasta"
+            elif line.startswith("@"):
+                self.format = "fastq"
+            else:
+                raise SequenceFormatError(self.line_number, "expected a '>' (FASTA) or '@' (FASTQ) header")
+
+        if self.format == "fasta":
+            return self._parse_fasta_line(line)
+        return self._parse_fastq_line(line)
+
+    def _parse_fasta_line(self, line: str) -> Optional[SequenceRecord]:
+        if line.startswith(">"):
+            record = self._finish_record()
+            self._header = line[1:].strip()
+            return record
+        if line.startswith(";"):
+            # Old-style FASTA comment
+            return None
+        self._append(line)
+        return None
+
+    def _parse_fastq_line(self, line: str) -> Optional[SequenceRecord]:
+        if self._header is None:
+            if not line.startswith("@"):
+                raise SequenceFormatError(self.line_number, "expected an '@' record header")
+            self._header = line[1:].strip()
+            return None
+
+        if self._fastq_section == "sequence":
+            if line.startswith("+"):
+                self._fastq_section = "quality"
+            else:
+                self._append(line)
+            return None
+
+        # Quality lines can start with '@', so count characters instead of looking for headers
+        self._quality_length += len(line.strip())
+        if self._quality_length < self._length:
+            return None
+        if self._quality_length > self._length:
+            raise SequenceFormatError(self.line_number, "quality string is longer than the sequence")
+        return self._finish_record()
+
+    def _append(self, line: str):
+        if self._header is None:
+            raise SequenceFormatError(self.line_number, "sequence data before the first header")
+        try:
+            # U is mapped to T on every line, so RNA and mixed records come out consistent
+            residues = normalize_sequence(line, kind=NUCLEOTIDE)
+        except SequenceValidationError as e:
+            raise SequenceFormatError(self.line_number, str(e))
+        self._length += len(residues)
+        if self.max_record_length is not None and self._length > self.max_record_length:
+            raise SequenceFormatError(
+                self.line_number, f"record is longer than {self.max_record_length} residues"
+            )
+        self._parts.append(residues)
+
+    def _finish_record(self, end_of_input: bool = False) -> Optional[SequenceRecord]:
+        if self._header is None:
+            return None
+        if self.format == "fastq" and end_of_input and (
+            self._fastq_section != "quality" or self._quality_length != self._length
+        ):
+            raise SequenceFormatError(self.line_number, "truncated FASTQ record")
+        if not self._length:
+            raise SequenceFormatError(self.line_number, f"record '{self._header}' has no sequence")
+
+        record_id, _, description = self._header.partition(" ")
+        record = SequenceRecord(record_id, description.strip(), "".join(self._parts))
+        self._header = None
+        self._parts = []
+        self._length = 0
+        self._fastq_section = "sequence"
+        self._quality_length = 0
+        return record
+
+
+def iter_records(chunks: Iterable[bytes], max_record_length: Optional[int] = None) -> Iterator[SequenceRecord]:
+    """Parse FASTA/FASTQ from an iterable of byte chunks, yielding records as they complete."""
+    parser = SequenceRecordParser(max_record_length)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
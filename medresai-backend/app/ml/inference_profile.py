@@ -0,0 +1,142 @@
+"""
+Inference profile for loading the model: dtype, quantization, compilation
+and torch thread pools, selected with environment variables.
+
+- MODEL_DTYPE: ``auto`` (float16 on CUDA; on CPU the checkpoint's stored
+  dtype when its weights are memory-mapped, so they stay shared, otherwise
+  float32), ``float16``, ``bfloat16`` or ``float32``. float16 matmuls are
+  slow or unsupported on most CPUs; bfloat16 pays off on CPUs with
+  AVX512-BF16/AMX.
+- MODEL_QUANTIZATION: ``none`` or ``dynamic-int8``, which quantizes the
+  weights of every Linear layer to int8 with activations quantized on the
+  fly. CPU only, and the model is loaded in float32 first.
+- MODEL_COMPILE: ``true`` wraps the model's forward in torch.compile.
+- TORCH_NUM_THREADS / TORCH_INTEROP_THREADS: sizes of torch's intra-op and
+  inter-op thread pools; torch's defaults when unset.
+- MODEL_SELF_BENCHMARK: ``true`` runs a short greedy generation after
+  loading and logs tokens/sec for the active profile.
+"""
+import logging
+import os
+import time
+from typing import NamedTuple, Optional
+
+try:
+    import torch
+    ML_AVAILABLE = True
+except ImportError:
+    ML_AVAILABLE = False
+
+from app.ml.prompts import build_analysis_prompt
+
+logger = logging.getLogger(__name__)
+
+DTYPES = ("float16", "bfloat16", "float32")
+QUANTIZATIONS = ("none", "dynamic-int8")
+
+# Interop threads can only be set once per process, before any parallel work
+_threads_configured = False
+
+
+class InferenceProfile(NamedTuple):
+    dtype: str
+    quantization: str
+    compile: bool
+    num_threads: Optional[int]
+    interop_threads: Optional[int]
+
+    @property
+    def torch_dtype(self):
+        return getattr(torch, self.dtype)
+
+    def describe(self) -> str:
+        return f"dtype={self.dtype} quantization={self.quantization} compile={self.compile} threads={torch.get_num_threads()}"
+
+
+def _optional_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def inference_profile_from_env(device: str, stored_dtype: Optional[str] = None) -> InferenceProfile:
+    """
+    Read the profile for ``device`` ("cuda" or "cpu") from the environment,
+    resolving ``auto``. ``stored_dtype`` is the dtype of memory-mapped
+    checkpoint weights, which ``auto`` keeps.
+    """
+    dtype = os.getenv("MODEL_DTYPE", "auto").lower()
+    quantization = os.getenv("MODEL_QUANTIZATION", "none").lower()
+    if dtype != "auto" and dtype not in DTYPES:
+        raise ValueError(f"MODEL_DTYPE must be auto or one of {', '.join(DTYPES)}, got '{dtype}'")
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"MODEL_QUANTIZATION must be one of {', '.join(QUANTIZATIONS)}, got '{quantization}'")
+
+    if quantization != "none" and device != "cpu":
+        logger.warning(f"MODEL_QUANTIZATION={quantization} is only supported on CPU; ignoring it on {device}")
+        quantization = "none"
+    if dtype == "auto":
+        if stored_dtype in DTYPES:
+            dtype = stored_dtype
+        else:
+            dtype = "float16" if device == "cuda" else "float32"
+    if quantization == "dynamic-int8" and dtype != "float32":
+        # Dynamic quantization converts float32 Linear weights
+        logger.warning(f"MODEL_QUANTIZATION=dynamic-int8 needs float32 weights; loading as float32 instead of {dtype}")
+        dtype = "float32"
+
+    return InferenceProfile(
+        dtype=dtype,
+        quantization=quantization,
+        compile=os.getenv("MODEL_COMPILE", "false").lower() == "true",
+        num_threads=_optional_int("TORCH_NUM_THREADS"),
+        interop_threads=_optional_int("TORCH_INTEROP_THREADS"),
+    )
+
+
+def configure_threads(profile: InferenceProfile):
+    """Size torch's thread pools. Call before the model is loaded."""
+    global _threads_configured
+    if profile.num_threads:
+        torch.set_num_threads(profile.num_threads)
+    if profile.interop_threads and not _threads_configured:
+        try:
+            torch.set_interop_threads(profile.interop_threads)
+        except RuntimeError as e:
+            logger.warning(f"Could not set TORCH_INTEROP_THREADS: {str(e)}")
+    _threads_configured = True
+
+
+def apply_profile(model, profile: InferenceProfile):
+    """Quantize and/or compile a loaded model as the profile asks. Returns the model to use."""
+    model.eval()
+    if profile.quantization == "dynamic-int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info("Applied dynamic int8 quantization to Linear layers")
+    if profile.compile:
+        if hasattr(torch, "compile"):
+            # Prompt and cache lengths change every step, so compile for dynamic shapes
+            model.forward = torch.compile(model.forward, dynamic=True)
+            logger.info("Compiled model forward with torch.compile")
+        else:
+            logger.warning("MODEL_COMPILE=true needs torch 2.0 or newer; running uncompiled")
+    return model
+
+
+def self_benchmark(model, tokenizer, device, profile: InferenceProfile, new_tokens: Optional[int] = None) -> float:
+    """Time a short greedy generation and log tokens/sec for ``profile``. Blocking."""
+    new_tokens = new_tokens or int(os.getenv("MODEL_SELF_BENCHMARK_TOKENS", "32"))
+    inputs = tokenizer(build_analysis_prompt("ACGT" * 16), return_tensors="pt").to(device)
+    kwargs = {
+        "do_sample": False,
+        "max_new_tokens": new_tokens,
+        "min_new_tokens": new_tokens,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    with torch.no_grad():
+        # The first call pays for compilation and allocator warm-up
+        model.generate(**inputs, **{**kwargs, "max_new_tokens": 2, "min_new_tokens": 2})
+        started = time.perf_counter()
+        model.generate(**inputs, **kwargs)
+    tokens_per_second = new_tokens / (time.perf_counter() - started)
+    logger.info(f"Self-benchmark ({profile.describe()}): {tokens_per_second:.1f} tokens/sec")
+    return tokens_per_second
@@ -0,0 +1,134 @@
+"""
+Memory-mapped safetensors loading.
+
+``from_pretrained`` copies every weight into memory the process owns, so
+each worker on a node holds a private copy of the model. Here every
+safetensors file is mapped copy-on-write (``UntypedStorage.from_file`` with
+``shared=False``). The model's parameters are views into those mappings,
+so the weights stay in the OS page cache and every process mapping the same
+files shares the same physical pages. Pages become private only if written,
+which inference never does.
+
+Sharing needs the weights to be used as stored, so MODEL_DTYPE=auto loads
+a memory-mapped checkpoint in its stored dtype. Any other dtype, or dynamic
+quantization, makes private copies, and loading logs a warning.
+"""
+import json
+import logging
+import os
+import struct
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SAFETENSORS_FILE = "model.safetensors"
+SAFETENSORS_INDEX_FILE = "model.safetensors.index.json"
+
+# safetensors dtype names -> torch dtype attribute names
+_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+
+def safetensors_files(model_path: str) -> List[str]:
+    """The safetensors files of a local checkpoint, sharded or not; empty if it has none."""
+    index_path = os.path.join(model_path, SAFETENSORS_INDEX_FILE)
+    if os.path.isfile(index_path):
+        with open(index_path) as f:
+            weight_map = json.load(f)["weight_map"]
+        return [os.path.join(model_path, name) for name in sorted(set(weight_map.values()))]
+    single = os.path.join(model_path, SAFETENSORS_FILE)
+    return [single] if os.path.isfile(single) else []
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """Parse a safetensors header: tensor name -> dtype, shape and data_offsets, plus the data start offset."""
+    with open(path, "rb") as f:
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    header.pop("__metadata__", None)
+    return {"data_start": 8 + length, "tensors": header}
+
+
+def stored_dtype(model_path: str) -> Optional[str]:
+    """
+    The torch dtype name a local checkpoint's floating point weights are
+    stored in, from the safetensors headers alone; None if it has no
+    readable safetensors weights or mixes floating point dtypes.
+    """
+    names = set()
+    try:
+        for path in safetensors_files(model_path):
+            for info in read_header(path)["tensors"].values():
+                if info["dtype"] in ("F64", "F32", "F16", "BF16"):
+                    names.add(_DTYPES[info["dtype"]])
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+    return names.pop() if len(names) == 1 else None
+
+
+def mmap_state_dict(files: List[str]) -> Dict[str, Any]:
+    """Map safetensors files copy-on-write and return tensors viewing the mappings. No weight data is read."""
+    import torch
+
+    state = {}
+    for path in files:
+        parsed = read_header(path)
+        storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=os.path.getsize(path))
+        for name, info in parsed["tensors"].items():
+            dtype = getattr(torch, _DTYPES[info["dtype"]])
+            start, end = info["data_offsets"]
+            offset = parsed["data_start"] + start
+            itemsize = torch.empty((), dtype=dtype).element_size()
+            if offset % itemsize:
+                raise ValueError(f"{name} in {path} is not aligned for {info['dtype']}")
+            tensor = torch.empty(0, dtype=dtype)
+            tensor.set_(storage, offset // itemsize, info["shape"])
+            state[name] = tensor
+    return state
+
+
+def load_mmap_model(model_path: str, torch_dtype):
+    """
+    Build a model from a local safetensors checkpoint with its weights
+    memory-mapped. Raises ValueError when the checkpoint can't be loaded this
+    way, so the caller can fall back to from_pretrained.
+    """
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    try:
+        from accelerate import init_empty_weights
+    except ImportError:
+        raise ValueError("accelerate is not installed")
+
+    files = safetensors_files(model_path)
+    if not files:
+        raise ValueError(f"no safetensors weights in {model_path}")
+    state = mmap_state_dict(files)
+
+    stored = {tensor.dtype for tensor in state.values() if tensor.is_floating_point()}
+    if stored and stored != {torch_dtype}:
+        logger.warning(
+            f"Checkpoint weights are stored as {', '.join(sorted(str(d) for d in stored))}; "
+            f"converting to {torch_dtype} makes private copies instead of sharing the mapping "
+            f"(MODEL_DTYPE=auto keeps the stored dtype)"
+        )
+
+    config = AutoConfig.from_pretrained(model_path, trust_remote_code=True)
+    # Parameters are created on the meta device and replaced by the mapped tensors, so
+    # nothing is allocated or initialized for them; buffers aren't in the checkpoint
+    with init_empty_weights(include_buffers=False):
+        model = AutoModelForCausalLM.from_config(config, torch_dtype=torch_dtype, trust_remote_code=True)
+
+    # assign=True keeps the mapped tensors instead of copying them into the new parameters
+    result = model.load_state_dict(state, strict=False, assign=True)
+    model.tie_weights()
+    tied = {"lm_head.weight"} if getattr(config, "tie_word_embeddings", False) else set()
+    missing = [key for key in result.missing_keys if key not in tied]
+    if missing:
+        raise ValueError(f"checkpoint is missing {len(missing)} weights, e.g. {missing[0]}")
+    if torch_dtype is not None:
+        # No-op for weights already in torch_dtype
+        model = model.to(torch_dtype)
+    return model.eval()
@@ -0,0 +1,294 @@
+"""
+Process-wide registry of loaded models.
+
+ModelService and PredictionService both serve the same fine-tuned
+checkpoint. Instead of each calling from_pretrained, they acquire it from
+this registry, which loads each (path, dtype, quantization) combination once
+and hands out shared, reference-counted LoadedModel objects. A model whose
+last reference is released is dropped so its memory can be freed.
+
+``swap`` loads a new checkpoint (or the current path again, e.g. after the
+files were replaced) while the old one keeps serving, then moves every
+service onto it through their swap listeners. Generations already running
+hold their own reference to the old model and finish on it.
+
+torch and transformers are imported only when a model is loaded, so
+importing this module stays cheap.
+"""
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from app.utils.memory import format_memory_report, memory_report
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[str, float], None]
+
+
+class ModelKey(NamedTuple):
+    path: str
+    dtype: str
+    quantization: str
+
+
+def resolve_model_path(path: str) -> str:
+    """Absolute path for local checkpoints, so different spellings share one entry; hub ids unchanged."""
+    return os.path.abspath(path) if os.path.exists(path) else path
+
+
+def checkpoint_id(path: str) -> str:
+    """
+    Short fingerprint of a local checkpoint's files (names, sizes, mtimes), or
+    the path for hub models. Changes when the checkpoint is replaced in place.
+    """
+    if not os.path.isdir(path):
+        return path
+    digest = hashlib.sha1()
+    for entry in sorted(os.scandir(path), key=lambda e: e.name):
+        if entry.is_file():
+            stat = entry.stat()
+            digest.update(f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:12]
+
+
+def mmap_weights_enabled(device: str, path: str) -> bool:
+    """Whether a model at ``path`` on ``device`` is loaded with memory-mapped weights (MODEL_MMAP_WEIGHTS)."""
+    return device == "cpu" and os.getenv("MODEL_MMAP_WEIGHTS", "true").lower() == "true" and os.path.isdir(path)
+
+
+class LoadedModel:
+    """A model, tokenizer and everything built for them, shared by every holder."""
+
+    def __init__(self, key: ModelKey):
+        self.key = key
+        self.path = key.path
+        self.checkpoint: Optional[str] = None
+        self.model = None
+        self.tokenizer = None
+        self.device = "cpu"
+        self.profile = None
+        self.prefix_cache = None
+        # Draft model for speculative decoding, when DRAFT_MODEL_PATH is set
+        self.speculative = None
+        self.loaded_at: Optional[datetime] = None
+        self.refcount = 0
+        self.error: Optional[str] = None
+        self._ready = threading.Event()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "dtype": self.key.dtype,
+            "quantization": self.key.quantization,
+            "checkpoint": self.checkpoint,
+            "draft_model": self.speculative.draft_path if self.speculative is not None else None,
+            "device": str(self.device),
+            "refcount": self.refcount,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+        }
+
+
+def _load(entry: LoadedModel, report: ProgressCallback):
+    """Load the tokenizer and weights for an entry and apply its inference profile. Blocking."""
+    from transformers import AutoModelForCausalLM
+
+    from app.ml.inference_profile import apply_profile, configure_threads, inference_profile_from_env, self_benchmark
+    from app.ml.mmap_weights import load_mmap_model
+    from app.ml.prefix_cache import build_prefix_cache
+    from app.ml.speculative import build_speculative_decoder
+    from app.ml.tokenizer import load_tokenizer
+
+    profile = entry.profile
+    configure_threads(profile)
+    logger.info(f"Loading model from {entry.path} ({profile.describe()})")
+    entry.checkpoint = checkpoint_id(entry.path)
+
+    # Fast tokenizer when available, falling back to the Python one and then to the base model's
+    report("tokenizer", 0.1)
+    tokenizer = load_tokenizer(entry.path)
+    # Batched generation needs left padding so every prompt ends right before its new tokens
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    report("weights", 0.2)
+    model = None
+    if mmap_weights_enabled(entry.device, entry.path):
+        # Weights stay in the page cache, shared by every worker on the node
+        try:
+            model = load_mmap_model(entry.path, profile.torch_dtype)
+            logger.info("Loaded memory-mapped safetensors weights")
+            if profile.quantization != "none":
+                logger.warning("Quantized Linear weights are private copies; only the other weights stay shared")
+        except Exception as e:
+            logger.warning(f"Memory-mapped loading failed, using from_pretrained: {str(e)}")
+
+    if model is None:
+        try:
+            # Try loading with auto device mapping first; quantization replaces
+            # modules after loading, so quantized models are loaded unmapped
+            model = AutoModelForCausalLM.from_pretrained(
+                entry.path,
+                torch_dtype=profile.torch_dtype,
+                device_map="auto" if profile.quantization == "none" else None,
+                trust_remote_code=True,
+                low_cpu_mem_usage=True
+            )
+        except ValueError as e:
+            if "offload the whole model to the disk" not in str(e):
+                raise
+            logger.info("Model too large for auto device mapping, trying CPU-only loading...")
+            # Fall back to CPU-only loading, with the CPU profile
+            profile = inference_profile_from_env("cpu")
+            model = AutoModelForCausalLM.from_pretrained(
+                entry.path,
+                torch_dtype=profile.torch_dtype,
+                device_map=None,
+                trust_remote_code=True,
+                low_cpu_mem_usage=True
+            )
+            entry.device = "cpu"
+
+    report("optimizing", 0.8)
+    model = apply_profile(model, profile)
+
+    report("prefix_cache", 0.9)
+    prefix_cache = build_prefix_cache(model, tokenizer, entry.device)
+
+    report("draft_model", 0.92)
+    speculative = build_speculative_decoder(model, tokenizer, entry.device, profile)
+
+    if os.getenv("MODEL_SELF_BENCHMARK", "false").lower() == "true":
+        report("self_benchmark", 0.95)
+        try:
+            self_benchmark(model, tokenizer, entry.device, profile)
+        except Exception as e:
+            logger.error(f"Self-benchmark failed: {str(e)}")
+
+    entry.model = model
+    entry.tokenizer = tokenizer
+    entry.profile = profile
+    entry.prefix_cache = prefix_cache
+    entry.speculative = speculative
+    entry.loaded_at = datetime.now()
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # The current model for each key; replaced models stay alive until released
+        self._entries: Dict[ModelKey, LoadedModel] = {}
+        self._held: List[LoadedModel] = []
+        self._swap_listeners: List[Callable[[LoadedModel, LoadedModel], None]] = []
+        # One swap at a time, so two swaps can't move holders in opposite directions
+        self._swap_lock = threading.Lock()
+
+    def acquire(self, path: str, report: Optional[ProgressCallback] = None, reload: bool = False) -> LoadedModel:
+        """
+        Return a reference to the model at ``path`` with the inference profile
+        from the environment, loading it if no holder has it yet. ``reload``
+        loads a fresh copy even if one is loaded; it becomes the current model
+        for its key. Concurrent callers wait for one load. Blocking; pair
+        every call with ``release``.
+        """
+        import torch
+        from app.ml.inference_profile import inference_profile_from_env
+        from app.ml.mmap_weights import stored_dtype
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        path = resolve_model_path(path)
+        # Mapped weights are only shared when used in the dtype they are stored in
+        profile = inference_profile_from_env(device, stored_dtype(path) if mmap_weights_enabled(device, path) else None)
+        key = ModelKey(path, profile.dtype, profile.quantization)
+
+        with self._lock:
+            entry = None if reload else self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = LoadedModel(key)
+                entry.device = device
+                entry.profile = profile
+                # A reload only replaces the current model once it has loaded
+                if not reload:
+                    self._entries[key] = entry
+                self._held.append(entry)
+            entry.refcount += 1
+
+        if owner:
+            try:
+                _load(entry, report or (lambda stage, progress: None))
+            except Exception as e:
+                entry.error = str(e)
+                raise
+            finally:
+                entry._ready.set()
+                if entry.error is not None:
+                    self.release(entry)
+            if reload:
+                with self._lock:
+                    self._entries[key] = entry
+            logger.info(f"Registered model {key.path} ({key.dtype}, {key.quantization}), checkpoint {entry.checkpoint}")
+            logger.info(f"Memory after loading: {format_memory_report(memory_report())}")
+        else:
+            entry._ready.wait()
+            if entry.error is not None:
+                self.release(entry)
+                raise RuntimeError(f"Model failed to load: {entry.error}")
+        return entry
+
+    def retain(self, entry: LoadedModel) -> LoadedModel:
+        """Take another reference to an already acquired model."""
+        with self._lock:
+            entry.refcount += 1
+        return entry
+
+    def release(self, entry: LoadedModel):
+        """Drop a reference; the model is unregistered and freed with its last one."""
+        with self._lock:
+            entry.refcount -= 1
+            if entry.refcount > 0:
+                return
+            if self._entries.get(entry.key) is entry:
+                del self._entries[entry.key]
+            if entry in self._held:
+                self._held.remove(entry)
+        if entry.model is not None:
+            logger.info(f"Unloading model {entry.path} (checkpoint {entry.checkpoint})")
+        entry.model = entry.tokenizer = entry.prefix_cache = entry.speculative = None
+
+    def add_swap_listener(self, listener: Callable[[LoadedModel, LoadedModel], None]):
+        """Register ``listener(old, new)``, called after ``swap`` loads a replacement for ``old``."""
+        with self._lock:
+            self._swap_listeners.append(listener)
+
+    def swap(self, current: LoadedModel, path: Optional[str] = None, report: Optional[ProgressCallback] = None) -> LoadedModel:
+        """
+        Load ``path`` (default: ``current``'s path again) and move the holders
+        of ``current`` onto it. Listeners retain the new model and release the
+        old one; the old model is freed once in-flight work lets go of it.
+        Blocking. Returns the new model.
+        """
+        with self._swap_lock:
+            new = self.acquire(path or current.path, report=report, reload=True)
+            try:
+                with self._lock:
+                    listeners = list(self._swap_listeners)
+                for listener in listeners:
+                    listener(current, new)
+            finally:
+                # Listeners hold their own references; drop the one taken for the swap
+                self.release(new)
+        logger.info(f"Swapped model {current.path} ({current.checkpoint}) for {new.path} ({new.checkpoint})")
+        return new
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"models": [entry.describe() for entry in self._held]}
+
+
+# Create a singleton instance
+model_registry = ModelRegistry()
@@ -0,0 +1,194 @@
+"""
+Reuse of the fixed prompt prefix's key/value cache across generate() calls.
+
+Every analysis prompt starts with the same instruction text
+(ANALYSIS_PROMPT_PREFIX). Its past key/values are computed once when the
+model loads; each generate() call then starts from a copy of them, so only
+the sequence and the instructions after it are prefilled. On CPU the
+prefill is most of the latency for short sequences.
+
+Batched prompts are laid out as ``[prefix][padding][suffix]``: suffixes are
+left-padded against each other and the padding is masked out, so the cached
+prefix is shared by every row. Position ids come from the attention mask, so
+each row's suffix continues right after the prefix.
+"""
+import copy
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+try:
+    import torch
+    ML_AVAILABLE = True
+except ImportError:
+    ML_AVAILABLE = False
+
+from app.ml.prompts import ANALYSIS_PROMPT_PREFIX, build_analysis_prompt
+
+logger = logging.getLogger(__name__)
+
+
+class PromptPrefixCache:
+    """
+    Past key/values of a prompt prefix for one model and tokenizer.
+
+    ``generate`` returns None instead of generating when a prompt doesn't
+    start with the prefix or the model can't resume from the cache, and the
+    caller falls back to generating from the full prompt. A model that fails
+    once is not tried again.
+    """
+
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        device,
+        prefix: str = ANALYSIS_PROMPT_PREFIX,
+        sample_prompt: Optional[str] = None
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.prefix = prefix
+        # A prompt starting with the prefix, used to check where its tokens end
+        self.sample_prompt = sample_prompt or build_analysis_prompt("ACGT")
+        self.enabled = False
+        self._prefix_ids = None
+        self._past_key_values = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._fallbacks = 0
+
+    def build(self):
+        """
+        Run the prefix through the model once and keep its past key/values.
+        Blocking. Raises ValueError if the prefix doesn't end on a token
+        boundary for this tokenizer.
+        """
+        self._check_token_boundary()
+        # Special tokens (e.g. BOS) belong to the start of the prompt, so they go with the prefix
+        prefix_ids = self.tokenizer(self.prefix, return_tensors="pt")["input_ids"].to(self.device)
+        with torch.no_grad():
+            outputs = self.model(input_ids=prefix_ids, use_cache=True)
+        self._prefix_ids = prefix_ids
+        self._past_key_values = outputs.past_key_values
+        self.enabled = True
+
+    def _check_token_boundary(self):
+        """
+        Cached generation feeds the prefix's tokens followed by the suffix's;
+        that is only the prompt a plain generate() call sees if tokenizing the
+        whole prompt gives the same ids.
+        """
+        if not self.sample_prompt.startswith(self.prefix):
+            raise ValueError("Sample prompt does not start with the prefix")
+        prefix_ids = self.tokenizer(self.prefix)["input_ids"]
+        suffix_ids = self.tokenizer(self.sample_prompt[len(self.prefix):], add_special_tokens=False)["input_ids"]
+        if prefix_ids + suffix_ids != self.tokenizer(self.sample_prompt)["input_ids"]:
+            raise ValueError("The prefix tokenizes differently inside a prompt")
+
+    @property
+    def prefix_length(self) -> int:
+        return 0 if self._prefix_ids is None else self._prefix_ids.shape[1]
+
+    def generate(
+        self,
+        prompts: List[str],
+        generation_kwargs: Dict[str, Any],
+        max_length: Optional[int] = None,
+        **extra
+    ):
+        """
+        Generate from ``prompts`` reusing the cached prefix. Blocking.
+
+        ``max_length`` caps prompt tokens, as in tokenizer truncation; the
+        suffix is truncated to fit after the prefix. Extra keyword arguments
+        (e.g. ``streamer``) are passed to generate(). Returns the output ids,
+        which include the full prompt like a plain generate() call, or None
+        when the caller should generate without the cache.
+        """
+        if not self.enabled or not all(prompt.startswith(self.prefix) for prompt in prompts):
+            self._record(hit=False)
+            return None
+
+        suffix_limit = (max_length or self.tokenizer.model_max_length) - self.prefix_length
+        suffixes = self.tokenizer(
+            [prompt[len(self.prefix):] for prompt in prompts],
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=max(1, suffix_limit),
+            add_special_tokens=False
+        ).to(self.device)
+
+        batch_size = len(prompts)
+        prefix_ids = self._prefix_ids.expand(batch_size, -1)
+        input_ids = torch.cat([prefix_ids, suffixes["input_ids"]], dim=1)
+        attention_mask = torch.cat([torch.ones_like(prefix_ids), suffixes["attention_mask"]], dim=1)
+
+        try:
+            with torch.no_grad():
+                outputs = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    past_key_values=self._copy_past_key_values(batch_size),
+                    **generation_kwargs,
+                    **extra
+                )
+        except Exception as e:
+            # Incompatible cache handling fails on the first forward pass, before any token is produced
+            logger.warning(f"Prompt prefix cache disabled after generate() failed: {str(e)}")
+            self.enabled = False
+            self._record(hit=False)
+            return None
+
+        self._record(hit=True)
+        return outputs
+
+    def _copy_past_key_values(self, batch_size: int):
+        """A private copy of the cached key/values with one row per prompt; generate() extends it in place."""
+        past = self._past_key_values
+        if isinstance(past, tuple):
+            # Legacy format: per layer (key, value) tensors of shape (batch, heads, length, head_dim)
+            return tuple(
+                tuple(tensor.expand(batch_size, *tensor.shape[1:]).contiguous() for tensor in layer)
+                for layer in past
+            )
+        past = copy.deepcopy(past)
+        if batch_size > 1:
+            past.batch_repeat_interleave(batch_size)
+        return past
+
+    def _record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._fallbacks += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "prefix_tokens": self.prefix_length,
+                "hits": self._hits,
+                "fallbacks": self._fallbacks,
+            }
+
+
+def build_prefix_cache(model, tokenizer, device) -> Optional[PromptPrefixCache]:
+    """
+    Build the analysis prompt prefix cache for a loaded model, or None when
+    PROMPT_PREFIX_CACHE is off or the model can't produce one.
+    """
+    if os.getenv("PROMPT_PREFIX_CACHE", "true").lower() != "true":
+        return None
+    cache = PromptPrefixCache(model, tokenizer, device)
+    try:
+        cache.build()
+    except Exception as e:
+        logger.warning(f"Could not build the prompt prefix cache: {str(e)}")
+        return None
+    logger.info(f"Prompt prefix cache ready ({cache.prefix_length} tokens)")
+    return cache
@@ -0,0 +1,34 @@
+"""
+Prompt templates shared by the prediction services.
+"""
+import re
+
+# Bump whenever the template text changes so cached results keyed on it are invalidated
+PROMPT_TEMPLATE_VERSION = "1"
+
+ANALYSIS_PROMPT_TEMPLATE = """Analyze the following genome sequence and predict potential antiviral drug candidates:
+
+            Sequence: {sequence}
+
+            Generate detailed predictions including:
+            1. Potential binding sites
+            2. Drug candidate sequences
+            3. Mechanism of action
+            """
+
+# The fixed text every analysis prompt starts with, up to the end of the last
+# word before the sequence. Its key/value cache is computed once per model
+# (see app.ml.prefix_cache). Byte-level BPE tokenizers split a word from the
+# punctuation after it, so the cut falls on a token boundary there, unlike a
+# cut inside the newline and indentation run that BPE merges into one token;
+# the cache checks the boundary for the loaded tokenizer and stays off if the
+# prefix tokenizes differently inside a prompt.
+ANALYSIS_PROMPT_PREFIX = re.match(
+    r".*\w", ANALYSIS_PROMPT_TEMPLATE[:ANALYSIS_PROMPT_TEMPLATE.index("{sequence}")], re.DOTALL
+).group(0)
+
+
+def build_analysis_prompt(sequence: str) -> str:
+    """Build the antiviral analysis prompt for a genome sequence."""
+    return ANALYSIS_PROMPT_TEMPLATE.format(sequence=sequence)
+
@@ -0,0 +1,197 @@
+"""
+Validation and normalization of DNA, RNA and protein sequences.
+
+Sequences are processed as bytes through 256-entry lookup tables, never
+character by character in Python: ``bytes.translate`` applies the
+upper-case table and drops whitespace in one C pass, and deleting an
+alphabet's bytes from the result checks that nothing else is left. Residue
+counts come from one ``np.bincount`` over the bytes, falling back to
+``bytes.count`` without NumPy.
+
+The protein alphabet covers nearly every letter, so auto-detection accepts
+almost any text. Inputs that must be genomes are checked with the
+``nucleotide`` kind, which accepts DNA and RNA only.
+"""
+from typing import Dict, NamedTuple, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DNA_BASES = "ACGT"
+RNA_BASES = "ACGU"
+# IUPAC nucleotide ambiguity codes
+AMBIGUOUS_NUCLEOTIDES = "RYKMSWBDHVN"
+GAP = "-"
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+# Ambiguous or non-standard residues, and the stop symbol
+AMBIGUOUS_AMINO_ACIDS = "BJOUXZ*"
+
+ALPHABETS = {
+    "dna": DNA_BASES + AMBIGUOUS_NUCLEOTIDES + GAP,
+    "rna": RNA_BASES + AMBIGUOUS_NUCLEOTIDES + GAP,
+    "protein": AMINO_ACIDS + AMBIGUOUS_AMINO_ACIDS + GAP,
+}
+# DNA or RNA; the kind genome inputs are validated with
+NUCLEOTIDE = "nucleotide"
+NUCLEOTIDES = "ACGTU" + AMBIGUOUS_NUCLEOTIDES + GAP
+_NUCLEOTIDES = NUCLEOTIDES.encode("ascii")
+_WHITESPACE = b" \t\r\n\v\f"
+
+
+class SequenceValidationError(ValueError):
+    """
+    Raised when a sequence contains characters outside its alphabet.
+
+    ``position`` is the index of the offending character in the normalized
+    sequence, or in the raw input for non-ASCII characters.
+    """
+
+    def __init__(self, message: str, position: Optional[int] = None):
+        self.position = position
+        super().__init__(message)
+
+
+class SequenceAnalysis(NamedTuple):
+    sequence: str
+    kind: str
+    length: int
+    # (G + C) / (A + C + G + T) over unambiguous bases; None for proteins
+    gc_content: Optional[float]
+    ambiguous_count: int
+    composition: Dict[str, int]
+
+
+def _upper_table() -> bytes:
+    table = bytearray(range(256))
+    for code in range(ord("a"), ord("z") + 1):
+        table[code] = code - 32
+    return bytes(table)
+
+
+_UPPER_TABLE = _upper_table()
+_U_TO_T_TABLE = bytes.maketrans(b"U", b"T")
+
+
+def _to_bytes(sequence) -> bytes:
+    if isinstance(sequence, (bytes, bytearray, memoryview)):
+        return bytes(sequence)
+    try:
+        return sequence.encode("ascii")
+    except UnicodeEncodeError as e:
+        raise SequenceValidationError(f"invalid character {sequence[e.start]!r} at position {e.start}", e.start)
+
+
+def _invalid_error(data: bytes, kind: str, alphabet: str, detected: bool) -> SequenceValidationError:
+    invalid = data.translate(None, alphabet.encode("ascii"))[:1]
+    position = data.index(invalid)
+    # A detected kind is only a guess, so don't name it in the message
+    label = "residue" if detected else f"{kind} residue"
+    return SequenceValidationError(
+        f"invalid {label} '{invalid.decode('latin-1')}' at position {position}", position
+    )
+
+
+def _count_residues(normalized: bytes, alphabet: str) -> Dict[str, int]:
+    """Residue counts of a validated sequence, omitting residues that don't occur."""
+    if NUMPY_AVAILABLE:
+        # One pass counts every byte value
+        counts = np.bincount(np.frombuffer(normalized, dtype=np.uint8), minlength=256)
+        composition = {residue: int(counts[ord(residue)]) for residue in alphabet}
+        return {residue: count for residue, count in composition.items() if count}
+
+    composition = {}
+    remaining = len(normalized)
+    # Alphabets list unambiguous residues first, which usually cover the whole
+    # sequence, so the ambiguity codes are rarely scanned for at all
+    for residue in alphabet:
+        if not remaining:
+            break
+        residue_count = normalized.count(residue.encode("ascii"))
+        if residue_count:
+            composition[residue] = residue_count
+            remaining -= residue_count
+    return composition
+
+
+def analyze_sequence(sequence, kind: str = "auto", map_u_to_t: bool = True) -> SequenceAnalysis:
+    """
+    Normalize and validate a sequence and compute its composition.
+
+    Whitespace is removed and letters are upper-cased. ``kind`` is ``dna``,
+    ``rna``, ``protein``, ``nucleotide`` (DNA or RNA, whichever fits) or
+    ``auto`` (detected from the residues present; nucleotide alphabets are
+    preferred). For nucleotide sequences U is mapped to T when
+    ``map_u_to_t`` is set, so RNA and DNA inputs share one canonical form and
+    the reported kind becomes ``dna``. A detected nucleotide sequence that
+    mixes T and U is mapped the same way, and rejected without
+    ``map_u_to_t``.
+
+    Raises:
+        SequenceValidationError: On an empty sequence or a residue outside the alphabet
+    """
+    if kind not in ("auto", NUCLEOTIDE) and kind not in ALPHABETS:
+        raise ValueError(f"Unknown sequence kind '{kind}'")
+    data = _to_bytes(sequence)
+
+    normalized = data.translate(_UPPER_TABLE, _WHITESPACE)
+    if not normalized:
+        raise SequenceValidationError("sequence is empty")
+
+    detected = kind == "auto"
+    alphabet = ALPHABETS.get(kind)
+    if kind in ("auto", NUCLEOTIDE):
+        # Nucleotides win over protein when both alphabets fit
+        if not normalized.translate(None, _NUCLEOTIDES):
+            has_u = b"U" in normalized
+            has_t = b"T" in normalized
+            if has_u and has_t and not map_u_to_t:
+                position = normalized.index(b"U")
+                raise SequenceValidationError(
+                    f"sequence mixes T (DNA) and U (RNA); first U at position {position}", position
+                )
+            kind = "rna" if has_u and not has_t else "dna"
+            alphabet = NUCLEOTIDES
+        elif kind == NUCLEOTIDE:
+            raise _invalid_error(normalized, "nucleotide", NUCLEOTIDES, detected=False)
+        else:
+            kind = "protein"
+            alphabet = ALPHABETS[kind]
+            if normalized.translate(None, alphabet.encode("ascii")):
+                raise _invalid_error(normalized, kind, alphabet, detected)
+    elif normalized.translate(None, alphabet.encode("ascii")):
+        raise _invalid_error(normalized, kind, alphabet, detected)
+
+    composition = _count_residues(normalized, alphabet)
+    length = len(normalized)
+
+    if kind != "protein" and map_u_to_t and "U" in composition:
+        normalized = normalized.translate(_U_TO_T_TABLE)
+        composition["T"] = composition.get("T", 0) + composition.pop("U")
+        kind = "dna"
+
+    if kind == "protein":
+        gc_content = None
+        ambiguous = AMBIGUOUS_AMINO_ACIDS
+    else:
+        acgt = sum(composition.get(base, 0) for base in "ACGTU")
+        gc = composition.get("G", 0) + composition.get("C", 0)
+        gc_content = gc / acgt if acgt else None
+        ambiguous = AMBIGUOUS_NUCLEOTIDES
+    ambiguous_count = sum(composition.get(residue, 0) for residue in ambiguous)
+
+    return SequenceAnalysis(
+        sequence=normalized.decode("ascii"),
+        kind=kind,
+        length=length,
+        gc_content=gc_content,
+        ambiguous_count=ambiguous_count,
+        composition=composition,
+    )
+
+
+def normalize_sequence(sequence, kind: str = "auto") -> str:
+    """Return the canonical form of a sequence; see analyze_sequence."""
+    return analyze_sequence(sequence, kind).sequence
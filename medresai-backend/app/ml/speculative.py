@@ -0,0 +1,149 @@
+"""
+Speculative (assisted) decoding with a small draft model.
+
+On CPU, generation time is dominated by one forward pass of the main model
+per new token. With a draft model loaded from DRAFT_MODEL_PATH, each
+generate() call for a single prompt passes it as ``assistant_model``. The
+draft proposes a few tokens, and the main model checks them all in one
+forward pass. It keeps the tokens it agrees with plus one of its own. Greedy
+outputs are unchanged. With sampling, a proposal is kept only where it
+matches the main model's own sample, so the output distribution is the main
+model's.
+
+The draft must use the main model's token ids. Drafts whose tokenizer maps
+tokens differently are not loaded.
+
+The speedup depends on how often the draft is right. The acceptance rate is
+reported in the metrics. It counts proposals, which are draft forward
+passes, and verification passes of the main model. Every verification adds
+the accepted tokens plus one. transformers only supports assisted generation
+for one sequence at a time, so batches of several prompts use plain
+generation.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import torch
+    ML_AVAILABLE = True
+except ImportError:
+    ML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeDecoder:
+    """A draft model paired with a main model, and counters of how well it predicts it."""
+
+    def __init__(self, model, tokenizer, draft_model, draft_path: str):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.draft_model = draft_model
+        self.draft_path = draft_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generations = 0
+        self._new_tokens = 0
+        self._verify_passes = 0
+        self._draft_passes = 0
+        self._seconds = 0.0
+        # Forward hooks count the passes of the generate() call running on the current thread
+        model.register_forward_hook(self._count("verify"))
+        draft_model.register_forward_hook(self._count("draft"))
+
+    def _count(self, kind: str):
+        def hook(module, inputs, outputs):
+            counts = getattr(self._local, "counts", None)
+            if counts is not None:
+                counts[kind] += 1
+        return hook
+
+    def generate(self, inputs: Dict[str, Any], generation_kwargs: Dict[str, Any], **extra):
+        """generate() for one tokenized prompt with the draft model assisting. Blocking."""
+        self._local.counts = {"verify": 0, "draft": 0}
+        started = time.perf_counter()
+        try:
+            with torch.no_grad():
+                outputs = self.model.generate(**inputs, **generation_kwargs, assistant_model=self.draft_model, **extra)
+        finally:
+            counts = self._local.counts
+            self._local.counts = None
+        seconds = time.perf_counter() - started
+
+        with self._lock:
+            self._generations += 1
+            self._new_tokens += outputs.shape[1] - inputs["input_ids"].shape[1]
+            self._verify_passes += counts["verify"]
+            self._draft_passes += counts["draft"]
+            self._seconds += seconds
+        return outputs
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            accepted = max(0, self._new_tokens - self._verify_passes)
+            return {
+                "enabled": True,
+                "draft_model": self.draft_path,
+                "num_assistant_tokens": self.draft_model.generation_config.num_assistant_tokens,
+                "generations": self._generations,
+                "new_tokens": self._new_tokens,
+                "proposed_tokens": self._draft_passes,
+                "accepted_tokens": accepted,
+                "acceptance_rate": accepted / self._draft_passes if self._draft_passes else 0.0,
+                "tokens_per_verify_pass": self._new_tokens / self._verify_passes if self._verify_passes else 0.0,
+                "tokens_per_second": self._new_tokens / self._seconds if self._seconds else 0.0,
+            }
+
+
+def shares_token_ids(tokenizer, draft_tokenizer) -> bool:
+    """
+    Whether every token both tokenizers know has the same id in each, i.e.
+    they differ at most by tokens added on one side.
+    """
+    vocab = tokenizer.get_vocab()
+    draft_vocab = draft_tokenizer.get_vocab()
+    smaller, larger = (vocab, draft_vocab) if len(vocab) <= len(draft_vocab) else (draft_vocab, vocab)
+    return all(larger.get(token) == token_id for token, token_id in smaller.items())
+
+
+def build_speculative_decoder(model, tokenizer, device, profile) -> Optional[SpeculativeDecoder]:
+    """
+    Load the draft model from DRAFT_MODEL_PATH with the main model's inference
+    profile, or return None when it isn't set, can't be loaded or doesn't
+    share the main model's token ids.
+    """
+    draft_path = os.getenv("DRAFT_MODEL_PATH")
+    if not draft_path:
+        return None
+
+    from transformers import AutoModelForCausalLM
+
+    from app.ml.inference_profile import apply_profile
+    from app.ml.tokenizer import load_tokenizer
+
+    try:
+        draft_tokenizer = load_tokenizer(draft_path)
+        if not shares_token_ids(tokenizer, draft_tokenizer):
+            logger.warning(f"Draft model {draft_path} uses different token ids than the model, generating without it")
+            return None
+        draft_model = AutoModelForCausalLM.from_pretrained(
+            draft_path,
+            torch_dtype=profile.torch_dtype,
+            trust_remote_code=True,
+            low_cpu_mem_usage=True
+        ).to(device).eval()
+        draft_model = apply_profile(draft_model, profile)
+    except Exception as e:
+        logger.warning(f"Could not load draft model {draft_path}, generating without it: {str(e)}")
+        return None
+
+    # Tokens proposed per round; "heuristic" adapts the count to how many get accepted
+    draft_model.generation_config.num_assistant_tokens = int(os.getenv("DRAFT_NUM_TOKENS", "5"))
+    draft_model.generation_config.num_assistant_tokens_schedule = os.getenv("DRAFT_TOKENS_SCHEDULE", "heuristic")
+
+    decoder = SpeculativeDecoder(model, tokenizer, draft_model, draft_path)
+    logger.info(f"Speculative decoding with draft model {draft_path}")
+    return decoder
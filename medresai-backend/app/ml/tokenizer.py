@@ -0,0 +1,72 @@
+"""
+Tokenizer loading shared by the prediction services.
+
+The fast (Rust) tokenizer is used when the model has one, falling back to the
+Python tokenizer when it can't be built. A fast tokenizer without a
+``tokenizer.json`` is converted from the slow one on every load, which is
+slow; the converted tokenizer is saved next to the model so later starts
+read it directly.
+"""
+import logging
+import os
+
+try:
+    from transformers import AutoTokenizer
+    ML_AVAILABLE = True
+except ImportError:
+    ML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+BASE_TOKENIZER = "deepseek-ai/deepseek-coder-1.3b-base"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+def _from_pretrained(path: str, use_fast: bool):
+    return AutoTokenizer.from_pretrained(path, trust_remote_code=True, use_fast=use_fast)
+
+
+def _load(path: str, use_fast: bool):
+    if use_fast:
+        try:
+            # Returns the Python tokenizer when the model has no fast one
+            return _from_pretrained(path, use_fast=True)
+        except Exception as e:
+            logger.warning(f"Failed to load fast tokenizer from {path}, using the Python tokenizer: {str(e)}")
+    return _from_pretrained(path, use_fast=False)
+
+
+def persist_fast_tokenizer(tokenizer, model_path: str):
+    """Save a fast tokenizer's ``tokenizer.json`` in a local model directory that lacks one."""
+    if not getattr(tokenizer, "is_fast", False) or not os.path.isdir(model_path):
+        return
+    path = os.path.join(model_path, TOKENIZER_FILE)
+    if os.path.exists(path):
+        return
+    try:
+        # Write then rename so a concurrent load never reads a partial file
+        partial = f"{path}.{os.getpid()}.tmp"
+        tokenizer.backend_tokenizer.save(partial)
+        os.replace(partial, path)
+        logger.info(f"Saved fast tokenizer to {path}")
+    except Exception as e:
+        logger.warning(f"Could not save {path}: {str(e)}")
+
+
+def load_tokenizer(model_path: str):
+    """
+    Load the tokenizer for ``model_path``, falling back to the base model's.
+
+    TOKENIZER_USE_FAST=false forces the Python tokenizer.
+    """
+    use_fast = os.getenv("TOKENIZER_USE_FAST", "true").lower() == "true"
+    try:
+        tokenizer = _load(model_path, use_fast)
+        persist_fast_tokenizer(tokenizer, model_path)
+    except Exception as e:
+        logger.warning(f"Failed to load tokenizer from {model_path}: {str(e)}")
+        logger.info("Attempting to load from base model...")
+        tokenizer = _load(BASE_TOKENIZER, use_fast)
+        logger.info("Successfully loaded tokenizer from base model")
+    logger.info(f"Loaded {'fast' if tokenizer.is_fast else 'Python'} tokenizer {type(tokenizer).__name__}")
+    return tokenizer
@@ -0,0 +1,85 @@
+"""
+Overlapping windows for sequences longer than the model context.
+
+A long genome is split into fixed-size windows that overlap, so a feature
+spanning a window boundary is still seen whole by one window. Each window is
+predicted on its own and the per-window texts are merged back into one
+result, with "Position X-Y" references re-based from window to genome
+coordinates.
+"""
+import re
+from typing import Any, Dict, List, NamedTuple
+
+# Matches "Position 245-267" and "position 245 - 267"
+_POSITION_RANGE = re.compile(r"(Position\s+)(\d+)(\s*-\s*)(\d+)", re.IGNORECASE)
+
+
+class Window(NamedTuple):
+    # 0-based start, exclusive end, in genome coordinates
+    start: int
+    end: int
+    sequence: str
+
+
+def split_windows(sequence: str, window_size: int, overlap: int) -> List[Window]:
+    """
+    Split a sequence into windows of ``window_size`` residues, each sharing
+    at least ``overlap`` residues with the next. Every window is full length
+    and the last one ends at the end of the sequence. Short sequences give
+    one window.
+    """
+    if window_size < 1:
+        raise ValueError("window_size must be at least 1")
+    if not 0 <= overlap < window_size:
+        raise ValueError("overlap must be at least 0 and smaller than window_size")
+
+    if len(sequence) <= window_size:
+        return [Window(0, len(sequence), sequence)]
+
+    # Fewest windows that cover the sequence with at least ``overlap`` shared
+    # residues, spread evenly so the extra overlap is shared out
+    step = window_size - overlap
+    count = -(-(len(sequence) - overlap) // step)
+    span = len(sequence) - window_size
+    starts = [round(i * span / (count - 1)) for i in range(count)]
+    return [Window(start, start + window_size, sequence[start:start + window_size]) for start in starts]
+
+
+def rebase_positions(text: str, window: Window) -> str:
+    """Shift "Position X-Y" ranges in a window's prediction to 1-based genome coordinates."""
+    length = window.end - window.start
+
+    def shift(match):
+        first, last = int(match.group(2)), int(match.group(4))
+        # Leave ranges that can't refer to this window untouched rather than invent coordinates
+        if not 1 <= first <= last <= length:
+            return match.group(0)
+        return f"{match.group(1)}{first + window.start}{match.group(3)}{last + window.start}"
+
+    return _POSITION_RANGE.sub(shift, text)
+
+
+def merge_window_predictions(windows: List[Window], predictions: List[str]) -> Dict[str, Any]:
+    """
+    Combine per-window predictions into one result.
+
+    Returns the merged prediction text (one section per window, positions
+    re-based), the window coordinates, and the distinct position ranges
+    found, sorted by genome position. Ranges reported by two overlapping
+    windows are listed once.
+    """
+    sections = []
+    ranges = set()
+    for number, (window, prediction) in enumerate(zip(windows, predictions), start=1):
+        rebased = rebase_positions(prediction, window)
+        sections.append(f"### Window {number} (positions {window.start + 1}-{window.end})\n\n{rebased.strip()}")
+        for match in _POSITION_RANGE.finditer(rebased):
+            first, last = int(match.group(2)), int(match.group(4))
+            if window.start < first <= last <= window.end:
+                ranges.add((first, last))
+
+    return {
+        "prediction": "\n\n".join(sections),
+        "windows": [{"start": window.start + 1, "end": window.end} for window in windows],
+        "positions": [{"start": first, "end": last} for first, last in sorted(ranges)],
+    }
@@ -0,0 +1,3 @@
+"""
+SQLAlchemy models for MedResAI.
+"""
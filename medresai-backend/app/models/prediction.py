@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class PredictionJob(Base):
+    """A prediction job submitted by a user"""
+    __tablename__ = "prediction_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, index=True)
+    input_type = Column(String, nullable=False)
+    input_data = Column(JSON, nullable=False)
+    status = Column(String, default="pending")
+    progress = Column(Float, default=0.0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    results = relationship("PredictionResult", back_populates="job", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Serves the per-user job listing: filter on user_id, newest first, with
+        # (created_at, id) as the keyset pagination cursor
+        Index("ix_prediction_jobs_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+
+class PredictionResult(Base):
+    """A single ranked result of a prediction job"""
+    __tablename__ = "prediction_results"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("prediction_jobs.id"), nullable=False)
+    rank = Column(Integer)
+    result_data = Column(JSON, nullable=False)
+    confidence = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    job = relationship("PredictionJob", back_populates="results")
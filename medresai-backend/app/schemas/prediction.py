@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+from app.ml.sequence import NUCLEOTIDE, normalize_sequence
+
 
 class PredictionJobBase(BaseModel):
     """Base model for prediction jobs"""
@@ -11,7 +13,13 @@ class PredictionJobBase(BaseModel):
 
 class PredictionJobCreate(PredictionJobBase):
     """Model for creating a new prediction job"""
-    pass
+
+    @model_validator(mode="after")
+    def normalize_sequence_input(self):
+        """Validate and normalize the sequence of sequence jobs before it is stored."""
+        if self.input_type == "sequence" and isinstance(self.input_data.get("sequence"), str):
+            self.input_data["sequence"] = normalize_sequence(self.input_data["sequence"], kind=NUCLEOTIDE)
+        return self
 
 
 class PredictionJobResponse(PredictionJobBase):
@@ -27,6 +35,20 @@ class PredictionJobResponse(PredictionJobBase):
         from_attributes = True
 
 
+class PredictionJobSummary(BaseModel):
+    """Model for prediction job list entries without the input data"""
+    id: int
+    user_id: str
+    input_type: str
+    status: str
+    progress: float
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class PredictionJobUpdate(BaseModel):
     status: Optional[str] = None
     progress: Optional[float] = None
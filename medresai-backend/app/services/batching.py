@@ -0,0 +1,181 @@
+"""
+Dynamic micro-batching for model inference.
+
+Requests that arrive within a short window are grouped into a single batch so
+that one ``generate`` call serves several callers at once.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.inference_executor import InferenceExecutor, InferenceQueueFull
+
+logger = logging.getLogger(__name__)
+
+
+class BatchMetrics:
+    """Running counters describing how the batcher is behaving."""
+
+    def __init__(self, max_batch_size: int):
+        self.batches = 0
+        self.items = 0
+        self.failed_batches = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_batch_time = 0.0
+        self.batch_size_histogram = {size: 0 for size in range(1, max_batch_size + 1)}
+
+    def record(self, batch_size: int, queue_waits: List[float], batch_time: float, failed: bool = False):
+        self.batches += 1
+        self.items += batch_size
+        if failed:
+            self.failed_batches += 1
+        self.total_queue_wait += sum(queue_waits)
+        self.max_queue_wait = max([self.max_queue_wait] + queue_waits)
+        self.total_batch_time += batch_time
+        self.batch_size_histogram[batch_size] = self.batch_size_histogram.get(batch_size, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_size_histogram": dict(self.batch_size_histogram),
+            "avg_queue_wait_ms": 1000 * self.total_queue_wait / self.items if self.items else 0.0,
+            "max_queue_wait_ms": 1000 * self.max_queue_wait,
+            "avg_batch_time_ms": 1000 * self.total_batch_time / self.batches if self.batches else 0.0,
+        }
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many coroutines and processes them in batches.
+
+    A batch is dispatched as soon as ``max_batch_size`` items are waiting or
+    ``max_wait_ms`` has elapsed since the first item of the batch arrived,
+    whichever comes first. ``process_batch`` is a blocking callable that takes
+    a list of items and returns one result per item, in order; it is run on
+    the inference executor so new requests keep queueing while a batch is
+    generating. Up to one batch per executor worker is in flight at a time.
+
+    At most ``max_queue_size`` items may wait for a batch; further submissions
+    raise InferenceQueueFull so the API can answer 503 instead of piling up,
+    or with ``wait=True`` wait until an item leaves the queue.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        executor: InferenceExecutor,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 20.0,
+        max_queue_size: int = 64,
+        name: str = "batcher",
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.process_batch = process_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self.name = name
+        self.metrics = BatchMetrics(max_batch_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        # One per item the queue still has room for
+        self._room: Optional[asyncio.Semaphore] = None
+
+    def _ensure_worker(self):
+        """Start the background batching task on the running event loop."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._room = asyncio.Semaphore(self.max_queue_size)
+            self._slots = asyncio.Semaphore(self.executor.max_workers)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item: Any, wait: bool = False) -> Any:
+        """
+        Queue an item for the next batch and wait for its result. A full
+        queue raises InferenceQueueFull, or with ``wait`` is waited on.
+        """
+        self._ensure_worker()
+        if not wait and self._room.locked():
+            raise InferenceQueueFull(self.executor.retry_after, f"{self.name} queue is full")
+        await self._room.acquire()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future, float]]:
+        """Wait for the first item, then gather more until the batch is full or the window closes."""
+        batch = [await self._queue.get()]
+        self._room.release()
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+            self._room.release()
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free executor worker before collecting, so items keep
+            # accumulating into the next batch while all workers are busy
+            await self._slots.acquire()
+            batch = await self._collect()
+            # Callers that gave up while queued don't need a slot in the batch
+            batch = [entry for entry in batch if not entry[1].cancelled()]
+            if not batch:
+                self._slots.release()
+                continue
+            loop.create_task(self._execute(batch))
+
+    async def _execute(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        started = time.perf_counter()
+        queue_waits = [started - enqueued_at for _, _, enqueued_at in batch]
+        items = [item for item, _, _ in batch]
+        try:
+            # Items were admitted at submit(), so the executor limit is not applied again
+            results = await self.executor.run(self.process_batch, items, enforce_limit=False)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name}: expected {len(items)} results, got {len(results)}"
+                )
+        except Exception as e:
+            logger.error(f"{self.name}: batch of {len(items)} failed: {str(e)}")
+            self.metrics.record(len(items), queue_waits, time.perf_counter() - started, failed=True)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        self.metrics.record(len(items), queue_waits, time.perf_counter() - started)
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = self.metrics.to_dict()
+        metrics.update({
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue_size": self.max_queue_size,
+            "queue_depth": self.queue_depth,
+        })
+        return metrics
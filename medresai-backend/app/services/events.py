@@ -0,0 +1,164 @@
+"""
+In-process publish/subscribe for job status changes.
+
+Code that changes a job's status publishes the new fields on the job's topic;
+subscription endpoints stream them to clients as Server-Sent Events instead of
+clients polling the status endpoints. Publishing is thread-safe: events are
+handed to each subscriber's event loop with ``call_soon_threadsafe``, so the
+progress scheduler thread and executor threads can publish directly.
+
+Events only reach subscribers in the same process. Streams therefore re-read
+the job whenever nothing has been published for a keepalive interval, which
+also picks up changes made by prediction workers or other API processes.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+from app.services.job_store import TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Topic namespaces, one per kind of job id
+PREDICTION_JOB_TOPIC = "prediction"      # PredictionService jobs
+DB_JOB_TOPIC = "prediction_job"          # Rows of the prediction_jobs table
+SUPABASE_JOB_TOPIC = "supabase_job"      # Jobs stored in Supabase
+
+
+def job_topic(kind: str, job_id: Any) -> str:
+    return f"{kind}:{job_id}"
+
+
+class Subscription:
+    """Queue of events for one subscriber, bound to the event loop that created it."""
+
+    def __init__(self, bus: "JobEventBus", topic: str, max_queue_size: int):
+        self.bus = bus
+        self.topic = topic
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+
+    def _deliver(self, event: Dict[str, Any]):
+        """Runs on the subscriber's loop. A slow subscriber loses its oldest events, not the newest."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for the next event; None if ``timeout`` seconds pass without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JobEventBus:
+    def __init__(self, max_queue_size: Optional[int] = None):
+        self.max_queue_size = max_queue_size or int(os.getenv("JOB_EVENTS_QUEUE_SIZE", "100"))
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._published = 0
+        self._delivered = 0
+
+    def subscribe(self, topic: str) -> Subscription:
+        """Subscribe to a topic. Must be called from a running event loop."""
+        subscription = Subscription(self, topic, self.max_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    def publish(self, topic: str, event: Dict[str, Any]):
+        """Send ``event`` to every subscriber of ``topic``. Safe to call from any thread; never raises."""
+        with self._lock:
+            self._published += 1
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, dict(event))
+                with self._lock:
+                    self._delivered += 1
+            except RuntimeError:
+                # The subscriber's loop has closed; it will never read again
+                self._unsubscribe(subscription)
+            except Exception as e:
+                logger.error(f"Error publishing job event on {topic}: {str(e)}")
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "topics": len(self._subscribers),
+                "subscribers": sum(len(s) for s in self._subscribers.values()),
+                "published": self._published,
+                "delivered": self._delivered,
+            }
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def format_sse(event_type: str, data: Dict[str, Any]) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, default=_json_default)}\n\n"
+
+
+async def job_event_stream(
+    topic: str,
+    load_job: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    keepalive_seconds: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """
+    Stream a job's state as SSE ``status`` events until it completes or fails.
+
+    The current state is sent first, then the job with each published change
+    applied. ``load_job`` is called again after ``keepalive_seconds`` without
+    events; if nothing changed a comment line keeps the connection open.
+    """
+    keepalive = keepalive_seconds or float(os.getenv("JOB_EVENTS_KEEPALIVE_SECONDS", "15"))
+    # Subscribe before the first read so no change between the two is missed
+    with job_events.subscribe(topic) as subscription:
+        job = await load_job()
+        last = None
+        while job is not None:
+            if job != last:
+                yield format_sse("status", job)
+                last = job
+            if job.get("status") in TERMINAL_STATUSES:
+                return
+
+            event = await subscription.get(keepalive)
+            if event is not None:
+                job = {**last, **event}
+                continue
+
+            job = await load_job()
+            if job == last:
+                yield ": keepalive\n\n"
+
+
+# Create a singleton instance
+job_events = JobEventBus()
@@ -0,0 +1,108 @@
+"""
+Bounded executor for blocking model calls.
+
+Tokenization and ``generate`` are CPU/GPU bound and block the calling thread.
+Every model call goes through this executor so the event loop stays free to
+serve ``/health``, ``/status`` and other routes while inference runs, and so
+work beyond a fixed backlog is rejected instead of piling up.
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference backlog is full and the caller should retry later."""
+
+    def __init__(self, retry_after: int, message: str = "Inference queue is full"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Thread pool with a bounded backlog for model calls.
+
+    PyTorch releases the GIL inside its kernels, so a thread pool gives real
+    parallelism for ``generate`` while sharing a single copy of the weights.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue_size: Optional[int] = None,
+        retry_after: Optional[int] = None,
+    ):
+        self.max_workers = max_workers or int(os.getenv("INFERENCE_WORKERS", "1"))
+        self.max_queue_size = max_queue_size if max_queue_size is not None else int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))
+        self.retry_after = retry_after or int(os.getenv("INFERENCE_RETRY_AFTER", "5"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        """Calls that may be running or waiting at once."""
+        return self.max_workers + self.max_queue_size
+
+    def is_full(self) -> bool:
+        with self._lock:
+            return self._pending >= self.capacity
+
+    def check_capacity(self):
+        """Raise InferenceQueueFull if a new call would not be admitted."""
+        if self.is_full():
+            with self._lock:
+                self._rejected += 1
+            raise InferenceQueueFull(self.retry_after)
+
+    async def run(self, fn: Callable[..., Any], *args, enforce_limit: bool = True, **kwargs) -> Any:
+        """
+        Run a blocking callable on the inference pool and await its result.
+
+        Args:
+            fn: Blocking callable to run
+            enforce_limit (bool): Reject with InferenceQueueFull when the backlog is full.
+                Callers that already applied their own admission control pass False.
+
+        Returns:
+            Any: Whatever ``fn`` returns
+        """
+        with self._lock:
+            if enforce_limit and self._pending >= self.capacity:
+                self._rejected += 1
+                raise InferenceQueueFull(self.retry_after)
+            self._pending += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue_size": self.max_queue_size,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+# Create a singleton instance
+inference_executor = InferenceExecutor()
@@ -0,0 +1,455 @@
+"""
+Multi-process inference pool.
+
+A single process runs one model under one GIL, which leaves most cores of a
+large CPU node idle. The pool starts N worker processes. Each is pinned to
+its own slice of cores, with the torch thread count set to the slice size,
+and each loads the model itself. Worker processes are spawned, not forked, so
+nothing from the API process's threads leaks into them. With memory-mapped
+weights (MODEL_MMAP_WEIGHTS) every worker maps the same checkpoint pages, so
+adding workers adds compute without adding a copy of the model.
+
+Batches go to the worker with the fewest batches in flight. Prompts and
+generations travel over a pipe per worker. Payloads of INFERENCE_POOL_SHM_MIN_BYTES
+(default 1 MiB) or more are written to a shared memory block instead, and
+only the block's name goes through the pipe. Prompts of typical size are
+cheaper to send inline than to give a block of their own. Each worker updates a heartbeat from a separate
+thread. A supervisor thread in the API process reads the responses and
+checks the workers. The heartbeat keeps beating while generate() is stuck,
+so the supervisor also times the batch each worker is running: a worker
+still on one batch after INFERENCE_POOL_GENERATION_TIMEOUT, or still loading
+after INFERENCE_POOL_START_TIMEOUT, is killed like one whose heartbeat
+stopped. A worker that dies after it was ready is restarted. Batches in
+flight on a dead worker fail with an error instead of hanging.
+
+A worker is set up by a "module:function" callable, imported inside the
+worker, which returns the blocking batch function it serves.
+"""
+import importlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import connection, shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.inference_executor import InferenceQueueFull
+
+logger = logging.getLogger(__name__)
+
+STARTING = 0
+READY = 1
+FAILED = 2
+STOPPED = 3
+
+_STATE_NAMES = {STARTING: "starting", READY: "ready", FAILED: "failed", STOPPED: "stopped"}
+
+HEARTBEAT_INTERVAL = 1.0
+
+
+def _pack(obj: Any, min_shm_bytes: int) -> Tuple[tuple, Optional[shared_memory.SharedMemory]]:
+    """Encode ``obj`` for the pipe: inline, or in a new shared memory block for large payloads."""
+    data = json.dumps(obj).encode()
+    if len(data) < min_shm_bytes:
+        return ("inline", data), None
+    block = shared_memory.SharedMemory(create=True, size=len(data))
+    block.buf[:len(data)] = data
+    return ("shm", block.name, len(data)), block
+
+
+def _unpack(ref: tuple, unlink: bool = False) -> Any:
+    """Decode a payload from ``_pack``; ``unlink`` frees its shared memory block once read."""
+    if ref[0] == "inline":
+        return json.loads(ref[1])
+    block = shared_memory.SharedMemory(name=ref[1])
+    try:
+        data = bytes(block.buf[:ref[2]])
+    finally:
+        block.close()
+        if unlink:
+            block.unlink()
+    return json.loads(data)
+
+
+def _free(block: Optional[shared_memory.SharedMemory]):
+    if block is not None:
+        block.close()
+        block.unlink()
+
+
+def split_cores(cores: List[int], num_workers: int, cores_per_worker: Optional[int] = None) -> List[List[int]]:
+    """Contiguous, disjoint core slices, one per worker; slices are reused round-robin if cores run out."""
+    per_worker = cores_per_worker or max(1, len(cores) // num_workers)
+    slices = [cores[start:start + per_worker] for start in range(0, len(cores) - per_worker + 1, per_worker)]
+    return [slices[index % len(slices)] for index in range(num_workers)]
+
+
+def _heartbeat(value, stopping: threading.Event):
+    while not stopping.is_set():
+        value.value = time.time()
+        stopping.wait(HEARTBEAT_INTERVAL)
+
+
+def _worker_main(index: int, cores: List[int], setup: str, conn, state, heartbeat, min_shm_bytes: int):
+    """Entry point of a worker process: pin, load through ``setup`` and serve batches until told to stop."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    stopping = threading.Event()
+    threading.Thread(target=_heartbeat, args=(heartbeat, stopping), daemon=True).start()
+
+    # Pin before torch is imported, so its thread pools are sized for this slice
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    threads = str(max(1, len(cores)))
+    os.environ["INFERENCE_POOL_WORKER"] = str(index)
+    os.environ["TORCH_NUM_THREADS"] = threads
+    os.environ["TORCH_INTEROP_THREADS"] = "1"
+    os.environ["OMP_NUM_THREADS"] = threads
+
+    try:
+        module_name, _, function_name = setup.partition(":")
+        process_batch = getattr(importlib.import_module(module_name), function_name)()
+    except Exception as e:
+        logger.error(f"Inference worker {index}: setup failed: {str(e)}")
+        state.value = FAILED
+        stopping.set()
+        return
+    state.value = READY
+    logger.info(f"Inference worker {index} (pid {os.getpid()}) ready on cores {cores}")
+
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            request_id, ref = message
+            try:
+                payload = _unpack(ref)
+                reply, _ = _pack(process_batch(payload), min_shm_bytes)
+                conn.send((request_id, True, reply))
+            except Exception as e:
+                conn.send((request_id, False, ("inline", json.dumps(str(e)).encode())))
+    except (EOFError, KeyboardInterrupt):
+        # The API process went away
+        pass
+    finally:
+        state.value = STOPPED
+        stopping.set()
+
+
+class _Worker:
+    """The API process's view of one worker process."""
+
+    def __init__(self, index: int, cores: List[int]):
+        self.index = index
+        self.cores = cores
+        self.process = None
+        self.conn = None
+        self.send_lock = threading.Lock()
+        self.state = None
+        self.heartbeat = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.last_dispatch = 0.0
+        # When the worker last replied, i.e. started the batch it is on now (monotonic)
+        self.last_reply = 0.0
+        self.started_at = 0.0
+        # Set once the worker failed to start and won't be restarted
+        self.retired = False
+
+    def heartbeat_age(self) -> Optional[float]:
+        if self.heartbeat is None or not self.heartbeat.value:
+            return None
+        return time.time() - self.heartbeat.value
+
+    def describe(self) -> Dict[str, Any]:
+        age = self.heartbeat_age()
+        return {
+            "index": self.index,
+            "pid": self.process.pid if self.process is not None else None,
+            "cores": self.cores,
+            "state": _STATE_NAMES.get(self.state.value, "unknown") if self.state is not None else "not_started",
+            "alive": self.process is not None and self.process.is_alive(),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "restarts": self.restarts,
+            "heartbeat_age_seconds": round(age, 3) if age is not None else None,
+        }
+
+
+class InferencePool:
+    """
+    Worker processes serving a blocking ``List[str] -> List[str]`` batch
+    function, with least-loaded routing and health supervision.
+    """
+
+    def __init__(
+        self,
+        setup: str,
+        num_workers: int,
+        cores_per_worker: Optional[int] = None,
+        heartbeat_timeout: Optional[float] = None,
+        min_shm_bytes: Optional[int] = None,
+        retry_after: int = 5,
+        generation_timeout: Optional[float] = None,
+        start_timeout: Optional[float] = None,
+    ):
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        self.setup = setup
+        self.num_workers = num_workers
+        self.heartbeat_timeout = heartbeat_timeout or float(os.getenv("INFERENCE_POOL_HEARTBEAT_TIMEOUT", "30"))
+        self.min_shm_bytes = min_shm_bytes if min_shm_bytes is not None else int(os.getenv("INFERENCE_POOL_SHM_MIN_BYTES", "1048576"))
+        self.retry_after = retry_after
+        self.generation_timeout = generation_timeout or float(os.getenv("INFERENCE_POOL_GENERATION_TIMEOUT", "600"))
+        self.start_timeout = start_timeout or float(os.getenv("INFERENCE_POOL_START_TIMEOUT", "1800"))
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.workers = [_Worker(index, slice_) for index, slice_ in enumerate(split_cores(cores, num_workers, cores_per_worker))]
+        # Spawned workers start clean instead of inheriting the API process's threads and locks
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        # request id -> (worker, future, shared memory block of the request, monotonic dispatch time)
+        self._pending: Dict[int, Tuple[_Worker, Future, Optional[shared_memory.SharedMemory], float]] = {}
+        self._shm_payloads = 0
+        self._supervisor: Optional[threading.Thread] = None
+        self._closing = False
+
+    def start(self):
+        """Spawn the workers and the supervisor thread. Workers load in the background."""
+        with self._lock:
+            if self._supervisor is not None:
+                return
+            for worker in self.workers:
+                self._spawn(worker)
+            self._supervisor = threading.Thread(target=self._supervise, name="inference-pool-supervisor", daemon=True)
+            self._supervisor.start()
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = self._context.Pipe()
+        worker.conn = parent_conn
+        worker.state = self._context.Value("i", STARTING, lock=False)
+        worker.heartbeat = self._context.Value("d", 0.0, lock=False)
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(worker.index, worker.cores, self.setup, child_conn, worker.state, worker.heartbeat, self.min_shm_bytes),
+            name=f"inference-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.started_at = time.monotonic()
+        worker.process.start()
+        child_conn.close()
+        logger.info(f"Started inference worker {worker.index} (pid {worker.process.pid}) on cores {worker.cores}")
+
+    def wait_ready(self, report: Optional[Callable[[str, float], None]] = None) -> bool:
+        """
+        Block until every worker has finished starting. Returns True if at
+        least one is ready. Workers still loading after start_timeout are
+        killed by the supervisor, which bounds the wait.
+        """
+        while True:
+            states = [worker.state.value for worker in self.workers]
+            ready = states.count(READY)
+            if report is not None:
+                report("workers", 0.1 + 0.9 * ready / self.num_workers)
+            if STARTING not in states or all(not worker.process.is_alive() for worker in self.workers):
+                return ready > 0
+            time.sleep(0.5)
+
+    @property
+    def ready_workers(self) -> int:
+        return sum(1 for worker in self.workers if self._is_healthy(worker))
+
+    def _is_healthy(self, worker: _Worker) -> bool:
+        if worker.state is None or worker.state.value != READY or worker.conn is None or not worker.process.is_alive():
+            return False
+        age = worker.heartbeat_age()
+        return age is not None and age < self.heartbeat_timeout
+
+    def submit(self, prompts: List[str]) -> Future:
+        """Send a batch to the least-loaded healthy worker; the future resolves to its generations."""
+        return self._dispatch(prompts)[0]
+
+    def _dispatch(self, prompts: List[str]) -> Tuple[Future, int]:
+        """Send a batch as submit() does; also return its request id."""
+        future = Future()
+        with self._lock:
+            candidates = [worker for worker in self.workers if self._is_healthy(worker)]
+            if not candidates:
+                raise InferenceQueueFull(self.retry_after, "No inference worker is available")
+            worker = min(candidates, key=lambda w: (w.in_flight, w.last_dispatch))
+            request_id = next(self._ids)
+            ref, block = _pack(prompts, self.min_shm_bytes)
+            if block is not None:
+                self._shm_payloads += 1
+            self._pending[request_id] = (worker, future, block, time.monotonic())
+            worker.in_flight += 1
+            worker.last_dispatch = time.perf_counter()
+            conn = worker.conn
+        try:
+            with worker.send_lock:
+                conn.send((request_id, ref))
+        except (OSError, ValueError) as e:
+            self._resolve(request_id, error=RuntimeError(f"Inference worker {worker.index} is unreachable: {str(e)}"))
+        return future, request_id
+
+    def generate(self, prompts: List[str]) -> List[str]:
+        """
+        Run a batch on a worker process. Blocking. The supervisor fails a
+        batch whose worker times out; the wait here is bounded as well, by
+        a generation timeout for each batch queued on the pool.
+        """
+        future, request_id = self._dispatch(prompts)
+        with self._lock:
+            batches = max(1, len(self._pending))
+        timeout = batches * self.generation_timeout + self.heartbeat_timeout
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._resolve(request_id, error=TimeoutError(f"No generation from the inference pool after {timeout:.0f}s"))
+            return future.result()
+
+    def _resolve(self, request_id: int, result: Any = None, error: Optional[Exception] = None):
+        with self._lock:
+            entry = self._pending.pop(request_id, None)
+            if entry is None:
+                return
+            worker, future, block, _ = entry
+            worker.in_flight -= 1
+            if error is None:
+                worker.completed += 1
+            else:
+                worker.failed += 1
+        _free(block)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def _supervise(self):
+        """Read responses and restart workers that died or stopped sending heartbeats."""
+        next_check = time.monotonic()
+        while not self._closing:
+            conns = {worker.conn: worker for worker in self.workers if worker.conn is not None}
+            for conn in connection.wait(list(conns), timeout=HEARTBEAT_INTERVAL):
+                worker = conns[conn]
+                try:
+                    request_id, ok, ref = conn.recv()
+                except (EOFError, OSError):
+                    # The process is gone; the health check below handles it
+                    worker.conn = None
+                    continue
+                worker.last_reply = time.monotonic()
+                try:
+                    payload = _unpack(ref, unlink=True)
+                except Exception as e:
+                    self._resolve(request_id, error=RuntimeError(f"Unreadable reply from inference worker {worker.index}: {str(e)}"))
+                    continue
+                if ok:
+                    self._resolve(request_id, result=payload)
+                else:
+                    self._resolve(request_id, error=RuntimeError(payload))
+
+            if time.monotonic() >= next_check and not self._closing:
+                next_check = time.monotonic() + HEARTBEAT_INTERVAL
+                for worker in self.workers:
+                    self._check(worker)
+
+    def _check(self, worker: _Worker):
+        if worker.process.is_alive():
+            age = worker.heartbeat_age()
+            if worker.state.value == READY and age is not None and age > self.heartbeat_timeout:
+                logger.error(f"Inference worker {worker.index}: no heartbeat for {age:.0f}s, killing it")
+                worker.process.kill()
+            elif worker.state.value == READY:
+                running = self._running_seconds(worker)
+                if running is not None and running > self.generation_timeout:
+                    logger.error(f"Inference worker {worker.index}: batch running for {running:.0f}s, killing it")
+                    self._fail_pending(worker, TimeoutError(
+                        f"Inference worker {worker.index} did not finish a batch within {self.generation_timeout:.0f}s"
+                    ))
+                    worker.process.kill()
+            elif worker.state.value == STARTING and time.monotonic() - worker.started_at > self.start_timeout:
+                logger.error(f"Inference worker {worker.index}: still loading after {self.start_timeout:.0f}s, killing it")
+                worker.process.kill()
+            return
+        if worker.retired:
+            return
+
+        self._fail_pending(worker, RuntimeError(f"Inference worker {worker.index} exited with code {worker.process.exitcode}"))
+        if worker.conn is not None:
+            worker.conn.close()
+            worker.conn = None
+        if worker.state.value in (STARTING, FAILED):
+            # Loading failed or crashed; a restart would most likely do the same
+            logger.error(f"Inference worker {worker.index} failed to start (exit code {worker.process.exitcode})")
+            worker.state.value = FAILED
+            worker.retired = True
+            return
+        logger.warning(f"Inference worker {worker.index} (pid {worker.process.pid}) exited with code {worker.process.exitcode}, restarting")
+        worker.restarts += 1
+        self._spawn(worker)
+
+    def _running_seconds(self, worker: _Worker) -> Optional[float]:
+        """
+        How long the worker has been on its current batch, or None when it is
+        idle. Workers take batches in order, so the current one started at
+        the later of the oldest dispatch and the last reply.
+        """
+        with self._lock:
+            dispatched = [entry[3] for entry in self._pending.values() if entry[0] is worker]
+            if not dispatched:
+                return None
+            return time.monotonic() - max(min(dispatched), worker.last_reply)
+
+    def _fail_pending(self, worker: _Worker, error: Exception):
+        with self._lock:
+            request_ids = [request_id for request_id, entry in self._pending.items() if entry[0] is worker]
+        for request_id in request_ids:
+            self._resolve(request_id, error=error)
+
+    def close(self, timeout: float = 10.0):
+        """Stop the workers, failing any batches still in flight."""
+        self._closing = True
+        if self._supervisor is not None:
+            self._supervisor.join(timeout=2 * HEARTBEAT_INTERVAL)
+        for worker in self.workers:
+            if worker.conn is not None:
+                try:
+                    with worker.send_lock:
+                        worker.conn.send(None)
+                except (OSError, ValueError):
+                    pass
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            self._fail_pending(worker, RuntimeError("Inference pool is shutting down"))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            workers = [worker.describe() for worker in self.workers]
+            pending = len(self._pending)
+            shm_payloads = self._shm_payloads
+        return {
+            "workers": workers,
+            "ready_workers": sum(1 for worker in workers if worker["state"] == "ready" and worker["alive"]),
+            "pending": pending,
+            "shm_payloads": shm_payloads,
+            "shm_min_bytes": self.min_shm_bytes,
+            "heartbeat_timeout_seconds": self.heartbeat_timeout,
+            "generation_timeout_seconds": self.generation_timeout,
+            "start_timeout_seconds": self.start_timeout,
+        }
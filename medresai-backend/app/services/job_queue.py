@@ -0,0 +1,193 @@
+"""
+Durable prediction job queue backed by SQLite.
+
+The queue lives in a single SQLite file in WAL mode so it needs no external
+services, survives restarts and can be shared by the API process and any
+number of worker processes on the same host (``python -m app.worker``).
+
+Workers lease jobs in batches. A lease hides the job from other workers for
+a visibility timeout; if the worker dies without completing it, the job
+becomes visible again and is retried until ``max_attempts`` is reached.
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prediction_queue (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    available_at REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_prediction_queue_status_available
+    ON prediction_queue (status, available_at);
+"""
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+class SQLiteJobQueue:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        visibility_timeout: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+    ):
+        self.path = path or os.getenv("JOB_QUEUE_PATH", "queue/prediction_queue.db")
+        self.visibility_timeout = visibility_timeout or float(os.getenv("JOB_QUEUE_VISIBILITY_TIMEOUT", "300"))
+        self.max_attempts = max_attempts or int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", "3"))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv("JOB_QUEUE_RETRY_DELAY", "5"))
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection per operation so the queue is safe across threads and processes."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a job to the queue and return it in API job format."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO prediction_queue "
+                "(id, payload, status, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, 'pending', ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), self.max_attempts, now, now, now),
+            )
+        return self.get(job_id)
+
+    def lease(self, worker_id: str, batch_size: int = 1, visibility_timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Claim up to ``batch_size`` runnable jobs for ``worker_id``.
+
+        Runnable jobs are pending jobs whose retry delay has passed and
+        processing jobs whose lease expired. Returns dicts with ``id``,
+        ``payload`` and ``attempts``.
+        """
+        now = time.time()
+        expires_at = now + (visibility_timeout or self.visibility_timeout)
+        with self._connect() as conn:
+            # BEGIN IMMEDIATE takes the write lock up front so two workers can't claim the same rows
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases that have used up their attempts are failed instead of re-leased
+                conn.execute(
+                    "UPDATE prediction_queue SET status = 'failed', error = 'Lease expired after final attempt', "
+                    "lease_owner = NULL, updated_at = ? "
+                    "WHERE status = 'processing' AND lease_expires_at <= ? AND attempts >= max_attempts",
+                    (now, now),
+                )
+                rows = conn.execute(
+                    "SELECT id, payload, attempts FROM prediction_queue "
+                    "WHERE (status = 'pending' AND available_at <= ?) "
+                    "OR (status = 'processing' AND lease_expires_at <= ?) "
+                    "ORDER BY id LIMIT ?",
+                    (now, now, batch_size),
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE prediction_queue SET status = 'processing', attempts = attempts + 1, "
+                    "lease_owner = ?, lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                    [(worker_id, expires_at, now, row["id"]) for row in rows],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return [
+            {"id": row["id"], "payload": json.loads(row["payload"]), "attempts": row["attempts"] + 1}
+            for row in rows
+        ]
+
+    def extend_lease(self, job_ids: List[str], worker_id: str, visibility_timeout: Optional[float] = None):
+        """Push back the lease expiry of jobs still being worked on."""
+        now = time.time()
+        expires_at = now + (visibility_timeout or self.visibility_timeout)
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE prediction_queue SET lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'processing'",
+                [(expires_at, now, job_id, worker_id) for job_id in job_ids],
+            )
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Mark a leased job completed. Returns False if the lease was lost to another worker."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE prediction_queue SET status = 'completed', result = ?, error = NULL, "
+                "lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'processing'",
+                (json.dumps(result), now, job_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """
+        Record a failed attempt. The job is retried after ``retry_delay``
+        seconds until it has been attempted ``max_attempts`` times.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE prediction_queue SET "
+                "status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END, "
+                "available_at = ?, error = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'processing'",
+                (now + self.retry_delay, error, now, job_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job in the same shape as PredictionService jobs, or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM prediction_queue WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        payload = json.loads(row["payload"])
+        return {
+            "id": row["id"],
+            "input_sequence": payload.get("sequence"),
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": _isoformat(row["created_at"]),
+            "updated_at": _isoformat(row["updated_at"]),
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM prediction_queue GROUP BY status").fetchall())
+        return {"path": self.path, "jobs_by_status": counts}
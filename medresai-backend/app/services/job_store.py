@@ -0,0 +1,218 @@
+"""
+Storage for asynchronous prediction jobs.
+
+Jobs are plain dicts (id, input_sequence, status, result, error, timestamps).
+The in-memory store keeps active jobs resident and evicts finished ones after
+a retention window or once a size cap is reached, spilling them to disk so
+status lookups still work after eviction. Spilled jobs are deleted in turn
+after their own retention window or beyond their own cap.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+SPILL_SUFFIX = ".job.json"
+# The spill directory is pruned after this many spills
+SPILL_PRUNE_INTERVAL = 100
+
+_SAFE_JOB_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class JobStore(ABC):
+    """Interface for prediction job storage."""
+
+    @abstractmethod
+    def create(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a new job. ``job["id"]`` must be unique."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the job, or None if it is unknown."""
+
+    @abstractmethod
+    def update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """Update fields of a job and refresh ``updated_at``. Returns the updated job."""
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {}
+
+
+class InMemoryJobStore(JobStore):
+    """
+    Job store that keeps memory bounded.
+
+    Completed and failed jobs stay in memory for ``retention_seconds`` and at
+    most ``max_jobs`` finished jobs are kept; past either limit the oldest
+    finished jobs are written to ``spill_dir`` and dropped from memory.
+    Pending and processing jobs are never evicted. ``get`` transparently
+    reads spilled jobs back from disk without re-admitting them to memory.
+    Spilled jobs are deleted ``spill_retention_seconds`` after they were
+    spilled, and beyond ``spill_max_jobs`` the oldest are deleted.
+    """
+
+    def __init__(
+        self,
+        retention_seconds: Optional[float] = None,
+        max_jobs: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        spill_retention_seconds: Optional[float] = None,
+        spill_max_jobs: Optional[int] = None,
+    ):
+        self.retention_seconds = retention_seconds if retention_seconds is not None else float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+        self.max_jobs = max_jobs if max_jobs is not None else int(os.getenv("JOB_STORE_MAX_JOBS", "1000"))
+        self.spill_dir = spill_dir if spill_dir is not None else os.getenv("JOB_SPILL_DIR", "predictions")
+        self.spill_retention_seconds = (
+            spill_retention_seconds if spill_retention_seconds is not None
+            else float(os.getenv("JOB_SPILL_RETENTION_SECONDS", "604800"))
+        )
+        self.spill_max_jobs = spill_max_jobs if spill_max_jobs is not None else int(os.getenv("JOB_SPILL_MAX_JOBS", "10000"))
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # Finished job ids in the order they finished, with the time they finished
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self._rehydrated = 0
+        self._spill_deleted = 0
+        self._spills_since_prune = 0
+        self._prune_spilled()
+
+    def create(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+            if job.get("status") in TERMINAL_STATUSES:
+                self._finished[job["id"]] = time.monotonic()
+            self._evict()
+            return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        return self._load_spilled(job_id)
+
+    def update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields)
+            job["updated_at"] = datetime.now().isoformat()
+            if job.get("status") in TERMINAL_STATUSES and job_id not in self._finished:
+                self._finished[job_id] = time.monotonic()
+            self._evict()
+            return dict(job)
+
+    def _evict(self):
+        """Drop finished jobs past the retention window or size cap. Caller holds the lock."""
+        now = time.monotonic()
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if len(self._finished) <= self.max_jobs and now - finished_at < self.retention_seconds:
+                break
+            self._finished.popitem(last=False)
+            job = self._jobs.pop(job_id, None)
+            if job is not None:
+                self._spill(job)
+                self._evicted += 1
+
+    def _spill_path(self, job_id: str) -> Optional[str]:
+        if not _SAFE_JOB_ID.match(job_id):
+            return None
+        return os.path.join(self.spill_dir, f"{job_id}{SPILL_SUFFIX}")
+
+    def _spill(self, job: Dict[str, Any]):
+        path = self._spill_path(job["id"])
+        if path is None:
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(job, f)
+        except Exception as e:
+            logger.error(f"Error spilling job {job['id']} to disk: {str(e)}")
+            return
+        self._spills_since_prune += 1
+        if self._spills_since_prune >= SPILL_PRUNE_INTERVAL:
+            self._prune_spilled()
+
+    def _prune_spilled(self):
+        """
+        Delete spilled jobs past the spill retention window, then the oldest
+        beyond spill_max_jobs. Caller holds the lock, except from __init__.
+        """
+        self._spills_since_prune = 0
+        try:
+            spilled = sorted(
+                (entry.stat().st_mtime, entry.path)
+                for entry in os.scandir(self.spill_dir)
+                if entry.is_file() and entry.name.endswith(SPILL_SUFFIX)
+            )
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Error listing spilled jobs in {self.spill_dir}: {str(e)}")
+            return
+        cutoff = time.time() - self.spill_retention_seconds
+        excess = len(spilled) - self.spill_max_jobs
+        # Oldest first, so expired and excess files form a prefix of the list
+        for index, (spilled_at, path) in enumerate(spilled):
+            if spilled_at >= cutoff and index >= excess:
+                break
+            try:
+                os.remove(path)
+                self._spill_deleted += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Error deleting spilled job {path}: {str(e)}")
+
+    def _load_spilled(self, job_id: str) -> Optional[Dict[str, Any]]:
+        path = self._spill_path(job_id)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            if time.time() - os.path.getmtime(path) > self.spill_retention_seconds:
+                os.remove(path)
+                with self._lock:
+                    self._spill_deleted += 1
+                return None
+            with open(path) as f:
+                job = json.load(f)
+            with self._lock:
+                self._rehydrated += 1
+            return job
+        except FileNotFoundError:
+            # Pruned since the existence check
+            return None
+        except Exception as e:
+            logger.error(f"Error reading spilled job {job_id}: {str(e)}")
+            return None
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "resident_jobs": len(self._jobs),
+                "resident_finished_jobs": len(self._finished),
+                "evicted": self._evicted,
+                "rehydrated": self._rehydrated,
+                "spill_deleted": self._spill_deleted,
+                "retention_seconds": self.retention_seconds,
+                "max_jobs": self.max_jobs,
+                "spill_retention_seconds": self.spill_retention_seconds,
+                "spill_max_jobs": self.spill_max_jobs,
+            }
@@ -0,0 +1,123 @@
+"""
+Background model loading behind a load state machine.
+
+Loading weights takes from seconds to minutes, so services don't load at
+import time. The API starts loading on a background thread from its lifespan
+hook and accepts connections straight away; workers and lazily loaded
+services call ``load`` and wait. The state moves ``not_loaded`` ->
+``loading`` -> ``ready`` or ``failed``, with the current stage, progress and
+timing reported by /predict/status and gating the /ready probe.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelLoader:
+    """Runs ``load_fn`` once, on a background thread or the caller's, and tracks its progress."""
+
+    def __init__(self, name: str, load_fn: Callable[[], None]):
+        self.name = name
+        self._load_fn = load_fn
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.status = NOT_LOADED
+        self.stage: Optional[str] = None
+        self.progress = 0.0
+        self.error: Optional[str] = None
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._started: Optional[float] = None
+        self._load_seconds: Optional[float] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == READY
+
+    @property
+    def is_loading(self) -> bool:
+        return self.status == LOADING
+
+    def _begin(self) -> bool:
+        """Move to ``loading`` if nothing has started yet; True if the caller should run the load."""
+        with self._lock:
+            if self.status != NOT_LOADED:
+                return False
+            self.status = LOADING
+            self.stage = "starting"
+            self.started_at = datetime.now()
+            self._started = time.perf_counter()
+            return True
+
+    def start(self) -> bool:
+        """Start loading on a background thread. Returns False if a load already started."""
+        if not self._begin():
+            return False
+        threading.Thread(target=self._run, name=f"{self.name}-loader", daemon=True).start()
+        return True
+
+    def load(self, timeout: Optional[float] = None) -> bool:
+        """
+        Load on the calling thread, or wait for a load already in progress.
+        Blocking. Returns True once the model is ready.
+        """
+        if self._begin():
+            self._run()
+        else:
+            self._done.wait(timeout)
+        return self.is_ready
+
+    def _run(self):
+        logger.info(f"{self.name}: loading")
+        try:
+            self._load_fn()
+        except Exception as e:
+            with self._lock:
+                self.status = FAILED
+                self.error = str(e)
+            logger.error(f"{self.name}: load failed after {self._elapsed():.1f}s: {str(e)}")
+        else:
+            with self._lock:
+                self.status = READY
+                self.stage = None
+                self.progress = 1.0
+            logger.info(f"{self.name}: ready after {self._elapsed():.1f}s")
+        finally:
+            with self._lock:
+                self.finished_at = datetime.now()
+                self._load_seconds = self._elapsed()
+            self._done.set()
+
+    def report(self, stage: str, progress: float):
+        """Record the stage a running load has reached and its rough fraction done."""
+        with self._lock:
+            self.stage = stage
+            self.progress = progress
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self._started if self._started is not None else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "status": self.status,
+                "is_loading": self.status == LOADING,
+                "stage": self.stage,
+                "progress": self.progress,
+                "error": self.error,
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+                # Running time while loading, total time once finished
+                "load_seconds": self._load_seconds if self._load_seconds is not None else (
+                    self._elapsed() if self._started is not None else None
+                ),
+            }
@@ -1,91 +1,184 @@
 import os
+import asyncio
+import importlib.util
+import queue
+import threading
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, AsyncIterator, Optional
 from datetime import datetime
 
-# Try to import ML libraries, fall back to mock if not available
-try:
-    import torch
-    from transformers import AutoModelForCausalLM, AutoTokenizer, PreTrainedTokenizer
-    ML_AVAILABLE = True
-except ImportError:
-    ML_AVAILABLE = False
+from app.ml.model_registry import LoadedModel, checkpoint_id, model_registry, resolve_model_path
+from app.ml.prompts import build_analysis_prompt
+from app.ml.sequence import NUCLEOTIDE, normalize_sequence
+from app.services.batching import MicroBatcher
+from app.services.inference_executor import InferenceExecutor, inference_executor
+from app.services.inference_pool import InferencePool
+from app.services.model_loading import ModelLoader
+from app.services.result_cache import result_cache
+from app.utils.memory import memory_report
+
+# torch and transformers take seconds to import, so they are imported by
+# _import_ml_libraries on the loader thread rather than with this module,
+# letting the API start serving while the model loads
+ML_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ("torch", "transformers"))
+if not ML_AVAILABLE:
     print("Warning: PyTorch/Transformers not available. Using mock implementation.")
 
+torch = None
+
+
+def _import_ml_libraries():
+    """Import torch and the transformers classes used here into the module namespace."""
+    global torch, StoppingCriteriaList, TextIteratorStreamer, CancellationCriteria
+    import torch
+    from transformers import (
+        StoppingCriteria,
+        StoppingCriteriaList,
+        TextIteratorStreamer,
+    )
+
+    class CancellationCriteria(StoppingCriteria):
+        """Stops generation once the given event is set, e.g. when a streaming client disconnects."""
+
+        def __init__(self, event: threading.Event):
+            self.event = event
+
+        def __call__(self, input_ids, scores, **kwargs) -> bool:
+            return self.event.is_set()
+
+MODEL_VERSION = "DeepSeek-R1-Distill-Qwen-1.5B-finetuned"
+
+# Returned by _next_stream_chunk when no token arrived within the poll interval
+_STREAM_TIMEOUT = object()
+
 class ModelService:
     def __init__(self):
         self.ml_available = ML_AVAILABLE
-        if self.ml_available:
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.model = None
-            self.tokenizer = None
-            self.initialize_model()
-        else:
-            self.device = "cpu"
-            self.model = None
-            self.tokenizer = None
+        # Key/values of the fixed prompt prefix, built once the model loads
+        self.prefix_cache = None
+        # Draft model decoder for single-prompt generations, when DRAFT_MODEL_PATH is set
+        self.speculative = None
+        self.inference_profile = None
+        # The device is picked once torch is imported by initialize_model
+        self.device = "cpu"
+        self.model = None
+        self.tokenizer = None
+        # The shared registry entry the attributes above come from
+        self.handle: Optional[LoadedModel] = None
+        # Held while the handle is read and retained, or replaced by a swap
+        self._handle_lock = threading.Lock()
+        if not self.ml_available:
             print("Using mock model service - ML libraries not available")
+        # Nothing is loaded until start_loading() or load() is called, e.g. from the app lifespan
+        self.loader = ModelLoader("antiviral-model", self.initialize_model)
+        model_registry.add_swap_listener(self._on_model_swap)
+
+        # With INFERENCE_POOL_WORKERS > 0, batches run on that many model worker
+        # processes instead of this one, which then only loads the tokenizer.
+        # A pool worker itself always generates in-process.
+        pool_workers = int(os.getenv("INFERENCE_POOL_WORKERS") or "0")
+        self.pool: Optional[InferencePool] = None
+        self.pool_checkpoint: Optional[str] = None
+        if self.ml_available and pool_workers > 0 and os.getenv("INFERENCE_POOL_WORKER") is None:
+            self.pool = InferencePool(
+                "app.services.model_service:_pool_worker_setup",
+                pool_workers,
+                cores_per_worker=int(os.getenv("INFERENCE_POOL_CORES_PER_WORKER") or "0") or None,
+                retry_after=inference_executor.retry_after,
+            )
+
+        # Concurrent predict_antiviral calls are grouped into shared generate() calls;
+        # with a pool, one batch per worker process is in flight
+        self.batcher = MicroBatcher(
+            self._generate_batch,
+            InferenceExecutor(max_workers=pool_workers) if self.pool is not None else inference_executor,
+            max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "8")),
+            max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "20")),
+            max_queue_size=int(os.getenv("BATCH_MAX_QUEUE_SIZE", "64")),
+            name="antiviral-batcher",
+        )
+
+    @property
+    def status(self) -> Dict[str, Any]:
+        """Load state: status (not_loaded, loading, ready or failed), stage, progress and timing."""
+        return self.loader.snapshot()
+
+    def start_loading(self) -> bool:
+        """Start loading the model on a background thread; False if loading already started."""
+        return self.loader.start()
+
+    def load(self) -> bool:
+        """Load the model on this thread, or wait for a load in progress. Blocking; True once ready."""
+        return self.loader.load()
+
+    def shutdown(self):
+        """Stop the inference pool's worker processes, if there are any."""
+        if self.pool is not None:
+            self.pool.close()
+
+    def _use_model(self, handle: LoadedModel):
+        """Serve from a registry model. In-flight generations keep the one they started with."""
+        self.handle = handle
+        self.model = handle.model
+        self.tokenizer = handle.tokenizer
+        self.device = handle.device
+        self.prefix_cache = handle.prefix_cache
+        self.speculative = handle.speculative
+        self.inference_profile = handle.profile
+
+    def _on_model_swap(self, old: LoadedModel, new: LoadedModel):
+        with self._handle_lock:
+            if self.handle is old:
+                self._use_model(model_registry.retain(new))
+                model_registry.release(old)
+
+    def _hold_model(self) -> LoadedModel:
+        """
+        Take a reference to the current model for one generation, so a swap
+        can't free it or change it midway. Pair with model_registry.release.
+        """
+        with self._handle_lock:
+            if self.handle is None:
+                raise RuntimeError("Model or tokenizer not initialized")
+            return model_registry.retain(self.handle)
+
+    def swap_model(self, model_path: Optional[str] = None) -> LoadedModel:
+        """
+        Load a new checkpoint (default: the current path again) and switch to it
+        without a restart. The current model serves until the new one is ready.
+        Blocking.
+        """
+        if self.handle is None:
+            raise RuntimeError("No model is loaded")
+        return model_registry.swap(self.handle, model_path)
 
     def initialize_model(self):
-        """Initialize the model and tokenizer."""
+        """Initialize the model and tokenizer. Blocking; run through self.loader."""
         if not self.ml_available:
             print("ML libraries not available, skipping model initialization")
             return
-            
+
+        try:
+            self.loader.report("importing", 0.05)
+            _import_ml_libraries()
+        except ImportError as e:
+            print(f"Warning: PyTorch/Transformers could not be imported ({str(e)}). Using mock implementation.")
+            self.ml_available = False
+            return
+
         try:
             # Get the path to the fine-tuned model weights
             model_path = os.getenv("FINETUNED_MODEL_PATH", "model/deepseek_finetuned_full")
             model_path = Path(model_path).absolute()
 
-            print(f"Loading model from {model_path}...")
-
-            # First try loading the tokenizer directly
-            try:
-                print("Attempting to load tokenizer...")
-                self.tokenizer = AutoTokenizer.from_pretrained(
-                    str(model_path),
-                    trust_remote_code=True,
-                    use_fast=False  # Use the slower but more compatible Python tokenizer
-                )
-            except Exception as e:
-                print(f"Error loading tokenizer: {str(e)}")
-                print("Attempting to load from base model...")
-                # If that fails, try loading from the base model
-                self.tokenizer = AutoTokenizer.from_pretrained(
-                    "deepseek-ai/deepseek-coder-1.3b-base",
-                    trust_remote_code=True,
-                    use_fast=False
-                )
+            if self.pool is not None:
+                self._initialize_pool(str(model_path))
+                return
 
-            print("Tokenizer loaded successfully!")
-
-            # Load the model with the fine-tuned weights
-            print("Loading model weights...")
-            try:
-                # Try loading with auto device mapping first
-                self.model = AutoModelForCausalLM.from_pretrained(
-                    str(model_path),
-                    torch_dtype=torch.float16,
-                    device_map="auto",
-                    trust_remote_code=True,
-                    low_cpu_mem_usage=True
-                )
-            except ValueError as e:
-                if "offload the whole model to the disk" in str(e):
-                    print("Model too large for auto device mapping, trying CPU-only loading...")
-                    # Fall back to CPU-only loading
-                    self.model = AutoModelForCausalLM.from_pretrained(
-                        str(model_path),
-                        torch_dtype=torch.float16,
-                        device_map=None,
-                        trust_remote_code=True,
-                        low_cpu_mem_usage=True
-                    )
-                    self.device = "cpu"
-                else:
-                    raise e
-
-            print("Model loaded successfully!")
+            print(f"Loading model from {model_path}...")
+            # Shared with PredictionService when both serve the same checkpoint and profile
+            self._use_model(model_registry.acquire(str(model_path), report=self.loader.report))
+            print(f"Model loaded successfully! Inference profile: {self.inference_profile.describe()}")
 
         except Exception as e:
             print(f"Error loading model: {str(e)}")
@@ -94,19 +187,44 @@ class ModelService:
             self.ml_available = False
             self.model = None
             self.tokenizer = None
+            self.prefix_cache = None
+            self.speculative = None
+            self.handle = None
             self.device = "cpu"
+            if self.pool is not None:
+                self.pool.close()
+                self.pool = None
             print("✅ Successfully switched to mock model service")
+            # Predictions are served by the mock, but the load is reported as failed
+            raise
+
+    def _initialize_pool(self, model_path: str):
+        """Start the pool's worker processes and load the tokenizer for building generation settings here."""
+        from app.ml.tokenizer import load_tokenizer
 
-    async def predict_antiviral(self, sequence: str) -> Dict[str, Any]:
+        print(f"Starting {self.pool.num_workers} inference worker processes for {model_path}...")
+        self.pool_checkpoint = checkpoint_id(resolve_model_path(model_path))
+        self.pool.start()
+        self.tokenizer = load_tokenizer(model_path)
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        if not self.pool.wait_ready(report=self.loader.report):
+            raise RuntimeError("No inference worker process finished loading the model")
+        print(f"Inference pool ready: {self.pool.ready_workers}/{self.pool.num_workers} workers")
+
+    async def predict_antiviral(self, sequence: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Generate antiviral predictions for a given genome sequence.
 
         Args:
             sequence (str): The input genome sequence
+            use_cache (bool): Serve and store the result in the prediction result cache
 
         Returns:
             Dict[str, Any]: Prediction results including candidate sequences and metadata
         """
+        # The prompt and the cache key are built from the same canonical sequence
+        sequence = normalize_sequence(sequence, kind=NUCLEOTIDE)
         if not self.ml_available:
             # Return mock prediction if ML libraries not available
             return {
@@ -132,51 +250,267 @@ class ModelService:
             }
             
         try:
-            if not self.model or not self.tokenizer:
+            if not (self.model or self.pool) or not self.tokenizer:
                 raise RuntimeError("Model or tokenizer not initialized")
 
-            # Prepare the prompt
-            prompt = f"""Analyze the following genome sequence and predict potential antiviral drug candidates:
-
-            Sequence: {sequence}
-
-            Generate detailed predictions including:
-            1. Potential binding sites
-            2. Drug candidate sequences
-            3. Mechanism of action
-            """
+            cache_key = self._cache_key(sequence) if use_cache else None
+            if cache_key:
+                cached = await result_cache.get(cache_key)
+                if cached is not None:
+                    return cached
 
-            # Tokenize input
-            inputs = self.tokenizer(prompt, return_tensors="pt", padding=True, truncation=True).to(self.device)
-
-            # Generate prediction
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
-                    max_length=1024,
-                    temperature=0.7,
-                    num_return_sequences=1,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    do_sample=True,
-                    top_p=0.95
-                )
-
-            # Decode the generated text
-            prediction = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+            # Generate prediction as part of the next micro-batch
+            prediction = await self.batcher.submit(self._build_prompt(sequence))
 
             # Process and format the prediction
             result = {
                 "input_sequence": sequence,
                 "prediction": prediction,
-                "model_version": "DeepSeek-R1-Distill-Qwen-1.5B-finetuned",
+                "model_version": MODEL_VERSION,
                 "timestamp": str(datetime.now())
             }
 
+            if cache_key:
+                await result_cache.put(cache_key, result)
+
             return result
 
         except Exception as e:
             print(f"Error during prediction: {str(e)}")
             raise
 
+    def _build_prompt(self, sequence: str) -> str:
+        """Build the analysis prompt for a genome sequence."""
+        return build_analysis_prompt(sequence)
+
+    def _cache_key(self, sequence: str):
+        """Result cache key for a sequence, or None when the current generation settings bypass the cache."""
+        params = self._generation_kwargs()
+        if not result_cache.is_cacheable(params):
+            result_cache.record_bypass()
+            return None
+        # Results of a swapped-in checkpoint must not be served from the old one's entries
+        checkpoint = self.handle.checkpoint if self.handle is not None else self.pool_checkpoint
+        model_version = f"{MODEL_VERSION}@{checkpoint}" if checkpoint is not None else MODEL_VERSION
+        return result_cache.make_key(sequence, model_version, params)
+
+    def _generate_batch(self, prompts: List[str]) -> List[str]:
+        """
+        Run a single generate() call over a batch of prompts.
+
+        Prompts are left-padded to a common length so they can share one
+        forward pass per step. This call blocks and must not run on the event loop.
+
+        Args:
+            prompts (List[str]): Fully formatted prompts
+
+        Returns:
+            List[str]: Decoded generations, in the same order as ``prompts``
+        """
+        if self.pool is not None:
+            # Generated by the least-loaded worker process
+            return self.pool.generate(prompts)
+
+        # The whole batch is encoded, generated and decoded with one model, even across a swap
+        handle = self._hold_model()
+        try:
+            tokenizer = handle.tokenizer
+            kwargs = self._generation_kwargs(tokenizer)
+            if handle.speculative is not None and len(prompts) == 1:
+                # The draft model proposes tokens and the model verifies them; one prompt at a time
+                inputs = tokenizer(prompts, return_tensors="pt", truncation=True).to(handle.device)
+                outputs = handle.speculative.generate(inputs, kwargs)
+                return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+            outputs = None
+            if handle.prefix_cache is not None:
+                # Only the sequence and the text after it are prefilled
+                outputs = handle.prefix_cache.generate(prompts, kwargs)
+
+            if outputs is None:
+                # Tokenize input
+                inputs = tokenizer(prompts, return_tensors="pt", padding=True, truncation=True).to(handle.device)
+
+                # Generate predictions
+                with torch.no_grad():
+                    outputs = handle.model.generate(**inputs, **kwargs)
+
+            # Decode the generated text
+            return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        finally:
+            model_registry.release(handle)
+
+    def _generation_kwargs(self, tokenizer=None) -> Dict[str, Any]:
+        """Generation parameters shared by every generate() call, for ``tokenizer`` (default: the current one)."""
+        tokenizer = tokenizer if tokenizer is not None else self.tokenizer
+        kwargs = {
+            "max_length": 1024,
+            "num_return_sequences": 1,
+            "pad_token_id": tokenizer.eos_token_id,
+            "do_sample": os.getenv("GENERATION_DO_SAMPLE", "true").lower() == "true",
+        }
+        if kwargs["do_sample"]:
+            kwargs.update({"temperature": 0.7, "top_p": 0.95})
+        return kwargs
+
+    async def stream_antiviral(self, sequence: str, use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream antiviral predictions for a genome sequence as tokens are generated.
+
+        Yields ``{"type": "token", "text": ...}`` chunks followed by one
+        ``{"type": "result", ...}`` message carrying the same fields as
+        predict_antiviral. Closing the generator early (e.g. the client
+        disconnected) stops the underlying generation at the next token.
+
+        Args:
+            sequence (str): The input genome sequence
+            use_cache (bool): Serve and store the result in the prediction result cache
+        """
+        sequence = normalize_sequence(sequence, kind=NUCLEOTIDE)
+        if not self.ml_available:
+            result = await self.predict_antiviral(sequence)
+            for line in result["prediction"].splitlines(keepends=True):
+                yield {"type": "token", "text": line}
+            yield {"type": "result", **result}
+            return
+
+        if self.pool is not None:
+            # Worker processes return whole generations, so the text arrives as one chunk
+            result = await self.predict_antiviral(sequence, use_cache=use_cache)
+            prompt = self._build_prompt(sequence)
+            text = result["prediction"]
+            yield {"type": "token", "text": text[len(prompt):] if text.startswith(prompt) else text}
+            yield {"type": "result", **result}
+            return
+
+        if not self.model or not self.tokenizer:
+            raise RuntimeError("Model or tokenizer not initialized")
+
+        cache_key = self._cache_key(sequence) if use_cache else None
+        if cache_key:
+            cached = await result_cache.get(cache_key)
+            if cached is not None:
+                # Token messages carry only generated text, not the echoed prompt
+                prompt = self._build_prompt(sequence)
+                text = cached["prediction"]
+                yield {"type": "token", "text": text[len(prompt):] if text.startswith(prompt) else text}
+                yield {"type": "result", **cached}
+                return
+
+        loop = asyncio.get_running_loop()
+        prompt = self._build_prompt(sequence)
+        # The stream is generated and decoded with one model, even across a swap
+        handle = self._hold_model()
+        streamer = TextIteratorStreamer(
+            handle.tokenizer,
+            skip_prompt=True,
+            skip_special_tokens=True,
+            timeout=float(os.getenv("STREAM_POLL_SECONDS", "1.0"))
+        )
+        cancelled = threading.Event()
+        # Admission was checked by the caller before the response started
+        generation = asyncio.ensure_future(
+            inference_executor.run(self._generate_streaming, handle, prompt, streamer, cancelled, enforce_limit=False)
+        )
+        # Keep a failed generation from being reported as "never retrieved" if the client left first
+        generation.add_done_callback(lambda task: task.cancelled() or task.exception())
+        # The model is released when generate() returns, which may be after the client left
+        generation.add_done_callback(lambda task: model_registry.release(handle))
+
+        chunks = []
+        try:
+            while True:
+                text = await loop.run_in_executor(None, self._next_stream_chunk, streamer)
+                if text is None:
+                    break
+                if text is _STREAM_TIMEOUT:
+                    if generation.done():
+                        break
+                    continue
+                if text:
+                    chunks.append(text)
+                    yield {"type": "token", "text": text}
+
+            # Surface any generation error to the caller
+            await generation
+
+            result = {
+                "input_sequence": sequence,
+                "prediction": prompt + "".join(chunks),
+                "model_version": MODEL_VERSION,
+                "timestamp": str(datetime.now())
+            }
+            if cache_key:
+                await result_cache.put(cache_key, result)
+
+            yield {"type": "result", **result}
+        finally:
+            cancelled.set()
+
+    def _generate_streaming(
+        self,
+        handle: LoadedModel,
+        prompt: str,
+        streamer: "TextIteratorStreamer",
+        cancelled: threading.Event
+    ):
+        """Run generate() for one prompt with ``handle``'s model, pushing decoded text into ``streamer``. Blocking."""
+        stopping_criteria = StoppingCriteriaList([CancellationCriteria(cancelled)])
+        kwargs = self._generation_kwargs(handle.tokenizer)
+        try:
+            if handle.speculative is not None:
+                inputs = handle.tokenizer(prompt, return_tensors="pt", truncation=True).to(handle.device)
+                handle.speculative.generate(inputs, kwargs, streamer=streamer, stopping_criteria=stopping_criteria)
+                return
+
+            if handle.prefix_cache is not None and handle.prefix_cache.generate(
+                [prompt], kwargs, streamer=streamer, stopping_criteria=stopping_criteria
+            ) is not None:
+                return
+
+            inputs = handle.tokenizer(prompt, return_tensors="pt", truncation=True).to(handle.device)
+            with torch.no_grad():
+                handle.model.generate(
+                    **inputs,
+                    **kwargs,
+                    streamer=streamer,
+                    stopping_criteria=stopping_criteria
+                )
+        except Exception:
+            # Make sure the consumer sees the end of the stream even though generate() failed
+            streamer.end()
+            raise
+
+    @staticmethod
+    def _next_stream_chunk(streamer: "TextIteratorStreamer"):
+        """Blocking read of the next streamed chunk; None at end of stream."""
+        try:
+            return next(streamer)
+        except StopIteration:
+            return None
+        except queue.Empty:
+            return _STREAM_TIMEOUT
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return runtime metrics for tuning the inference path."""
+        return {
+            "batching": self.batcher.get_metrics(),
+            "executor": inference_executor.get_metrics(),
+            "result_cache": result_cache.get_metrics(),
+            "prefix_cache": self.prefix_cache.get_metrics() if self.prefix_cache is not None else {"enabled": False},
+            "speculative": self.speculative.get_metrics() if self.speculative is not None else {"enabled": False},
+            "inference_profile": self.inference_profile._asdict() if self.inference_profile is not None else None,
+            "model_registry": model_registry.get_metrics(),
+            "inference_pool": self.pool.get_metrics() if self.pool is not None else {"enabled": False},
+            "memory": memory_report()
+        }
+
 # Create a singleton instance
-model_service = ModelService()
\ No newline at end of file
+model_service = ModelService()
+
+
+def _pool_worker_setup():
+    """Inference pool worker setup: load the model in the worker process and serve its batches."""
+    if not model_service.load() or not model_service.ml_available:
+        raise RuntimeError(model_service.status["error"] or "ML libraries not available")
+    return model_service._generate_batch
\ No newline at end of file
@@ -1,75 +1,151 @@
 import os
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, Union
 import logging
 from datetime import datetime
 import asyncio
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, PreTrainedTokenizer
+import threading
 import json
 
+from app.ml.model_registry import LoadedModel, model_registry
+from app.ml.prompts import build_analysis_prompt
+from app.ml.sequence import NUCLEOTIDE, normalize_sequence
+from app.ml.windowing import merge_window_predictions, split_windows
+from app.services.events import PREDICTION_JOB_TOPIC, job_events, job_topic
+from app.services.batching import MicroBatcher
+from app.services.inference_executor import inference_executor
+from app.services.job_queue import SQLiteJobQueue
+from app.services.job_store import InMemoryJobStore
+from app.services.model_loading import FAILED, ModelLoader
+from app.services.result_cache import result_cache
+from app.utils.ids import new_job_id
+
+MODEL_VERSION = "DeepSeek-R1-Distill-Qwen-1.5B-finetuned"
+# Prompts are truncated to this many tokens before generation
+MAX_INPUT_TOKENS = 512
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class PredictionService:
     def __init__(self):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # The device is picked once torch is imported by initialize_model
+        self.device = "cpu"
         self.model = None
         self.tokenizer = None
+        self.prefix_cache = None
+        self.speculative = None
+        # The shared registry entry the attributes above come from
+        self.handle: Optional[LoadedModel] = None
+        # Held while the handle is read and retained, or replaced by a swap
+        self._handle_lock = threading.Lock()
         self.model_path = os.getenv("MODEL_PATH", "model/deepseek_finetuned_full")
-        self.predictions_cache = {}
-        self.initialize_model()
+        self.job_store = InMemoryJobStore()
+        # Long sequences are predicted in overlapping windows of this many residues;
+        # without SEQUENCE_WINDOW_SIZE the size is fitted to MAX_INPUT_TOKENS once the tokenizer loads
+        self.window_size = int(os.getenv("SEQUENCE_WINDOW_SIZE") or "1000")
+        self.window_overlap = int(os.getenv("SEQUENCE_WINDOW_OVERLAP", "100"))
+        self.batcher = MicroBatcher(
+            self._generate_batch,
+            inference_executor,
+            max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "8")),
+            max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "20")),
+            max_queue_size=int(os.getenv("BATCH_MAX_QUEUE_SIZE", "64")),
+            name="prediction-batcher",
+        )
+        # With PREDICTION_QUEUE=sqlite jobs go to the durable queue and are run by
+        # `python -m app.worker` processes, so the API process doesn't load the model
+        self.queue = SQLiteJobQueue() if os.getenv("PREDICTION_QUEUE", "inprocess") == "sqlite" else None
+        # The model loads in the background when the first job arrives
+        self.loader = ModelLoader("prediction-model", self.initialize_model)
+        model_registry.add_swap_listener(self._on_model_swap)
+
+    def _start_loading(self):
+        """Start loading the model if it hasn't started; raise if an earlier load failed."""
+        self.loader.start()
+        if self.loader.status == FAILED:
+            raise RuntimeError(f"Model failed to load: {self.loader.error}")
+
+    async def _ensure_model(self):
+        """Wait until the model is loaded, raising if it fails to load."""
+        if not await asyncio.to_thread(self.loader.load):
+            raise RuntimeError(f"Model failed to load: {self.loader.error}")
+
+    def _use_model(self, handle: LoadedModel):
+        """Serve from a registry model. In-flight generations keep the one they started with."""
+        self.handle = handle
+        self.model = handle.model
+        self.tokenizer = handle.tokenizer
+        self.device = handle.device
+        self.prefix_cache = handle.prefix_cache
+        self.speculative = handle.speculative
+
+    def _on_model_swap(self, old: LoadedModel, new: LoadedModel):
+        with self._handle_lock:
+            if self.handle is not old:
+                return
+            self._use_model(model_registry.retain(new))
+            model_registry.release(old)
+        if not os.getenv("SEQUENCE_WINDOW_SIZE"):
+            # The new tokenizer may fit a different number of residues per prompt
+            self.window_size = self._fit_window_size()
+            logger.info(f"Sequence window size: {self.window_size} residues")
+
+    def _hold_model(self) -> LoadedModel:
+        """
+        Take a reference to the current model for one generation, so a swap
+        can't free it or change it midway. Pair with model_registry.release.
+        """
+        with self._handle_lock:
+            if self.handle is None:
+                raise RuntimeError("Model is not loaded")
+            return model_registry.retain(self.handle)
 
     def initialize_model(self):
-        """Initialize the model and tokenizer."""
+        """Initialize the model and tokenizer. Blocking; run through self.loader."""
         try:
             logger.info(f"Loading model from {self.model_path}")
+            # Shared with ModelService when both serve the same checkpoint and profile
+            self._use_model(model_registry.acquire(self.model_path, report=self.loader.report))
+            logger.info("Model loaded successfully!")
 
-            # First try loading from local path
-            try:
-                logger.info("Attempting to load tokenizer from local path...")
-                self.tokenizer = AutoTokenizer.from_pretrained(
-                    self.model_path,
-                    trust_remote_code=True,
-                    use_fast=False
-                )
-            except Exception as e:
-                logger.warning(f"Failed to load tokenizer from local path: {str(e)}")
-                logger.info("Attempting to load from base model...")
-                # If local loading fails, try loading from base model
-                self.tokenizer = AutoTokenizer.from_pretrained(
-                    "deepseek-ai/deepseek-coder-1.3b-base",
-                    trust_remote_code=True,
-                    use_fast=False
-                )
-                logger.info("Successfully loaded tokenizer from base model")
-
-            # Load model with error handling
-            try:
-                logger.info("Loading model weights...")
-                self.model = AutoModelForCausalLM.from_pretrained(
-                    self.model_path,
-                    torch_dtype=torch.float16,
-                    device_map="auto",
-                    trust_remote_code=True,
-                    low_cpu_mem_usage=True
-                )
-                logger.info("Model loaded successfully!")
-            except Exception as model_error:
-                logger.error(f"Error loading model: {str(model_error)}")
-                raise
+            if not os.getenv("SEQUENCE_WINDOW_SIZE"):
+                self.window_size = self._fit_window_size()
+                logger.info(f"Sequence window size: {self.window_size} residues")
 
         except Exception as e:
             logger.error(f"Error in model initialization: {str(e)}")
             raise
 
-    async def create_prediction_job(self, sequence: str) -> Dict[str, Any]:
+    async def load(self):
+        """Load the model and wait for it, raising if it fails to load."""
+        self._start_loading()
+        await self._ensure_model()
+
+    async def predict(self, sequence: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Predict one sequence in this process. Queue workers run their jobs
+        through this, so queued and in-process jobs get the same results.
+        """
+        await self._ensure_model()
+        return await self._predict(sequence, use_cache)
+
+    async def create_prediction_job(self, sequence: str, use_cache: bool = True) -> Dict[str, Any]:
         """Create a new prediction job."""
         try:
-            if not self.model or not self.tokenizer:
-                raise RuntimeError("Model or tokenizer not initialized")
+            if self.queue is not None:
+                job_id = new_job_id("pred")
+                return await asyncio.to_thread(
+                    self.queue.enqueue, job_id, {"sequence": sequence, "use_cache": use_cache}
+                )
+
+            # The job waits for a load in progress instead of being refused
+            self._start_loading()
 
-            job_id = f"pred_{int(datetime.now().timestamp())}"
+            # Refuse new work up front rather than letting background jobs pile up
+            inference_executor.check_capacity()
+
+            job_id = new_job_id("pred")
             job_data = {
                 "id": job_id,
                 "input_sequence": sequence,
@@ -80,11 +156,11 @@ class PredictionService:
                 "updated_at": datetime.now().isoformat()
             }
 
-            # Store in local cache
-            self.predictions_cache[job_id] = job_data
+            # Store in the job store
+            self.job_store.create(job_data)
 
             # Start processing in background
-            asyncio.create_task(self.process_prediction(job_id, sequence))
+            asyncio.create_task(self.process_prediction(job_id, sequence, use_cache=use_cache))
 
             return job_data
 
@@ -94,65 +170,31 @@ class PredictionService:
 
     async def get_prediction_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Get the status of a prediction job."""
-        return self.predictions_cache.get(job_id)
+        if self.queue is not None:
+            return await asyncio.to_thread(self.queue.get, job_id)
+        return self.job_store.get(job_id)
+
+    def _update_job(self, job_id: str, **fields):
+        """Update a job in the store and notify status subscribers."""
+        job = self.job_store.update(job_id, **fields)
+        if job is not None:
+            job_events.publish(job_topic(PREDICTION_JOB_TOPIC, job_id), job)
+        return job
 
-    async def process_prediction(self, job_id: str, sequence: str):
+    async def process_prediction(self, job_id: str, sequence: str, use_cache: bool = True):
         """Process a prediction job."""
         try:
-            if not self.model or not self.tokenizer:
-                raise RuntimeError("Model or tokenizer not initialized")
+            await self._ensure_model()
 
             # Update status to processing
-            self.predictions_cache[job_id]["status"] = "processing"
-            self.predictions_cache[job_id]["updated_at"] = datetime.now().isoformat()
-
-            # Prepare the prompt
-            prompt = f"""Analyze the following genome sequence and predict potential antiviral drug candidates:
-
-            Sequence: {sequence}
-
-            Generate detailed predictions including:
-            1. Potential binding sites
-            2. Drug candidate sequences
-            3. Mechanism of action
-            """
+            self._update_job(job_id, status="processing")
 
             # Generate prediction with error handling
             try:
-                inputs = self.tokenizer(
-                    prompt,
-                    return_tensors="pt",
-                    padding=True,
-                    truncation=True,
-                    max_length=512
-                ).to(self.device)
+                result = await self._predict(sequence, use_cache)
 
-                with torch.no_grad():
-                    outputs = self.model.generate(
-                        **inputs,
-                        max_length=1024,
-                        temperature=0.7,
-                        num_return_sequences=1,
-                        pad_token_id=self.tokenizer.eos_token_id,
-                        do_sample=True,
-                        top_p=0.95
-                    )
-
-                # Decode prediction
-                prediction = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-
-                # Parse prediction into structured format
-                result = {
-                    "input_sequence": sequence,
-                    "prediction": prediction,
-                    "model_version": "DeepSeek-R1-Distill-Qwen-1.5B-finetuned",
-                    "timestamp": datetime.now().isoformat()
-                }
-
-                # Update cache with results
-                self.predictions_cache[job_id]["status"] = "completed"
-                self.predictions_cache[job_id]["result"] = result
-                self.predictions_cache[job_id]["updated_at"] = datetime.now().isoformat()
+                # Update the job with results
+                self._update_job(job_id, status="completed", result=result)
 
                 # Save prediction to file
                 self._save_prediction(job_id, result)
@@ -164,9 +206,312 @@ class PredictionService:
         except Exception as e:
             error_message = str(e)
             logger.error(f"Error processing prediction: {error_message}")
-            self.predictions_cache[job_id]["status"] = "failed"
-            self.predictions_cache[job_id]["error"] = error_message
-            self.predictions_cache[job_id]["updated_at"] = datetime.now().isoformat()
+            self._update_job(job_id, status="failed", error=error_message)
+
+    async def create_batch_job(
+        self,
+        requests: Union[List[Tuple[str, bool]], AsyncIterator[Tuple[str, bool, Optional[str]]]]
+    ) -> Tuple[Dict[str, Any], AsyncIterator[Dict[str, Any]]]:
+        """
+        Create one parent job for many (sequence, use_cache) requests.
+
+        ``requests`` is a list, or an async iterator of (sequence, use_cache,
+        record_id) read while the batch runs. The iterator is read as fast as
+        it yields, independently of how many predictions may run at once, and
+        each request starts predicting as soon as a slot is free, so a
+        streamed upload starts predicting at its first record; ``record_id``
+        (e.g. a FASTA record name) is copied onto the item when set. If the iterator raises, the items already read
+        still finish and the job fails with its error. The iterator is closed
+        when the batch ends.
+
+        Identical requests are predicted once. Returns the parent job and an
+        async iterator of per-item messages in completion order; the batch
+        keeps running if the iterator is abandoned and its items are stored on
+        the parent job when it finishes.
+        """
+        if self.queue is not None:
+            raise NotImplementedError("Batch predictions are not available with PREDICTION_QUEUE=sqlite")
+        self._start_loading()
+        inference_executor.check_capacity()
+
+        counts = {"total": 0, "unique": 0, "completed": 0, "failed": 0}
+        if isinstance(requests, list):
+            # Totals are known up front; a streamed batch counts them as it reads
+            counts.update(total=len(requests), unique=len(set(requests)))
+            requests = self._iterate_requests(requests)
+
+        job_id = new_job_id("batch")
+        job_data = {
+            "id": job_id,
+            "input_sequence": None,
+            "status": "pending",
+            "result": None,
+            "error": None,
+            "batch": dict(counts),
+            "items": None,
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        }
+        self.job_store.create(job_data)
+
+        messages: asyncio.Queue = asyncio.Queue()
+        asyncio.create_task(self.process_batch(job_id, requests, messages, counts))
+
+        async def drain() -> AsyncIterator[Dict[str, Any]]:
+            while True:
+                message = await messages.get()
+                if message is None:
+                    return
+                yield message
+
+        return job_data, drain()
+
+    @staticmethod
+    async def _iterate_requests(requests: List[Tuple[str, bool]]) -> AsyncIterator[Tuple[str, bool, Optional[str]]]:
+        for sequence, use_cache in requests:
+            yield sequence, use_cache, None
+
+    async def process_batch(
+        self,
+        job_id: str,
+        requests: AsyncIterator[Tuple[str, bool, Optional[str]]],
+        messages: asyncio.Queue,
+        counts: Dict[str, int]
+    ):
+        """
+        Predict each unique request of a batch job as it is read, reporting
+        items on ``messages`` as they finish.
+        """
+        counting = counts["total"] == 0
+        items: List[Optional[Dict[str, Any]]] = []
+        item_record_ids: List[Optional[str]] = []
+        # Indices waiting on each running prediction, and the outcome of finished ones
+        waiting: Dict[Tuple[str, bool], List[int]] = {}
+        finished: Dict[Tuple[str, bool], Tuple[Optional[Dict[str, Any]], Optional[str]]] = {}
+        tasks = set()
+        # Enough windows in flight to fill every batch slot without overflowing the
+        # batcher queue; a long sequence takes one slot per window it submits
+        in_flight = asyncio.Semaphore(self._max_in_flight())
+        # Sequences being predicted at once; the rest wait without holding up reading
+        running = asyncio.Semaphore(self._max_in_flight())
+
+        def report(index: int, result: Optional[Dict[str, Any]], error: Optional[str]):
+            status = "failed" if error else "completed"
+            item = {"index": index, "id": f"{job_id}-{index}", "status": status, "result": result, "error": error}
+            if item_record_ids[index] is not None:
+                item["record_id"] = item_record_ids[index]
+            items[index] = item
+            counts[status] += 1
+            messages.put_nowait(item)
+
+        async def run(request: Tuple[str, bool]):
+            async with running:
+                try:
+                    await model_ready
+                    result, error = await self._predict(*request, in_flight=in_flight), None
+                except Exception as e:
+                    result, error = None, str(e)
+            finished[request] = (result, error)
+            for index in waiting.pop(request):
+                report(index, result, error)
+            self._update_job(job_id, batch=dict(counts))
+
+        # Requests are read while the model loads
+        model_ready = asyncio.ensure_future(self._ensure_model())
+        read_error = None
+        try:
+            self._update_job(job_id, status="processing")
+            while True:
+                try:
+                    sequence, use_cache, record_id = await requests.__anext__()
+                except StopAsyncIteration:
+                    break
+                except Exception as e:
+                    read_error = str(e)
+                    logger.error(f"Error reading batch job {job_id}: {read_error}")
+                    break
+                request = (sequence, use_cache)
+                index = len(items)
+                items.append(None)
+                item_record_ids.append(record_id)
+                if counting:
+                    counts["total"] += 1
+                if request in finished:
+                    report(index, *finished[request])
+                elif request in waiting:
+                    waiting[request].append(index)
+                else:
+                    if counting:
+                        counts["unique"] += 1
+                    waiting[request] = [index]
+                    task = asyncio.create_task(run(request))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            # Items already read still finish
+            await asyncio.gather(*tasks)
+            await model_ready
+
+            total = counts["total"]
+            if read_error is not None:
+                error_message = read_error
+            elif not total or counts["failed"] == total:
+                error_message = "All batch items failed" if total else "Batch contains no sequences"
+            else:
+                error_message = None
+            self._update_job(
+                job_id,
+                status="failed" if error_message else "completed",
+                error=error_message,
+                batch=dict(counts),
+                items=items
+            )
+        except Exception as e:
+            error_message = str(e)
+            logger.error(f"Error processing batch job {job_id}: {error_message}")
+            self._update_job(job_id, status="failed", error=error_message, batch=dict(counts), items=items)
+        finally:
+            await requests.aclose()
+            messages.put_nowait(None)
+
+    def _max_in_flight(self) -> int:
+        """Predictions a batch job keeps running at once."""
+        return max(1, min(
+            self.batcher.max_queue_size // 2,
+            2 * self.batcher.max_batch_size * inference_executor.max_workers
+        ))
+
+    async def _predict(
+        self,
+        sequence: str,
+        use_cache: bool = True,
+        in_flight: Optional[asyncio.Semaphore] = None
+    ) -> Dict[str, Any]:
+        """
+        Return the prediction result for a sequence.
+
+        Sequences longer than one window are split into overlapping windows
+        that are generated concurrently (and so batched together) and cached
+        one by one; their findings are merged with positions re-based to
+        genome coordinates. With ``in_flight``, each window holds one of its
+        slots while it is submitted to the batcher.
+        """
+        # Windows, prompts and cache keys are all built from the canonical sequence
+        sequence = normalize_sequence(sequence, kind=NUCLEOTIDE)
+        windows = split_windows(sequence, self.window_size, self.window_overlap)
+        if len(windows) == 1:
+            return await self._predict_window(sequence, use_cache, in_flight)
+
+        window_results = await asyncio.gather(
+            *(self._predict_window(window.sequence, use_cache, in_flight) for window in windows)
+        )
+        merged = merge_window_predictions(windows, [r["prediction"] for r in window_results])
+        return {
+            "input_sequence": sequence,
+            "prediction": merged["prediction"],
+            "model_version": MODEL_VERSION,
+            "timestamp": datetime.now().isoformat(),
+            "windows": merged["windows"],
+            "positions": merged["positions"]
+        }
+
+    async def _predict_window(
+        self,
+        sequence: str,
+        use_cache: bool = True,
+        in_flight: Optional[asyncio.Semaphore] = None
+    ) -> Dict[str, Any]:
+        """Return the prediction result for a sequence that fits one window, from the cache or the model."""
+        cache_key = None
+        if use_cache:
+            params = {**self._generation_kwargs(), "max_input_tokens": MAX_INPUT_TOKENS}
+            if result_cache.is_cacheable(params):
+                # Results of a swapped-in checkpoint must not be served from the old one's entries
+                model_version = f"{MODEL_VERSION}@{self.handle.checkpoint}" if self.handle is not None else MODEL_VERSION
+                cache_key = result_cache.make_key(sequence, model_version, params)
+                result = await result_cache.get(cache_key)
+                if result is not None:
+                    return result
+            else:
+                result_cache.record_bypass()
+
+        prompt = build_analysis_prompt(sequence)
+        # Concurrent jobs share generate() calls through the micro-batcher. Jobs were
+        # admitted when they were created, so they wait for queue room instead of failing
+        if in_flight is None:
+            prediction = await self.batcher.submit(prompt, wait=True)
+        else:
+            async with in_flight:
+                prediction = await self.batcher.submit(prompt, wait=True)
+
+        # Parse prediction into structured format
+        result = {
+            "input_sequence": sequence,
+            "prediction": prediction,
+            "model_version": MODEL_VERSION,
+            "timestamp": datetime.now().isoformat()
+        }
+        if cache_key:
+            await result_cache.put(cache_key, result)
+        return result
+
+    def _fit_window_size(self) -> int:
+        """Largest window whose prompt stays within MAX_INPUT_TOKENS, with a 10% margin."""
+        overhead = len(self.tokenizer(build_analysis_prompt(""))["input_ids"])
+        sample = "ACGT" * 256
+        tokens_per_residue = len(self.tokenizer(sample, add_special_tokens=False)["input_ids"]) / len(sample)
+        window_size = int(0.9 * (MAX_INPUT_TOKENS - overhead) / tokens_per_residue)
+        # The overlap must stay smaller than the window
+        return max(window_size, 2 * self.window_overlap)
+
+    def _generate_batch(self, prompts: List[str]) -> List[str]:
+        """Tokenize a batch of prompts, run one generate() call and decode the outputs. Blocking."""
+        import torch
+
+        # The whole batch is encoded, generated and decoded with one model, even across a swap
+        handle = self._hold_model()
+        try:
+            tokenizer = handle.tokenizer
+            kwargs = self._generation_kwargs(tokenizer)
+            if handle.speculative is not None and len(prompts) == 1:
+                # The draft model proposes tokens and the model verifies them; one prompt at a time
+                inputs = tokenizer(prompts, return_tensors="pt", truncation=True, max_length=MAX_INPUT_TOKENS).to(handle.device)
+                outputs = handle.speculative.generate(inputs, kwargs)
+                return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+            outputs = None
+            if handle.prefix_cache is not None:
+                # Only the sequence and the text after it are prefilled
+                outputs = handle.prefix_cache.generate(prompts, kwargs, max_length=MAX_INPUT_TOKENS)
+
+            if outputs is None:
+                inputs = tokenizer(
+                    prompts,
+                    return_tensors="pt",
+                    padding=True,
+                    truncation=True,
+                    max_length=MAX_INPUT_TOKENS
+                ).to(handle.device)
+
+                with torch.no_grad():
+                    outputs = handle.model.generate(**inputs, **kwargs)
+
+            # Decode predictions
+            return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        finally:
+            model_registry.release(handle)
+
+    def _generation_kwargs(self, tokenizer=None) -> Dict[str, Any]:
+        """Generation parameters for every generate() call, for ``tokenizer`` (default: the current one)."""
+        tokenizer = tokenizer if tokenizer is not None else self.tokenizer
+        kwargs = {
+            "max_length": 1024,
+            "num_return_sequences": 1,
+            "pad_token_id": tokenizer.eos_token_id,
+            "do_sample": os.getenv("GENERATION_DO_SAMPLE", "true").lower() == "true",
+        }
+        if kwargs["do_sample"]:
+            kwargs.update({"temperature": 0.7, "top_p": 0.95})
+        return kwargs
 
     def _save_prediction(self, job_id: str, result: Dict[str, Any]):
         """Save prediction result to file."""
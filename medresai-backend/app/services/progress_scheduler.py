@@ -0,0 +1,140 @@
+"""
+Single-threaded scheduler for prediction job state transitions.
+
+Replaces one sleeping thread per job with one thread for all jobs. Each job's
+transitions are kept in a heap ordered by due time; on every tick the thread
+applies all transitions that have come due in one short-lived session and one
+UPDATE statement, so thread count stays constant however many jobs are active
+and no request-scoped session is shared across threads.
+"""
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.crud.prediction import bulk_update_job_status, generate_mock_results
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# (delay after previous step in seconds, status, progress)
+Step = Tuple[float, str, float]
+
+
+def simulated_job_plan() -> List[Step]:
+    """Development-only progression: processing in a few increments, then completed."""
+    plan = [(0.0, "processing", 0.1)]
+    delay = 2.0
+    for progress in [0.25, 0.5, 0.75, 0.9]:
+        plan.append((delay + random.uniform(1, 3), "processing", progress))
+        delay = 0.0
+    plan.append((random.uniform(1, 2), "completed", 1.0))
+    return plan
+
+
+class JobProgressScheduler:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        tick_seconds: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.tick_seconds = tick_seconds if tick_seconds is not None else float(os.getenv("PROGRESS_TICK_SECONDS", "0.5"))
+        # Heap of (due_at, sequence, job_id, remaining steps)
+        self._heap: List[Tuple[float, int, int, List[Step]]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"ticks": 0, "updates": 0, "active_jobs": 0}
+
+    def schedule(self, job_id: int, plan: Optional[List[Step]] = None):
+        """Queue a job's transitions; the first step's delay counts from now."""
+        plan = list(plan) if plan is not None else simulated_job_plan()
+        if not plan:
+            return
+        with self._condition:
+            self._push(job_id, plan, time.monotonic())
+            self._stats["active_jobs"] += 1
+            self._ensure_thread()
+            self._condition.notify()
+
+    def _push(self, job_id: int, plan: List[Step], previous_due: float):
+        delay = plan[0][0]
+        heapq.heappush(self._heap, (previous_due + delay, next(self._sequence), job_id, plan))
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="job-progress-scheduler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                wait = self._heap[0][0] - time.monotonic()
+                if wait > 0:
+                    # Sleep until the next step is due, rounded up to the tick so
+                    # steps falling due close together share one write
+                    self._condition.wait(timeout=max(wait, self.tick_seconds))
+                due = self._pop_due(time.monotonic())
+
+            if due:
+                try:
+                    self._apply(due)
+                except Exception as e:
+                    logger.error(f"Error applying job progress updates: {str(e)}")
+
+    def _pop_due(self, now: float) -> List[Tuple[int, Step]]:
+        """Remove every step due by ``now`` and schedule each job's next step. Caller holds the lock."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, _, job_id, plan = heapq.heappop(self._heap)
+            step, remaining = plan[0], plan[1:]
+            due.append((job_id, step))
+            if remaining:
+                self._push(job_id, remaining, due_at)
+            else:
+                self._stats["active_jobs"] -= 1
+        return due
+
+    def _apply(self, due: List[Tuple[int, Step]]):
+        # A job can have several steps due in one tick; only its latest state matters
+        latest: Dict[int, Step] = {}
+        for job_id, step in due:
+            latest[job_id] = step
+
+        db = self.session_factory()
+        try:
+            # One UPDATE statement for the whole tick
+            bulk_update_job_status(
+                db,
+                [
+                    {"id": job_id, "status": status, "progress": progress}
+                    for job_id, (_, status, progress) in latest.items()
+                ],
+            )
+
+            for job_id, (_, status, _) in latest.items():
+                if status == "completed":
+                    generate_mock_results(db, job_id)
+        finally:
+            db.close()
+
+        with self._condition:
+            self._stats["ticks"] += 1
+            self._stats["updates"] += len(latest)
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._condition:
+            return {**self._stats, "scheduled_steps": len(self._heap)}
+
+
+# Create a singleton instance
+progress_scheduler = JobProgressScheduler()
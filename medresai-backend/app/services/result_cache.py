@@ -0,0 +1,227 @@
+"""
+Content-addressed cache for prediction results.
+
+Results are keyed by a hash of everything that determines the model output:
+the normalized input sequence, the prompt template version, the model version
+and the generation parameters. Entries live in a bounded in-memory LRU with a
+TTL, optionally backed by an SQLite file that survives restarts. The file is
+pruned of expired entries and of its oldest ones beyond
+RESULT_CACHE_DB_MAX_ENTRIES, and is read and written in a worker thread so
+disk I/O never blocks the event loop.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.ml.prompts import PROMPT_TEMPLATE_VERSION
+
+logger = logging.getLogger(__name__)
+
+# The disk tier is pruned after this many writes
+DISK_PRUNE_INTERVAL = 100
+
+
+class PredictionResultCache:
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        disk_path: Optional[str] = None,
+        cache_sampled: Optional[bool] = None,
+        disk_max_entries: Optional[int] = None,
+    ):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+        self.disk_path = disk_path if disk_path is not None else os.getenv("RESULT_CACHE_DB_PATH", "")
+        self.disk_max_entries = (
+            disk_max_entries if disk_max_entries is not None
+            else int(os.getenv("RESULT_CACHE_DB_MAX_ENTRIES", "100000"))
+        )
+        if cache_sampled is None:
+            cache_sampled = os.getenv("RESULT_CACHE_SAMPLED", "false").lower() == "true"
+        self.cache_sampled = cache_sampled
+
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # The memory tier and the stats; the disk tier has its own lock so
+        # memory hits never wait for SQLite
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0, "expired": 0, "disk_evictions": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes_since_prune = 0
+        if self.disk_path:
+            self._open_disk_tier()
+
+    def _open_disk_tier(self):
+        try:
+            directory = os.path.dirname(self.disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS prediction_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS prediction_cache_created_at ON prediction_cache (created_at)")
+            self._db.commit()
+            self._prune_disk_tier()
+            logger.info(f"Prediction result cache disk tier at {self.disk_path}")
+        except Exception as e:
+            logger.error(f"Could not open result cache disk tier, continuing in memory only: {str(e)}")
+            self._db = None
+
+    def _prune_disk_tier(self):
+        """Delete expired entries, then the oldest beyond disk_max_entries. Caller holds the disk tier lock."""
+        expired = self._db.execute(
+            "DELETE FROM prediction_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+        excess = self._db.execute("SELECT COUNT(*) FROM prediction_cache").fetchone()[0] - self.disk_max_entries
+        evicted = 0
+        if excess > 0:
+            evicted = self._db.execute(
+                "DELETE FROM prediction_cache WHERE key IN "
+                "(SELECT key FROM prediction_cache ORDER BY created_at LIMIT ?)",
+                (excess,)
+            ).rowcount
+        self._db.commit()
+        self._writes_since_prune = 0
+        with self._lock:
+            self._stats["expired"] += expired
+            self._stats["disk_evictions"] += evicted
+
+    @staticmethod
+    def make_key(sequence: str, model_version: str, generation_params: Dict[str, Any]) -> str:
+        """
+        Hash of every input that determines the generated output. ``sequence``
+        is the normalized sequence the prompt is built from (see
+        app.ml.sequence.normalize_sequence).
+        """
+        payload = json.dumps(
+            {
+                "sequence": sequence,
+                "prompt_version": PROMPT_TEMPLATE_VERSION,
+                "model_version": model_version,
+                "generation_params": generation_params,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, generation_params: Dict[str, Any]) -> bool:
+        """
+        Sampled generations are non-deterministic, so they bypass the cache
+        unless RESULT_CACHE_SAMPLED allows reusing one sample per input.
+        """
+        return self.cache_sampled or not generation_params.get("do_sample", False)
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return dict(value)
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+        if self._db is not None:
+            value = await asyncio.to_thread(self._disk_get, key, now)
+            if value is not None:
+                return value
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def _disk_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        """Look a key up in the disk tier and promote a live entry to memory. Blocking."""
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, created_at FROM prediction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._db.execute("DELETE FROM prediction_cache WHERE key = ?", (key,))
+                self._db.commit()
+                with self._lock:
+                    self._stats["expired"] += 1
+                return None
+        value = json.loads(row[0])
+        with self._lock:
+            self._insert(key, row[1], value)
+            self._stats["disk_hits"] += 1
+        return dict(value)
+
+    async def put(self, key: str, value: Dict[str, Any]):
+        created_at = time.time()
+        with self._lock:
+            self._insert(key, created_at, dict(value))
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, json.dumps(value, default=str), created_at)
+
+    def _disk_put(self, key: str, serialized: str, created_at: float):
+        """Write an entry to the disk tier, pruning it every DISK_PRUNE_INTERVAL writes. Blocking."""
+        with self._db_lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO prediction_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, serialized, created_at),
+                )
+                self._db.commit()
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= DISK_PRUNE_INTERVAL:
+                    self._prune_disk_tier()
+            except sqlite3.Error as e:
+                logger.error(f"Error writing result cache entry to disk: {str(e)}")
+
+    def _insert(self, key: str, created_at: float, value: Dict[str, Any]):
+        """Insert into the memory tier and evict least recently used entries. Caller holds the lock."""
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        """Empty both tiers. Blocking."""
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM prediction_cache")
+                self._db.commit()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": (self._stats["hits"] + self._stats["disk_hits"]) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_tier": bool(self._db is not None),
+                "disk_max_entries": self.disk_max_entries,
+                "cache_sampled": self.cache_sampled,
+            }
+
+
+# Create a singleton instance
+result_cache = PredictionResultCache()
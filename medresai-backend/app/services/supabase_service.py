@@ -1,8 +1,11 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from typing import Dict, Any
+from app.services.events import SUPABASE_JOB_TOPIC, job_events, job_topic
 from app.services.model_service import model_service
+from app.utils.ids import new_uuid7
 import logging
 
 # Configure logging
@@ -32,8 +35,10 @@ class SupabaseService:
         """Create a new prediction job in Supabase."""
         try:
             logger.info("Creating new prediction job")
-            # Create a new job record
+            # Create a new job record. A UUIDv7 key sorts by creation time, so
+            # "recent jobs" queries can range-scan the primary key index
             job_data = {
+                "id": new_uuid7(),
                 "input_sequence": sequence,
                 "status": "pending",
                 "result": None,
@@ -60,6 +65,7 @@ class SupabaseService:
 
             supabase.table("prediction_jobs").update(update_data).eq("id", job_id).execute()
             logger.info(f"Successfully updated job {job_id}")
+            job_events.publish(job_topic(SUPABASE_JOB_TOPIC, job_id), {"id": job_id, **update_data})
 
         except Exception as e:
             logger.error(f"Error updating job status: {str(e)}")
@@ -72,7 +78,8 @@ class SupabaseService:
             # Update status to processing
             await self.update_job_status(job_id, "processing")
 
-            # Run prediction using local model
+            # Wait for a model load still in progress, then run prediction using local model
+            await asyncio.to_thread(model_service.load)
             result = await model_service.predict_antiviral(sequence)
 
             # Update job with results
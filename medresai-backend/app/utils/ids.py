@@ -0,0 +1,101 @@
+"""
+Unique, time-sortable identifiers.
+
+IDs embed a millisecond timestamp in their most significant bits followed by
+random bits, so they never collide across concurrent submissions and sort
+lexicographically in creation order. Within one millisecond the random part
+is incremented instead of redrawn, which keeps IDs from one process strictly
+monotonic.
+
+Two encodings are provided:
+- ULID (26 Crockford base32 characters) for our own job IDs
+- UUIDv7 for stores whose primary key column is a UUID (e.g. Supabase)
+"""
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Tuple
+
+_CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+class _MonotonicSource:
+    """Produces (timestamp_ms, random) pairs that strictly increase."""
+
+    def __init__(self, random_bits: int):
+        self.random_bits = random_bits
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def next(self) -> Tuple[int, int]:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = int.from_bytes(os.urandom((self.random_bits + 7) // 8), "big") >> (
+                    (8 - self.random_bits % 8) % 8
+                )
+            else:
+                # Same millisecond (or the clock stepped back): keep ordering by counting up
+                self._last_random += 1
+                if self._last_random >> self.random_bits:
+                    self._last_ms += 1
+                    self._last_random = 0
+            return self._last_ms, self._last_random
+
+
+_ulid_source = _MonotonicSource(80)
+_uuid7_source = _MonotonicSource(74)
+
+
+def _encode_crockford(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(_CROCKFORD_ALPHABET[value & 0x1F])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def new_ulid() -> str:
+    """Return a new monotonic ULID string."""
+    timestamp_ms, random = _ulid_source.next()
+    return _encode_crockford((timestamp_ms << 80) | random, 26)
+
+
+def new_uuid7() -> str:
+    """Return a new monotonic UUIDv7 string (RFC 9562)."""
+    timestamp_ms, random = _uuid7_source.next()
+    rand_a = random >> 62
+    rand_b = random & ((1 << 62) - 1)
+    value = (timestamp_ms << 80) | (0x7 << 76) | (rand_a << 64) | (0b10 << 62) | rand_b
+    return str(uuid.UUID(int=value))
+
+
+def new_job_id(prefix: str = "pred") -> str:
+    """Return a prefixed, time-sortable job ID such as ``pred_01J9Z3...``."""
+    return f"{prefix}_{new_ulid()}"
+
+
+def ulid_timestamp(ulid: str) -> datetime:
+    """Creation time embedded in a ULID or prefixed job ID."""
+    encoded = ulid.rsplit("_", 1)[-1][:10]
+    timestamp_ms = 0
+    for char in encoded.upper():
+        timestamp_ms = (timestamp_ms << 5) | _CROCKFORD_ALPHABET.index(char)
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+
+
+def ulid_lower_bound(created_at: datetime) -> str:
+    """
+    Smallest ULID created at or after ``created_at``.
+
+    Because IDs sort by creation time, ``id >= ulid_lower_bound(t)`` selects
+    every job created since ``t`` with a plain key range scan.
+    """
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    timestamp_ms = int(created_at.timestamp() * 1000)
+    return _encode_crockford(timestamp_ms << 80, 26)
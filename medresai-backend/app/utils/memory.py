@@ -0,0 +1,53 @@
+"""
+Process memory report from /proc/self/smaps_rollup (Linux).
+
+RSS alone counts shared pages in every process that maps them, so it
+overstates what each worker costs. The report splits RSS into shared and
+private pages and includes PSS (shared pages divided among the processes
+sharing them). Adding up the workers' PSS gives the real footprint on the
+node, which shows whether memory-mapped weights are actually shared.
+"""
+import os
+from typing import Dict, Optional
+
+SMAPS_ROLLUP = "/proc/self/smaps_rollup"
+
+_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+    "Anonymous": "anonymous",
+}
+
+
+def memory_report() -> Optional[Dict[str, int]]:
+    """Memory of this process in bytes, or None where smaps_rollup is unavailable."""
+    try:
+        with open(SMAPS_ROLLUP) as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    report = {"pid": os.getpid()}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name in _FIELDS:
+            # Values are in kB
+            report[_FIELDS[name]] = int(value.split()[0]) * 1024
+    report["shared"] = report.get("shared_clean", 0) + report.get("shared_dirty", 0)
+    report["private"] = report.get("private_clean", 0) + report.get("private_dirty", 0)
+    return report
+
+
+def format_memory_report(report: Optional[Dict[str, int]]) -> str:
+    if report is None:
+        return "memory report unavailable (no /proc/self/smaps_rollup)"
+    mib = 1024 * 1024
+    return (
+        f"pid {report['pid']}: RSS {report.get('rss', 0) / mib:.0f} MiB "
+        f"(shared {report['shared'] / mib:.0f} MiB, private {report['private'] / mib:.0f} MiB), "
+        f"PSS {report.get('pss', 0) / mib:.0f} MiB"
+    )
@@ -0,0 +1,142 @@
+"""
+Prediction worker entry point.
+
+Runs model workers that pull jobs from the durable SQLite job queue, so
+inference can be scaled separately from the API and queued jobs survive
+API restarts and deploys. Jobs are predicted by the same PredictionService
+routine the API uses in-process. A worker whose model fails to load exits
+with a non-zero status instead of leasing jobs.
+
+Usage:
+    python -m app.worker --workers 2 --batch-size 8
+
+Start the API with ``PREDICTION_QUEUE=sqlite`` so that new jobs are enqueued
+for these workers instead of being processed inside the API process.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+class PredictionWorker:
+    """Leases batches of jobs and runs them through the prediction service."""
+
+    def __init__(self, worker_id: str, batch_size: int, poll_interval: float):
+        from app.services.job_queue import SQLiteJobQueue
+
+        self.worker_id = worker_id
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.queue = SQLiteJobQueue()
+        self._stopping = False
+
+    def stop(self, *args):
+        logger.info(f"{self.worker_id}: stopping after the current batch")
+        self._stopping = True
+
+    async def run(self):
+        # Imported here so the model is loaded inside the worker process
+        from app.services.prediction_service import prediction_service
+
+        logger.info(f"{self.worker_id}: loading model")
+        try:
+            await prediction_service.load()
+        except Exception as e:
+            # Jobs stay queued for a worker that has a model
+            logger.error(f"{self.worker_id}: {str(e)}")
+            raise SystemExit(1)
+        logger.info(f"{self.worker_id}: ready, polling {self.queue.path}")
+        while not self._stopping:
+            jobs = self.queue.lease(self.worker_id, self.batch_size)
+            if not jobs:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            logger.info(f"{self.worker_id}: leased {len(jobs)} job(s)")
+            heartbeat = asyncio.create_task(self._heartbeat([job["id"] for job in jobs]))
+            try:
+                # Submitting the whole batch at once lets the micro-batcher fold it into shared generate() calls
+                outcomes = await asyncio.gather(
+                    *(self._predict(prediction_service, job) for job in jobs),
+                    return_exceptions=True,
+                )
+            finally:
+                heartbeat.cancel()
+
+            for job, outcome in zip(jobs, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.error(f"{self.worker_id}: job {job['id']} attempt {job['attempts']} failed: {str(outcome)}")
+                    self.queue.fail(job["id"], self.worker_id, str(outcome))
+                elif not self.queue.complete(job["id"], self.worker_id, outcome):
+                    logger.warning(f"{self.worker_id}: lease on job {job['id']} was lost before completion")
+
+    @staticmethod
+    async def _predict(prediction_service, job: Dict[str, Any]) -> Dict[str, Any]:
+        payload = job["payload"]
+        return await prediction_service.predict(payload["sequence"], use_cache=payload.get("use_cache", True))
+
+    async def _heartbeat(self, job_ids: List[str]):
+        """Keep leases alive while a long batch is generating."""
+        interval = self.queue.visibility_timeout / 3
+        while True:
+            await asyncio.sleep(interval)
+            self.queue.extend_lease(job_ids, self.worker_id)
+
+
+def run_worker(index: int, batch_size: int, poll_interval: float):
+    load_dotenv()
+    worker = PredictionWorker(f"{socket.gethostname()}-{os.getpid()}-{index}", batch_size, poll_interval)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    asyncio.run(worker.run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run MedResAI prediction workers")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PREDICTION_WORKERS", "1")),
+                        help="Number of worker processes, each with its own model")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("BATCH_MAX_SIZE", "8")),
+                        help="Jobs leased per poll")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="Seconds to wait when the queue is empty")
+    args = parser.parse_args()
+
+    if args.workers == 1:
+        run_worker(0, args.batch_size, args.poll_interval)
+        return
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(i, args.batch_size, args.poll_interval), name=f"prediction-worker-{i}")
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward_signal(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward_signal)
+    signal.signal(signal.SIGINT, forward_signal)
+    for process in processes:
+        process.join()
+    if any(process.exitcode for process in processes):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
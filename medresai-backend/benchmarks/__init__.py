@@ -0,0 +1,5 @@
+"""
+Standalone performance benchmarks for the MedResAI backend.
+
+Run from the medresai-backend directory, e.g. ``python -m benchmarks.job_store_soak``.
+"""
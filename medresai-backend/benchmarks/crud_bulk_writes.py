@@ -0,0 +1,126 @@
+"""
+Benchmark per-row vs bulk job writes in app.crud.prediction.
+
+Simulates the write pattern of a job's lifecycle for many jobs: several
+progress ticks followed by a handful of result rows. The per-row path uses
+update_prediction_job_status / create_prediction_result (SELECT, COMMIT and
+REFRESH per call); the bulk path uses bulk_update_job_status /
+bulk_create_prediction_results. Statements sent to the database are counted
+with a cursor-execute event listener.
+
+Usage:
+    python -m benchmarks.crud_bulk_writes --jobs 500
+    DATABASE_URL=postgresql://... python -m benchmarks.crud_bulk_writes --url-from-env
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+import app.db.base_class_registry  # noqa
+import app.crud.prediction as crud
+
+PROGRESS_TICKS = [0.1, 0.25, 0.5, 0.75, 0.9, 1.0]
+RESULTS_PER_JOB = 5
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, *args):
+        self.statements += 1
+
+    def _on_commit(self, *args):
+        self.commits += 1
+
+    def reset(self):
+        self.statements = 0
+        self.commits = 0
+
+
+def make_results(job_id: int):
+    return [
+        {"rank": rank, "result_data": {"prediction": f"Result {rank} for job {job_id}"}, "confidence": 0.9}
+        for rank in range(1, RESULTS_PER_JOB + 1)
+    ]
+
+
+def run_per_row(SessionLocal, job_ids):
+    db = SessionLocal()
+    try:
+        for progress in PROGRESS_TICKS:
+            status = "completed" if progress == 1.0 else "processing"
+            for job_id in job_ids:
+                crud.update_prediction_job_status(db, job_id, status, progress)
+        for job_id in job_ids:
+            for r in make_results(job_id):
+                crud.create_prediction_result(db, job_id, r["rank"], r["result_data"], r["confidence"])
+    finally:
+        db.close()
+
+
+def run_bulk(SessionLocal, job_ids):
+    db = SessionLocal()
+    try:
+        for progress in PROGRESS_TICKS:
+            status = "completed" if progress == 1.0 else "processing"
+            crud.bulk_update_job_status(db, [{"id": job_id, "status": status, "progress": progress} for job_id in job_ids])
+        for job_id in job_ids:
+            crud.bulk_create_prediction_results(db, job_id, make_results(job_id))
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=500)
+    parser.add_argument("--url-from-env", action="store_true", help="Benchmark against DATABASE_URL instead of a temporary SQLite file")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.url_from_env:
+        url = os.environ["DATABASE_URL"]
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="crud_bulk_")
+        url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    engine = create_engine(url)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    counter = StatementCounter(engine)
+
+    print(f"database: {engine.url.render_as_string(hide_password=True)}, jobs: {args.jobs}")
+    print(f"{'mode':<10} {'seconds':>10} {'statements':>12} {'commits':>10} {'stmts/job':>10}")
+    for name, runner in [("per-row", run_per_row), ("bulk", run_bulk)]:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        job_ids = [crud.create_prediction_job(db, "bench-user", "sequence", {"sequence": "ACGT"}).id for _ in range(args.jobs)]
+        db.close()
+
+        counter.reset()
+        started = time.perf_counter()
+        runner(SessionLocal, job_ids)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:<10} {elapsed:>10.3f} {counter.statements:>12} {counter.commits:>10} "
+            f"{counter.statements / args.jobs:>10.1f}"
+        )
+
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    if tmpdir:
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark throughput of app.services.inference_pool.InferencePool by worker count.
+
+For each worker count, starts a pool, keeps ``--concurrency`` batches of
+random analysis prompts in flight from a thread pool for ``--batches``
+batches, and reports batches per second and latency percentiles.
+
+By default the workers load the real model through ModelService (needs
+torch, transformers and FINETUNED_MODEL_PATH). ``--setup
+benchmarks.inference_pool:echo_setup`` swaps the model for a function that
+returns its input, which measures the pool's own dispatch and IPC overhead.
+Lower ``--shm-min-bytes`` to send every payload through shared memory.
+
+Usage:
+    python -m benchmarks.inference_pool --workers 1 2 4 8 --batches 64 --concurrency 16
+    python -m benchmarks.inference_pool --setup benchmarks.inference_pool:echo_setup --workers 1 2 --batches 2000
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.ml.prompts import build_analysis_prompt
+from app.services.inference_pool import InferencePool
+
+
+def echo_setup():
+    return lambda prompts: prompts
+
+
+def make_prompts(count: int, length: int, rng: random.Random):
+    return [build_analysis_prompt("".join(rng.choice("ACGT") for _ in range(length))) for _ in range(count)]
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--setup", default="app.services.model_service:_pool_worker_setup")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--cores-per-worker", type=int, default=None)
+    parser.add_argument("--batches", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--length", type=int, default=200, help="Sequence length of each prompt")
+    parser.add_argument("--concurrency", type=int, default=16, help="Batches in flight at once")
+    parser.add_argument("--shm-min-bytes", type=int, default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    batches = [make_prompts(args.batch_size, args.length, rng) for _ in range(args.batches)]
+
+    print(f"{'workers':>8} {'load s':>8} {'batches/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'shm':>6}")
+    for num_workers in args.workers:
+        pool = InferencePool(args.setup, num_workers, cores_per_worker=args.cores_per_worker, min_shm_bytes=args.shm_min_bytes)
+        started = time.perf_counter()
+        pool.start()
+        if not pool.wait_ready():
+            raise RuntimeError("no inference worker started")
+        load_seconds = time.perf_counter() - started
+
+        def timed(prompts):
+            began = time.perf_counter()
+            pool.generate(prompts)
+            return time.perf_counter() - began
+
+        # Warm up every worker
+        with ThreadPoolExecutor(num_workers) as executor:
+            list(executor.map(timed, batches[:num_workers]))
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            latencies = list(executor.map(timed, batches))
+        elapsed = time.perf_counter() - started
+        shm_payloads = pool.get_metrics()["shm_payloads"]
+        pool.close()
+        print(
+            f"{num_workers:>8} {load_seconds:>8.2f} {len(batches) / elapsed:>10.1f} "
+            f"{1000 * percentile(latencies, 0.5):>9.2f} {1000 * percentile(latencies, 0.95):>9.2f} {shm_payloads:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare generation speed of the CPU inference profiles.
+
+Loads the model once per mode (dtype x quantization, optionally compiled),
+applies it with app.ml.inference_profile and runs the same greedy
+self-benchmark the services run at startup with MODEL_SELF_BENCHMARK=true,
+printing tokens/sec per mode. Modes whose dtype the CPU can't run are
+reported as failed rather than stopping the run.
+
+Needs torch and transformers.
+
+Usage:
+    python -m benchmarks.inference_profile --model model/deepseek_finetuned_full --threads 8 --compile
+"""
+import argparse
+import gc
+import os
+import time
+
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from app.ml.inference_profile import InferenceProfile, apply_profile, configure_threads, self_benchmark
+
+MODES = [
+    ("float32", "none"),
+    ("bfloat16", "none"),
+    ("float32", "dynamic-int8"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("FINETUNED_MODEL_PATH", "model/deepseek_finetuned_full"))
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (default: torch's)")
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--compile", action="store_true", help="Also run every mode with torch.compile")
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model, trust_remote_code=True)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    compile_options = [False, True] if args.compile else [False]
+    print(f"{'dtype':<9} {'quantization':<13} {'compile':<8} {'load s':>7} {'tokens/s':>9}")
+    for dtype, quantization in MODES:
+        for compiled in compile_options:
+            profile = InferenceProfile(dtype, quantization, compiled, args.threads, None)
+            configure_threads(profile)
+            started = time.perf_counter()
+            try:
+                model = AutoModelForCausalLM.from_pretrained(
+                    args.model, torch_dtype=profile.torch_dtype, trust_remote_code=True, low_cpu_mem_usage=True
+                )
+                model = apply_profile(model, profile)
+                load_seconds = time.perf_counter() - started
+                tokens_per_second = self_benchmark(model, tokenizer, "cpu", profile, args.new_tokens)
+                print(f"{dtype:<9} {quantization:<13} {str(compiled):<8} {load_seconds:>7.1f} {tokens_per_second:>9.1f}")
+            except Exception as e:
+                print(f"{dtype:<9} {quantization:<13} {str(compiled):<8} failed: {str(e)}")
+            model = None
+            gc.collect()
+
+
+if __name__ == "__main__":
+    main()
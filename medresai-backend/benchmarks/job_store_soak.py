@@ -0,0 +1,105 @@
+"""
+Soak benchmark for the prediction job store.
+
+Pushes a long stream of jobs through the full create -> processing ->
+completed lifecycle, each carrying a large input sequence and generated text,
+and samples traced Python memory as it goes. With the bounded InMemoryJobStore
+resident memory levels off once the retention window / size cap is reached;
+``--store dict`` reproduces the old unbounded dict for comparison.
+
+Usage:
+    python -m benchmarks.job_store_soak --jobs 200000 --retention 2 --max-jobs 500
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from app.services.job_store import InMemoryJobStore
+
+
+class DictStore:
+    """The previous behaviour: a plain dict that is never pruned."""
+
+    def __init__(self):
+        self._jobs = {}
+
+    def create(self, job):
+        self._jobs[job["id"]] = dict(job)
+
+    def update(self, job_id, **fields):
+        self._jobs[job_id].update(fields)
+
+    def __len__(self):
+        return len(self._jobs)
+
+
+def make_sequence(length: int) -> str:
+    return "".join(random.choice("ACGT") for _ in range(length))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=50000)
+    parser.add_argument("--sequence-length", type=int, default=5000)
+    parser.add_argument("--prediction-length", type=int, default=4000)
+    parser.add_argument("--retention", type=float, default=2.0, help="Retention window in seconds")
+    parser.add_argument("--max-jobs", type=int, default=500)
+    parser.add_argument("--in-flight", type=int, default=32, help="Jobs kept in pending/processing at once")
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--store", choices=["bounded", "dict"], default="bounded")
+    args = parser.parse_args()
+
+    spill_dir = tempfile.mkdtemp(prefix="job_store_soak_")
+    if args.store == "bounded":
+        store = InMemoryJobStore(retention_seconds=args.retention, max_jobs=args.max_jobs, spill_dir=spill_dir)
+    else:
+        store = DictStore()
+
+    # Pre-generate payloads so the benchmark measures the store, not random.choice
+    sequences = [make_sequence(args.sequence_length) for _ in range(16)]
+    prediction = make_sequence(args.prediction_length)
+
+    tracemalloc.start()
+    sample_every = max(1, args.jobs // args.samples)
+    in_flight = []
+    started = time.perf_counter()
+    print(f"{'jobs':>10} {'resident':>10} {'traced MB':>10} {'peak MB':>10} {'elapsed s':>10}")
+    try:
+        for i in range(args.jobs):
+            job_id = f"soak_{i:010d}"
+            now = datetime.now().isoformat()
+            store.create({
+                "id": job_id,
+                "input_sequence": sequences[i % len(sequences)] + str(i),
+                "status": "pending",
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+            })
+            store.update(job_id, status="processing")
+            in_flight.append(job_id)
+            if len(in_flight) >= args.in_flight:
+                done = in_flight.pop(0)
+                store.update(done, status="completed", result={"prediction": prediction + done})
+
+            if (i + 1) % sample_every == 0:
+                current, peak = tracemalloc.get_traced_memory()
+                print(
+                    f"{i + 1:>10} {len(store):>10} {current / 2**20:>10.1f} "
+                    f"{peak / 2**20:>10.1f} {time.perf_counter() - started:>10.1f}"
+                )
+    finally:
+        tracemalloc.stop()
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    if args.store == "bounded":
+        print(store.get_metrics())
+
+
+if __name__ == "__main__":
+    main()
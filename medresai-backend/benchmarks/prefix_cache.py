@@ -0,0 +1,101 @@
+"""
+Benchmark generation with and without the prompt prefix key/value cache.
+
+Loads a causal LM, builds app.ml.prefix_cache.PromptPrefixCache for the
+analysis prompt and times greedy generate() calls on random sequences, once
+from the full prompt and once resuming from the cached prefix, at several
+sequence lengths and batch sizes. ``--new-tokens 1`` measures the prefill
+alone. The "same" column reports whether both paths produced identical
+tokens.
+
+Needs torch and transformers. Any small causal LM works for a quick run,
+e.g. ``--model sshleifer/tiny-gpt2``.
+
+Usage:
+    python -m benchmarks.prefix_cache --model model/deepseek_finetuned_full --lengths 20 100 400 --batch-sizes 1 4
+"""
+import argparse
+import os
+import random
+import time
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from app.ml.prefix_cache import PromptPrefixCache
+from app.ml.prompts import build_analysis_prompt
+
+
+def make_prompts(count: int, length: int, rng: random.Random):
+    return [build_analysis_prompt("".join(rng.choice("ACGT") for _ in range(length))) for _ in range(count)]
+
+
+def generate_full(model, tokenizer, prompts, kwargs):
+    inputs = tokenizer(prompts, return_tensors="pt", padding=True, truncation=True).to(model.device)
+    with torch.no_grad():
+        outputs = model.generate(**inputs, **kwargs)
+    return outputs[:, -kwargs["max_new_tokens"]:]
+
+
+def generate_cached(cache, prompts, kwargs):
+    outputs = cache.generate(prompts, kwargs)
+    if outputs is None:
+        raise RuntimeError("the model could not generate from the prefix cache")
+    return outputs[:, -kwargs["max_new_tokens"]:]
+
+
+def best_of(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("FINETUNED_MODEL_PATH", "model/deepseek_finetuned_full"))
+    parser.add_argument("--lengths", type=int, nargs="+", default=[20, 100, 400])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--new-tokens", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model, trust_remote_code=True)
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    model = AutoModelForCausalLM.from_pretrained(args.model, trust_remote_code=True).eval()
+
+    cache = PromptPrefixCache(model, tokenizer, model.device)
+    started = time.perf_counter()
+    cache.build()
+    print(f"prefix: {cache.prefix_length} tokens, built in {time.perf_counter() - started:.3f}s")
+
+    # Greedy and a fixed number of new tokens, so both paths do the same work
+    kwargs = {
+        "do_sample": False,
+        "max_new_tokens": args.new_tokens,
+        "min_new_tokens": args.new_tokens,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    rng = random.Random(0)
+    print(f"{'length':>7} {'batch':>6} {'full s':>9} {'cached s':>9} {'speedup':>8} {'same':>5}")
+    for length in args.lengths:
+        for batch_size in args.batch_sizes:
+            prompts = make_prompts(batch_size, length, rng)
+            # Warm up both paths
+            generate_full(model, tokenizer, prompts, kwargs)
+            generate_cached(cache, prompts, kwargs)
+            full_seconds, full_tokens = best_of(lambda: generate_full(model, tokenizer, prompts, kwargs), args.repeat)
+            cached_seconds, cached_tokens = best_of(lambda: generate_cached(cache, prompts, kwargs), args.repeat)
+            same = torch.equal(full_tokens, cached_tokens)
+            print(
+                f"{length:>7} {batch_size:>6} {full_seconds:>9.3f} {cached_seconds:>9.3f} "
+                f"{full_seconds / cached_seconds:>7.2f}x {str(same):>5}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark sequence validation and normalization on large inputs.
+
+Compares app.ml.sequence.analyze_sequence with NumPy residue counting, the
+same function with NumPy disabled (bytes.count) and a per-character Python
+loop doing the same work (upper-case, drop whitespace, U->T, alphabet check,
+composition). Inputs are lower/upper-case DNA wrapped at 60 columns like a
+FASTA body, and RNA for the U->T path.
+
+Usage:
+    python -m benchmarks.sequence_validation --megabytes 10 --repeat 5
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+import app.ml.sequence as sequence_module
+from app.ml.sequence import ALPHABETS, analyze_sequence
+
+
+def make_input(megabytes: float, bases: str) -> str:
+    rng = random.Random(0)
+    size = int(megabytes * 1024 * 1024)
+    raw = "".join(rng.choice(bases + bases.lower()) for _ in range(min(size, 1 << 20)))
+    raw = (raw * (size // len(raw) + 1))[:size]
+    return "\n".join(raw[i:i + 60] for i in range(0, len(raw), 60))
+
+
+def python_loop(sequence: str):
+    allowed = set(ALPHABETS["dna"] + ALPHABETS["rna"])
+    residues = []
+    composition = Counter()
+    for char in sequence:
+        if char.isspace():
+            continue
+        char = char.upper()
+        if char not in allowed:
+            raise ValueError(f"invalid residue {char!r}")
+        if char == "U":
+            char = "T"
+        residues.append(char)
+        composition[char] += 1
+    return "".join(residues), composition
+
+
+def with_numpy(sequence: str):
+    return analyze_sequence(sequence)
+
+
+def without_numpy(sequence: str):
+    available = sequence_module.NUMPY_AVAILABLE
+    sequence_module.NUMPY_AVAILABLE = False
+    try:
+        return analyze_sequence(sequence)
+    finally:
+        sequence_module.NUMPY_AVAILABLE = available
+
+
+def best_of(fn, data: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-python", action="store_true", help="Skip the slow per-character baseline")
+    args = parser.parse_args()
+
+    runners = [("numpy", with_numpy), ("no-numpy", without_numpy)]
+    if not sequence_module.NUMPY_AVAILABLE:
+        print("numpy is not installed; skipping the numpy path")
+        runners = runners[1:]
+    if not args.skip_python:
+        runners.append(("python-loop", python_loop))
+
+    print(f"{'input':<6} {'path':<12} {'seconds':>10} {'MB/s':>10}")
+    for name, bases in [("dna", "ACGT"), ("rna", "ACGU")]:
+        data = make_input(args.megabytes, bases)
+        megabytes = len(data) / (1024 * 1024)
+        for runner_name, runner in runners:
+            # The baseline is slow enough that one run is representative
+            repeat = 1 if runner is python_loop else args.repeat
+            seconds = best_of(runner, data, repeat)
+            print(f"{name:<6} {runner_name:<12} {seconds:>10.3f} {megabytes / seconds:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark generation with and without a draft model for speculative decoding.
+
+Loads the main model and the draft, then generates from analysis prompts of
+random sequences, once plainly and once through
+app.ml.speculative.SpeculativeDecoder, and reports new tokens per second and
+the draft's acceptance rate. Greedy decoding is used by default, so the
+"same" column checks that both paths produced identical tokens. With
+``--sample``, outputs differ from run to run but follow the same
+distribution.
+
+Needs torch and transformers. The draft must share the main model's token
+ids, e.g. a small model of the same family.
+
+Usage:
+    python -m benchmarks.speculative_decoding --model model/deepseek_finetuned_full --draft Qwen/Qwen2.5-0.5B --new-tokens 128 --draft-tokens 3 5 8
+"""
+import argparse
+import os
+import random
+import time
+
+import torch
+from transformers import AutoModelForCausalLM
+
+from app.ml.prompts import build_analysis_prompt
+from app.ml.speculative import SpeculativeDecoder, shares_token_ids
+from app.ml.tokenizer import load_tokenizer
+
+
+def load(path: str):
+    tokenizer = load_tokenizer(path)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    model = AutoModelForCausalLM.from_pretrained(path, trust_remote_code=True).eval()
+    return model, tokenizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("FINETUNED_MODEL_PATH", "model/deepseek_finetuned_full"))
+    parser.add_argument("--draft", default=os.getenv("DRAFT_MODEL_PATH"), required=os.getenv("DRAFT_MODEL_PATH") is None)
+    parser.add_argument("--length", type=int, default=100, help="Sequence length of each prompt")
+    parser.add_argument("--prompts", type=int, default=3)
+    parser.add_argument("--new-tokens", type=int, default=64)
+    parser.add_argument("--draft-tokens", type=int, nargs="+", default=[5])
+    parser.add_argument("--schedule", default="heuristic")
+    parser.add_argument("--sample", action="store_true", help="Sample with the services' settings instead of greedy decoding")
+    args = parser.parse_args()
+
+    model, tokenizer = load(args.model)
+    draft_model, draft_tokenizer = load(args.draft)
+    if not shares_token_ids(tokenizer, draft_tokenizer):
+        raise SystemExit(f"{args.draft} uses different token ids than {args.model}")
+
+    # A fixed number of new tokens, so both paths do the same work
+    kwargs = {
+        "do_sample": args.sample,
+        "max_new_tokens": args.new_tokens,
+        "min_new_tokens": args.new_tokens,
+        "pad_token_id": tokenizer.eos_token_id,
+    }
+    if args.sample:
+        kwargs.update({"temperature": 0.7, "top_p": 0.95})
+
+    rng = random.Random(0)
+    prompts = [build_analysis_prompt("".join(rng.choice("ACGT") for _ in range(args.length))) for _ in range(args.prompts)]
+    inputs = [tokenizer(prompt, return_tensors="pt") for prompt in prompts]
+
+    # Warm up
+    with torch.no_grad():
+        model.generate(**inputs[0], **{**kwargs, "max_new_tokens": 4, "min_new_tokens": 4})
+
+    started = time.perf_counter()
+    with torch.no_grad():
+        plain = [model.generate(**encoded, **kwargs) for encoded in inputs]
+    plain_rate = args.prompts * args.new_tokens / (time.perf_counter() - started)
+
+    print(f"{'draft tok':>9} {'plain tok/s':>12} {'spec tok/s':>11} {'speedup':>8} {'accept':>7} {'tok/pass':>9} {'same':>5}")
+    for draft_tokens in args.draft_tokens:
+        draft_model.generation_config.num_assistant_tokens = draft_tokens
+        draft_model.generation_config.num_assistant_tokens_schedule = args.schedule
+        decoder = SpeculativeDecoder(model, tokenizer, draft_model, args.draft)
+        started = time.perf_counter()
+        speculative = [decoder.generate(encoded, kwargs) for encoded in inputs]
+        rate = args.prompts * args.new_tokens / (time.perf_counter() - started)
+        metrics = decoder.get_metrics()
+        same = "-" if args.sample else str(all(torch.equal(a, b) for a, b in zip(plain, speculative)))
+        print(
+            f"{draft_tokens:>9} {plain_rate:>12.1f} {rate:>11.1f} {rate / plain_rate:>7.2f}x "
+            f"{metrics['acceptance_rate']:>7.2f} {metrics['tokens_per_verify_pass']:>9.2f} {same:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
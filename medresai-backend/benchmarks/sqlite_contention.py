@@ -0,0 +1,128 @@
+"""
+Benchmark mixed read/write job traffic on SQLite under each SQLITE_PROFILE.
+
+Writer threads advance job progress with update_prediction_job_status (the
+pattern of the progress scheduler and model workers) while reader threads
+poll get_prediction_job (the pattern of clients polling job status). Each
+profile runs against a fresh database file and reports completed reads and
+writes per second and how many operations failed with "database is locked".
+
+Usage:
+    python -m benchmarks.sqlite_contention --writers 4 --readers 16 --seconds 10
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.sqlite import SQLITE_PROFILES, apply_sqlite_profile
+import app.db.base_class_registry  # noqa
+import app.crud.prediction as crud
+
+
+class Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.locked = 0
+
+    def add(self, field: str):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+
+def writer(SessionLocal, job_ids, stop, counters):
+    db = SessionLocal()
+    try:
+        while not stop.is_set():
+            try:
+                crud.update_prediction_job_status(db, random.choice(job_ids), "processing", random.random())
+                counters.add("writes")
+            except OperationalError:
+                db.rollback()
+                counters.add("locked")
+    finally:
+        db.close()
+
+
+def reader(SessionLocal, job_ids, stop, counters):
+    db = SessionLocal()
+    try:
+        while not stop.is_set():
+            try:
+                crud.get_prediction_job(db, random.choice(job_ids))
+                # End the read transaction like a request-scoped session would
+                db.rollback()
+                counters.add("reads")
+            except OperationalError:
+                db.rollback()
+                counters.add("locked")
+    finally:
+        db.close()
+
+
+def run_profile(profile: str, args) -> Counters:
+    tmpdir = tempfile.mkdtemp(prefix="sqlite_contention_")
+    path = os.path.join(tmpdir, "bench.db")
+    # A short lock wait makes contention visible as errors instead of only as latency
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": args.lock_timeout},
+        pool_size=args.writers + args.readers,
+    )
+    apply_sqlite_profile(engine, profile, busy_timeout_ms=int(args.lock_timeout * 1000))
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    job_ids = [crud.create_prediction_job(db, "bench-user", "sequence", {"sequence": "ACGT" * 64}).id for _ in range(args.jobs)]
+    db.close()
+
+    counters = Counters()
+    stop = threading.Event()
+    threads = [threading.Thread(target=writer, args=(SessionLocal, job_ids, stop, counters)) for _ in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(SessionLocal, job_ids, stop, counters)) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    engine.dispose()
+    for name in os.listdir(tmpdir):
+        os.remove(os.path.join(tmpdir, name))
+    os.rmdir(tmpdir)
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--lock-timeout", type=float, default=0.1, help="Seconds a connection waits for a lock")
+    parser.add_argument("--profiles", nargs="+", default=list(SQLITE_PROFILES), choices=list(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"writers: {args.writers}, readers: {args.readers}, jobs: {args.jobs}, seconds: {args.seconds}")
+    print(f"{'profile':<12} {'reads/s':>10} {'writes/s':>10} {'locked':>8}")
+    for profile in args.profiles:
+        counters = run_profile(profile, args)
+        print(
+            f"{profile:<12} {counters.reads / args.seconds:>10.1f} "
+            f"{counters.writes / args.seconds:>10.1f} {counters.locked:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
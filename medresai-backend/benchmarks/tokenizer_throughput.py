@@ -0,0 +1,86 @@
+"""
+Benchmark tokenizer load time and throughput, fast (Rust) versus Python.
+
+Loads the model's tokenizer both ways, then tokenizes analysis prompts for
+random nucleotide sequences of realistic lengths (1-30 kb by default), one
+at a time and as a padded batch like the micro-batcher sends. Reports
+seconds, MB/s and tokens/s per tokenizer, and whether both produced the same
+token ids.
+
+Run it twice to see the effect of the persisted ``tokenizer.json``: the
+first load of a model without one converts the Python tokenizer, and
+app.ml.tokenizer.load_tokenizer saves the result next to the model.
+
+Usage:
+    python -m benchmarks.tokenizer_throughput --model model/deepseek_finetuned_full --lengths 1000 5000 30000
+"""
+import argparse
+import os
+import random
+import time
+
+from transformers import AutoTokenizer
+
+from app.ml.prompts import build_analysis_prompt
+from app.ml.tokenizer import load_tokenizer
+
+
+def load_timed(fn):
+    started = time.perf_counter()
+    tokenizer = fn()
+    return tokenizer, time.perf_counter() - started
+
+
+def best_of(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("FINETUNED_MODEL_PATH", "model/deepseek_finetuned_full"))
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1000, 5000, 10000, 30000])
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    fast, fast_load = load_timed(lambda: load_tokenizer(args.model))
+    slow, slow_load = load_timed(
+        lambda: AutoTokenizer.from_pretrained(args.model, trust_remote_code=True, use_fast=False)
+    )
+    if not fast.is_fast:
+        print("No fast tokenizer could be built for this model; both columns use the Python tokenizer")
+    print(f"load: fast {fast_load:.2f}s, python {slow_load:.2f}s")
+    for tokenizer in (fast, slow):
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+
+    rng = random.Random(0)
+    print(f"{'length':>7} {'batch':>6} {'tokenizer':<10} {'seconds':>9} {'MB/s':>8} {'tokens/s':>11} {'same':>5}")
+    for length in args.lengths:
+        prompts = [
+            build_analysis_prompt("".join(rng.choice("ACGT") for _ in range(length)))
+            for _ in range(args.batch_size)
+        ]
+        for batch in (prompts[:1], prompts):
+            megabytes = sum(len(prompt) for prompt in batch) / (1024 * 1024)
+            ids = {}
+            for name, tokenizer in (("fast", fast), ("python", slow)):
+                seconds, encoded = best_of(lambda: tokenizer(batch, padding=True), args.repeat)
+                ids[name] = encoded["input_ids"]
+                # Padding doesn't count as throughput
+                tokens = sum(sum(mask) for mask in encoded["attention_mask"])
+                same = "" if name == "fast" else str(ids["fast"] == ids[name])
+                print(
+                    f"{length:>7} {len(batch):>6} {name:<10} {seconds:>9.4f} "
+                    f"{megabytes / seconds:>8.2f} {tokens / seconds:>11.0f} {same:>5}"
+                )
+
+
+if __name__ == "__main__":
+    main()
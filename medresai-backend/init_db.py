@@ -2,6 +2,7 @@ import logging
 from app.db.base import Base
 from app.db.session import engine, SessionLocal
 from app.db.init_db import init_db
+from app.init_db import ensure_indexes
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.models.prediction import PredictionJob
@@ -27,6 +28,7 @@ def init_db():
     try:
         # Create tables if they don't exist
         Base.metadata.create_all(bind=engine)
+        ensure_indexes(engine)
         print("Database tables created successfully!")
     except Exception as e:
         print(f"Error creating database tables: {e}")
@@ -39,6 +41,7 @@ def init() -> None:
         # Create tables
         logger.info("Creating tables...")
         Base.metadata.create_all(bind=engine)
+        ensure_indexes(engine)
 
         # Initialize data
         logger.info("Initializing data...")